@@ -8,39 +8,111 @@ No SFTP passwords are stored in this repo.
 Usage:
   python deploy.py              # build (xm-player profile) + validate + upload
   python deploy.py --no-build   # upload existing dist/ only (must already be xm-player build)
+  python deploy.py --delta      # upload only files whose hash differs from the live manifest
+  python deploy.py --verify-only  # check every dist/ file against the live site, no upload
+  python deploy.py --report out.json  # also write per-phase timings / bytes / peak RSS
 
 This script contacts https://storage.noahcohn.com to upload the dist/ folder
-as a single zip archive. The server extracts it and pushes files over a
+as a single zip archive (written to a temp file and streamed, so memory use does
+not grow with dist/). The server extracts it and pushes files over a
 persistent SFTP connection on the VPS side.
 
 Set DEPLOY_CLEAN=1 to request remote asset pruning before extract (when supported).
+Set DEPLOY_DELTA=1 (or pass --delta) to diff against the remote .deploy-inventory.json.
+For offline testing, point DEPLOY_API_URL / DEPLOY_LIVE_URL at scripts/deploy_stub_server.py.
 See docs/DEPLOY.md for COEP headers, CDN CORP requirements, and manual prune steps.
 
 Requirements:
   pip install requests
+  pip install brotli   # optional: .br sidecars (gzip sidecars need nothing extra)
+  pip install pillow numpy  # optional: PNG recompression + WebP/AVIF variants (scripts/optimize_images.py)
 """
 
 from __future__ import annotations
 
 import argparse
+import collections
+import contextlib
+import functools
+import gzip
+import hashlib
+import importlib.util
 import io
 import json
 import os
+import posixpath
+import random
 import re
+import stat
+import struct
 import subprocess
 import sys
+import tempfile
+import threading
+import time
+import uuid
+import urllib.parse
 import zipfile
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
 from pathlib import Path
-from typing import Optional
+from typing import Any, BinaryIO, Callable, Collection, Iterable, Iterator, Optional, Sequence, TypeVar, Union
 
 import requests
+import requests.adapters
+
+from deploy_zip import ZIP_DEFLATE_LEVEL, ZipStreamWriter
+from scripts.atomic_write import write_atomic
+
+try:
+    import resource
+except ImportError:  # Windows: peak RSS is reported as null
+    resource = None  # type: ignore[assignment]
+
+try:
+    import brotli
+except ImportError:  # .gz sidecars only
+    brotli = None
 
 # ============================================================
 # PER-PROJECT CONFIGURATION
 # ============================================================
 PROJECT_NAME: str = "xm-player"
 BUILD_DIR: str = "dist"
-CONTABO_BASE_URL: str = "https://storage.noahcohn.com"
+CONTABO_BASE_URL: str = os.getenv("DEPLOY_API_URL", "https://storage.noahcohn.com").rstrip("/")
+
+# Hash + compressed-member cache reused across deploys (see DeployCache).
+DEPLOY_CACHE_DIR: Path = Path(
+    os.getenv("DEPLOY_CACHE_DIR", str(Path(__file__).resolve().parent / ".deploy-cache"))
+)
+
+# Lossless PNG recompression + WebP/AVIF variants; runs on dist/ before the snapshot.
+IMAGE_OPTIMIZER: Path = Path(__file__).resolve().parent / "scripts" / "optimize_images.py"
+
+# Variants it writes next to a PNG (bezel.png.avif); served through .htaccess rewrites of the .png URL.
+IMAGE_VARIANT_SUFFIXES = (".webp", ".avif")
+
+# Flatten + tree-shake + minify dist/shaders/*.wgsl in place before the snapshot.
+SHADER_BUNDLER: Path = Path(__file__).resolve().parent / "scripts" / "bundle_wgsl.py"
+
+# Input fingerprint of the last successful build, stored next to dist/.
+BUILD_FINGERPRINT_PATH: Path = Path(__file__).resolve().parent / f".{BUILD_DIR}-fingerprint.json"
+# Paths that never feed `vite build` (plus any *.md); changes here do not force a rebuild.
+BUILD_INPUT_EXCLUDES = (
+    f"{BUILD_DIR}/",
+    "docs/",
+    "archive/",
+    "tests/",
+    "test-results/",
+    ".github/",
+    ".playwright-mcp/",
+    ".shader-baselines/",
+)
+
+# Public origin for post-deploy checks. "{site}" expands to the target site, e.g.
+# DEPLOY_LIVE_URL=http://127.0.0.1:8765/sites/{site} for scripts/deploy_stub_server.py.
+DEPLOY_LIVE_URL: str = os.getenv("DEPLOY_LIVE_URL", "").strip()
 
 # Deploy under this remote folder (empty = use PROJECT_NAME = "xm-player").
 # Matches the original SFTP target: test.1ink.us/xm-player
@@ -62,6 +134,78 @@ def live_host_for_target(target: str) -> str:
     """Map deploy target_site to the public hostname used for post-deploy checks."""
     return "go.1ink.us" if target == "go" else "test.1ink.us"
 
+
+def live_base_url(target: str) -> str:
+    """Origin serving the deployed site (DEPLOY_LIVE_URL override, else https://host)."""
+    if DEPLOY_LIVE_URL:
+        return DEPLOY_LIVE_URL.replace("{site}", target).rstrip("/")
+    return f"https://{live_host_for_target(target)}"
+
+INVENTORY_NAME = ".deploy-inventory.json"
+VERIFY_WORKERS = int(os.getenv("DEPLOY_VERIFY_WORKERS", "16") or 16)
+# Shipped but never served over HTTP (Apache denies .ht*; _headers is read by the edge).
+VERIFY_SKIP_NAMES = frozenset({".htaccess", ".htpasswd", "_headers"})
+HASH_CHUNK_BYTES = 1 << 20
+UPLOAD_CHUNK_BYTES = (int(os.getenv("DEPLOY_CHUNK_MB", "8") or 8)) << 20
+RETRY_ATTEMPTS = 6
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 30.0
+# Sentinel from upload_bundle_chunked(): server predates the chunked upload API.
+CHUNKED_UNSUPPORTED = object()
+_HTTP_SESSION: Optional[requests.Session] = None
+_HTTP_SESSION_LOCK = threading.Lock()
+_PENDING_UPLOADS_LOCK = threading.Lock()
+# Where per-site network code prints: print itself, or a fan_out() logger that prefixes "[site] ".
+Log = Callable[[str], None]
+
+# Zip members in these formats are stored as-is; deflating them costs CPU for ~0% gain.
+STORED_SUFFIXES = frozenset(
+    {".wasm", ".png", ".jpg", ".jpeg", ".gif", ".webp", ".avif", ".mp4", ".webm", ".mp3", ".ogg",
+     ".woff", ".woff2", ".zip", ".gz", ".br"}
+)
+ZIP_WORKERS: int = int(os.getenv("DEPLOY_ZIP_WORKERS", "0") or 0) or (os.cpu_count() or 1)
+PARALLEL_DEFLATE_MAX_BYTES = 32 << 20
+
+# Precompressed sidecars (foo.js.br / foo.js.gz) served directly by the host.
+SIDECAR_ENCODINGS = {".br": "br", ".gz": "gzip"}
+COMPRESSIBLE_SUFFIXES = frozenset(
+    {".js", ".mjs", ".css", ".wasm", ".json", ".svg", ".html", ".webmanifest", ".wgsl", ".txt", ".xml"}
+)
+SIDECAR_MIN_BYTES = 1024
+BROTLI_QUALITY = 11
+GZIP_LEVEL = 9
+
+PRELOAD_BEGIN = "<!-- BEGIN deploy.py modulepreload -->"
+PRELOAD_END = "<!-- END deploy.py modulepreload -->"
+PRELOAD_MAX_DEPTH: int = int(os.getenv("DEPLOY_PRELOAD_DEPTH", "8") or 8)
+PRELOAD_BUDGET_BYTES: int = int(os.getenv("DEPLOY_PRELOAD_KB", "2048") or 2048) << 10
+
+# Per-deploy raw/gzip sizes of every file, keyed by Vite manifest name (other files by path).
+SIZE_HISTORY_PATH: Path = Path(
+    os.getenv("DEPLOY_SIZE_HISTORY", "") or Path(__file__).resolve().parent / ".deploy-size-history.jsonl"
+)
+SIZE_HISTORY_MAX_RECORDS = 200
+# Gate: fail when a chunk (or the startup payload) grows by more than this many percent
+# of its gzip size, and by at least the KB floor so tiny files cannot trip it.
+SIZE_MAX_GROWTH_PCT: float = float(os.getenv("DEPLOY_SIZE_MAX_GROWTH_PCT", "20") or 20)
+SIZE_MIN_GROWTH_KB: float = float(os.getenv("DEPLOY_SIZE_MIN_GROWTH_KB", "10") or 10)
+VITE_HASH_RE = re.compile(r"-[A-Za-z0-9_-]{8}(?=\.[A-Za-z0-9]+$)")
+# Written by `vite build` (vite.config.ts: build.manifest); read from dist/ but never shipped. Every
+# file it lists is named assets/[name]-[hash][extname], so it changes name whenever content does.
+VITE_MANIFEST_NAME = ".vite/manifest.json"
+# "cloudflare" writes `! Cache-Control` detach lines so unhashed assets/ files can override the
+# static /assets/* rule in public/_headers; other hosts (Netlify) merge duplicate headers instead.
+HEADERS_DIALECT = os.getenv("DEPLOY_HEADERS_DIALECT", "generic").strip().lower()
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+CACHE_HEADERS_BEGIN = "# BEGIN deploy.py cache headers (generated from the deploy inventory; edits are overwritten)"
+CACHE_HEADERS_END = "# END deploy.py cache headers"
+# Consumed by public/sw.js; sw.js's PRECACHE_VERSION line is rewritten so browsers pick up a new worker.
+PRECACHE_MANIFEST_NAME = "precache-manifest.json"
+PRECACHE_VERSION_RE = re.compile(r"^const PRECACHE_VERSION = '[^']*';$", re.MULTILINE)
+PRECACHE_ENTRY_FILES = ("index.html", "libmpt/libopenmptjs.js", "libmpt/libopenmpt.wasm")
+PRECACHE_MAX_FILE_BYTES = 4 << 20
+
 STYLESHEET_RE = re.compile(
     r'<link[^>]+rel=["\']stylesheet["\'][^>]*href=["\']([^"\']+)["\']',
     re.IGNORECASE,
@@ -75,6 +219,12 @@ PRELOAD_RE = re.compile(
     re.IGNORECASE,
 )
 MIN_CSS_BYTES = 10_000
+SKIP_DIST_DIRS = frozenset({".git", "node_modules", "__pycache__", ".vite"})
+# Text files scanned for references to other emitted files (prune reachability).
+REFERENCE_SCAN_SUFFIXES = frozenset({".html", ".js", ".mjs", ".css", ".json", ".webmanifest"})
+# Static ES imports in emitted chunks: import{a}from"./x.js", import"./x.js", export*from"./x.js".
+# Dynamic import("./x.js") is deliberately not matched: it is off the synchronous startup chain.
+STATIC_IMPORT_RE = re.compile(r"""\b(?:import|export)\s*(?:[\w$*{}\s,]*?\bfrom\s*)?["']([^"'\s]+\.m?js)["']""")
 
 
 def resolve_asset_href(href: str) -> str:
@@ -105,51 +255,506 @@ def resolve_asset_href(href: str) -> str:
     return path
 
 
-def collect_index_referenced_paths(build_path: Path) -> list[str]:
-    """Paths under dist/ referenced directly from index.html."""
-    index_html = build_path / "index.html"
-    if not index_html.is_file():
-        return []
-    html = index_html.read_text(encoding="utf-8")
-    hrefs: list[str] = []
-    hrefs.extend(STYLESHEET_RE.findall(html))
-    hrefs.extend(MODULE_SCRIPT_RE.findall(html))
-    hrefs.extend(PRELOAD_RE.findall(html))
-    return [resolve_asset_href(h) for h in hrefs]
-
-
-def collect_asset_prune_manifest(build_path: Path, inventory: list[str]) -> dict[str, object]:
-    """Files under assets/ that must exist after deploy; used for remote prune."""
-    index_refs = set(collect_index_referenced_paths(build_path))
-    assets_in_inventory = sorted(f for f in inventory if f.startswith("assets/"))
-    # Include assets referenced from JS bundles (e.g. parser worker chunks).
-    assets_dir = build_path / "assets"
-    referenced_from_bundles: set[str] = set()
-    if assets_dir.is_dir():
-        asset_names = {f.name for f in assets_dir.iterdir() if f.is_file()}
-        for bundle in assets_dir.glob("*.js"):
+def load_vite_manifest(root: Path) -> dict[str, str]:
+    """Every file in dist/.vite/manifest.json mapped to a name that survives rebuilds.
+
+    Names come from the manifest keys (source paths, or ``_<chunk name>`` for
+    shared chunks), e.g. the entry chunk assets/index-AbCdEf12.js →
+    ``vite:index.html`` and its stylesheet → ``vite:index.html.css``. Empty
+    when the build wrote no manifest: then nothing counts as content-hashed.
+    """
+    try:
+        chunks = json.loads((root / VITE_MANIFEST_NAME).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(chunks, dict):
+        return {}
+    names: dict[str, str] = {}
+    for key, chunk in sorted(chunks.items()):
+        if not isinstance(chunk, dict) or not isinstance(chunk.get("file"), str):
+            continue
+        if key.startswith("_"):  # shared chunk: the key is its own hashed file name
+            ident = f"_{chunk['name']}" if isinstance(chunk.get("name"), str) else VITE_HASH_RE.sub("", key)
+        else:
+            ident = key
+        names.setdefault(chunk["file"], f"vite:{ident}")
+        for i, css in enumerate(chunk.get("css") or ()):
+            names.setdefault(css, f"vite:{ident}.css" if i == 0 else f"vite:{ident}.{i}.css")
+        for asset in chunk.get("assets") or ():
+            names.setdefault(asset, f"vite:{ident}#{VITE_HASH_RE.sub('', posixpath.basename(asset))}")
+    return names
+
+
+@dataclass(frozen=True)
+class DistEntry:
+    """One regular file captured by DistSnapshot."""
+
+    rel: str
+    path: Path
+    size: int
+    mtime_ns: int
+    mode: int
+
+
+class DeployCache:
+    """Persistent cache under .deploy-cache/ that survives between deploys.
+
+    ``index.json`` maps absolute file paths to (size, mtime_ns, sha256) so
+    unchanged files are not re-hashed, and lists the .br/.gz sidecars
+    write_sidecars() put into dist/ (the only ones it may delete again);
+    ``deflate/`` holds raw-deflated zip members and ``sidecars/`` .br/.gz
+    payloads, both keyed by content hash so unchanged files are not
+    recompressed, even when a rebuild touched their mtime.
+    """
+
+    VERSION = 1
+    MEMBER_HEADER = struct.Struct("<IQ")  # crc32, uncompressed size
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.index_path = root / "index.json"
+        self.members_dir = root / "deflate"
+        self.sidecars_dir = root / "sidecars"
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._files: dict[str, dict[str, object]] = {}
+        self._sidecars: set[str] = set()
+        try:
+            data = json.loads(self.index_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            data = {}
+        if isinstance(data, dict) and data.get("version") == self.VERSION and isinstance(data.get("files"), dict):
+            self._files = data["files"]
+            if isinstance(data.get("sidecars"), list):
+                self._sidecars = {str(p) for p in data["sidecars"]}
+
+    def lookup_hash(self, entry: DistEntry) -> Optional[str]:
+        cached = self._files.get(str(entry.path.resolve()))
+        if cached and cached.get("size") == entry.size and cached.get("mtime_ns") == entry.mtime_ns:
+            digest = cached.get("sha256")
+            if isinstance(digest, str):
+                with self._lock:
+                    self.hits += 1
+                return digest
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def store_hash(self, entry: DistEntry, digest: str) -> None:
+        with self._lock:
+            self._files[str(entry.path.resolve())] = {
+                "size": entry.size,
+                "mtime_ns": entry.mtime_ns,
+                "sha256": digest,
+            }
+
+    def _member_path(self, digest: str) -> Path:
+        return self.members_dir / digest[:2] / f"{digest}.z{ZIP_DEFLATE_LEVEL}"
+
+    def load_member(self, digest: str) -> Optional[tuple[int, int, bytes]]:
+        try:
+            blob = self._member_path(digest).read_bytes()
+        except OSError:
+            return None
+        if len(blob) < self.MEMBER_HEADER.size:
+            return None
+        crc, size = self.MEMBER_HEADER.unpack_from(blob)
+        return crc, size, blob[self.MEMBER_HEADER.size :]
+
+    def store_member(self, digest: str, member: tuple[int, int, bytes]) -> None:
+        crc, size, payload = member
+        write_atomic(self._member_path(digest), self.MEMBER_HEADER.pack(crc, size) + payload)
+
+    def _sidecar_path(self, digest: str, suffix: str) -> Path:
+        return self.sidecars_dir / digest[:2] / f"{digest}{suffix}"
+
+    def load_sidecar(self, digest: str, suffix: str) -> Optional[bytes]:
+        try:
+            return self._sidecar_path(digest, suffix).read_bytes()
+        except OSError:
+            return None
+
+    def store_sidecar(self, digest: str, suffix: str, payload: bytes) -> None:
+        write_atomic(self._sidecar_path(digest, suffix), payload)
+
+    def mark_generated(self, path: Path, generated: bool = True) -> None:
+        """Record (or forget) that write_sidecars() wrote the sidecar at path."""
+        with self._lock:
+            if generated:
+                self._sidecars.add(str(path.resolve()))
+            else:
+                self._sidecars.discard(str(path.resolve()))
+
+    def is_generated(self, path: Path) -> bool:
+        with self._lock:
+            return str(path.resolve()) in self._sidecars
+
+    def retain(self, snapshot: "DistSnapshot") -> None:
+        """Forget files under snapshot.root that are gone and delete orphaned members and sidecars."""
+        root = str(snapshot.root.resolve()) + os.sep
+        live = {str(e.path.resolve()) for e in snapshot.entries.values()}
+        with self._lock:
+            for key in [k for k in self._files if k.startswith(root) and k not in live]:
+                del self._files[key]
+            self._sidecars = {k for k in self._sidecars if not k.startswith(root) or k in live}
+            digests = {str(v.get("sha256")) for v in self._files.values()}
+        for blob in [*self.members_dir.glob("*/*.z*"), *self.sidecars_dir.glob("*/*")]:
+            if blob.name.split(".", 1)[0] not in digests:
+                blob.unlink(missing_ok=True)
+
+    def save(self) -> None:
+        with self._lock:
+            payload = json.dumps(
+                {"version": self.VERSION, "files": self._files, "sidecars": sorted(self._sidecars)}, sort_keys=True
+            )
+        write_atomic(self.index_path, payload.encode("utf-8"))
+
+
+class DistSnapshot:
+    """Single walk of dist/ shared by validators, inventory and zip writer.
+
+    Stat info is captured once up front; file contents, hashes and the parsed
+    index.html references are computed lazily and cached for the run. With a
+    DeployCache, hashes of files whose size and mtime are unchanged since the
+    last deploy are reused without reading them. Steps that write into dist/
+    report the paths they touched through refresh(), so dist/ is walked once.
+    """
+
+    INDEX_PROPERTIES = ("index_html", "stylesheet_hrefs", "module_script_hrefs", "preload_hrefs", "index_refs")
+
+    def __init__(self, root: Path, cache: Optional[DeployCache] = None):
+        self.root = root
+        self.cache = cache
+        found: list[DistEntry] = []
+        self._walk(root, "", found)
+        self.entries: dict[str, DistEntry] = {e.rel: e for e in sorted(found, key=lambda e: e.rel)}
+        self._contents: dict[str, bytes] = {}
+        self._hashes: dict[str, str] = {}
+
+    def _walk(self, directory: Path, prefix: str, found: list[DistEntry]) -> None:
+        with os.scandir(directory) as it:
+            for entry in it:
+                if entry.name in SKIP_DIST_DIRS:
+                    continue
+                rel = f"{prefix}{entry.name}"
+                if entry.is_dir(follow_symlinks=True):
+                    self._walk(Path(entry.path), f"{rel}/", found)
+                elif entry.is_file(follow_symlinks=True):
+                    st = entry.stat(follow_symlinks=True)
+                    found.append(DistEntry(rel, Path(entry.path), st.st_size, st.st_mtime_ns, st.st_mode))
+
+    def refresh(self, rels: Iterable[str]) -> None:
+        """Re-stat paths that were just written or deleted and drop what was cached for them."""
+        added = False
+        for rel in rels:
+            path = self.root / rel
             try:
-                text = bundle.read_text(encoding="utf-8", errors="ignore")
-            except OSError:
+                st = path.stat()
+            except FileNotFoundError:
+                st = None
+            self._contents.pop(rel, None)
+            self._hashes.pop(rel, None)
+            if rel == "index.html":
+                for name in self.INDEX_PROPERTIES:
+                    self.__dict__.pop(name, None)
+            if st is None or not stat.S_ISREG(st.st_mode):
+                self.entries.pop(rel, None)
                 continue
-            for name in asset_names:
-                if name in text:
-                    referenced_from_bundles.add(f"assets/{name}")
-    keep = sorted(set(assets_in_inventory) | index_refs | referenced_from_bundles)
-    keep = [p for p in keep if p.startswith("assets/")]
+            added = added or rel not in self.entries
+            self.entries[rel] = DistEntry(rel, path, st.st_size, st.st_mtime_ns, st.st_mode)
+        if added:
+            self.entries = dict(sorted(self.entries.items()))
+
+    @property
+    def files(self) -> list[str]:
+        return list(self.entries)
+
+    def has(self, rel: str) -> bool:
+        return rel in self.entries
+
+    def under(self, prefix: str) -> list[str]:
+        """Sorted paths under a directory prefix such as ``"assets/"``."""
+        return [rel for rel in self.entries if rel.startswith(prefix)]
+
+    def read_bytes(self, rel: str) -> bytes:
+        data = self._contents.get(rel)
+        if data is None:
+            data = self.entries[rel].path.read_bytes()
+            self._contents[rel] = data
+        return data
+
+    def open(self, rel: str) -> BinaryIO:
+        """Binary reader for rel, served from the content cache when already loaded."""
+        cached = self._contents.get(rel)
+        return io.BytesIO(cached) if cached is not None else self.entries[rel].path.open("rb")
+
+    def read_text(self, rel: str) -> str:
+        return self.read_bytes(rel).decode("utf-8", errors="ignore")
+
+    def sha256(self, rel: str) -> str:
+        digest = self._hashes.get(rel)
+        if digest is None:
+            entry = self.entries[rel]
+            digest = self.cache.lookup_hash(entry) if self.cache is not None else None
+            if digest is None:
+                cached = self._contents.get(rel)
+                digest = hashlib.sha256(cached).hexdigest() if cached is not None else hash_file(entry.path)
+                if self.cache is not None:
+                    self.cache.store_hash(entry, digest)
+            self._hashes[rel] = digest
+        return digest
+
+    @functools.cached_property
+    def index_html(self) -> Optional[str]:
+        if not self.has("index.html"):
+            return None
+        return self.read_bytes("index.html").decode("utf-8")
+
+    @functools.cached_property
+    def stylesheet_hrefs(self) -> list[str]:
+        return STYLESHEET_RE.findall(self.index_html or "")
+
+    @functools.cached_property
+    def module_script_hrefs(self) -> list[str]:
+        return MODULE_SCRIPT_RE.findall(self.index_html or "")
+
+    @functools.cached_property
+    def preload_hrefs(self) -> list[str]:
+        return PRELOAD_RE.findall(self.index_html or "")
+
+    @functools.cached_property
+    def index_refs(self) -> list[str]:
+        """Paths under dist/ referenced directly from index.html."""
+        hrefs = [*self.stylesheet_hrefs, *self.module_script_hrefs, *self.preload_hrefs]
+        return [resolve_asset_href(h) for h in hrefs]
+
+    @functools.cached_property
+    def vite_files(self) -> dict[str, str]:
+        """Content-hashed files Vite emitted, mapped to their logical names (see load_vite_manifest)."""
+        return load_vite_manifest(self.root)
+
+
+def collect_index_referenced_paths(snapshot: DistSnapshot) -> list[str]:
+    """Paths under dist/ referenced directly from index.html."""
+    return list(snapshot.index_refs)
+
+
+def scan_file_references(text: str, names: dict[str, str], token_re: re.Pattern[str]) -> set[str]:
+    """dist paths whose basename appears as a filename token in text (one regex pass)."""
+    found: set[str] = set()
+    for token in token_re.findall(text):
+        rel = names.get(token)
+        if rel is not None:
+            found.add(rel)
+    return found
+
+
+def build_reference_graph(snapshot: DistSnapshot) -> dict[str, list[str]]:
+    """Directed graph from each text file in dist/ to the assets/ files it names.
+
+    Every emitted asset name ends in a known extension, so one compiled token
+    pattern per run plus a dict lookup finds all references in a single pass
+    over each file — linear in bundle size instead of bundles × assets.
+    index.html also gets edges for its stylesheet/module/preload hrefs.
+    """
+    assets = snapshot.under("assets/")
+    names = {rel.rsplit("/", 1)[-1]: rel for rel in assets}
+    suffixes = sorted({Path(name).suffix[1:] for name in names if Path(name).suffix}, key=len, reverse=True)
+    graph: dict[str, list[str]] = {}
+    if not suffixes:
+        return graph
+    token_re = re.compile(r"[\w.\-]+\.(?:" + "|".join(re.escape(ext) for ext in suffixes) + r")(?![\w\-])")
+    for rel in snapshot.files:
+        if Path(rel).suffix.lower() not in REFERENCE_SCAN_SUFFIXES:
+            continue
+        try:
+            targets = scan_file_references(snapshot.read_text(rel), names, token_re)
+        except OSError:
+            continue
+        if rel == "index.html":
+            targets.update(ref for ref in snapshot.index_refs if snapshot.has(ref))
+        targets.discard(rel)
+        if targets:
+            graph[rel] = sorted(targets)
+    return graph
+
+
+def reference_roots(snapshot: DistSnapshot) -> list[str]:
+    """Entry points for reachability: index.html plus every file shipped outside assets/."""
+    return [rel for rel in snapshot.files if not rel.startswith("assets/")]
+
+
+def reachable_from(graph: dict[str, list[str]], roots: list[str]) -> set[str]:
+    seen: set[str] = set(roots)
+    stack = list(roots)
+    while stack:
+        for target in graph.get(stack.pop(), ()):
+            if target not in seen:
+                seen.add(target)
+                stack.append(target)
+    return seen
+
+
+def collect_asset_prune_manifest(
+    snapshot: DistSnapshot, graph: Optional[dict[str, list[str]]] = None
+) -> dict[str, object]:
+    """Files under assets/ that must exist after deploy; used for remote prune.
+
+    ``keep`` is every file under assets/ in this build, so prune only ever
+    removes assets left over from earlier deploys. That matters for delta
+    bundles, which do not re-upload unchanged files: a kept file missing
+    from the bundle must still be kept. Assets the filename-token reference
+    graph cannot reach from index.html (or the other files shipped outside
+    assets/) are listed under ``unreachable`` as advice only; the scan is a
+    heuristic and misses URLs built at runtime.
+    """
+    if graph is None:
+        graph = build_reference_graph(snapshot)
+    index_refs = set(collect_index_referenced_paths(snapshot))
+    reachable = reachable_from(graph, reference_roots(snapshot))
+    assets = snapshot.under("assets/")
+    # Sidecars and image variants count as reachable together with their source file.
+    reachable |= {rel for rel in assets if (sidecar_source(rel) or image_variant_source(rel)) in reachable | index_refs}
     return {
         "assetsDir": "assets",
-        "keep": keep,
+        "keep": assets,
         "referencedByIndexHtml": sorted(index_refs),
+        "unreachable": sorted(set(assets) - reachable - index_refs),
     }
 
 
-def validate_build_base_path(build_path: Path) -> None:
+def strip_generated_preloads(html: str) -> str:
+    """index.html without the modulepreload block inject_modulepreloads() adds."""
+    start = html.find(PRELOAD_BEGIN)
+    end = html.find(PRELOAD_END, start)
+    if start == -1 or end == -1:
+        return html
+    end += len(PRELOAD_END)
+    line_start = html.rfind("\n", 0, start) + 1
+    if not html[line_start:start].strip() and html.startswith("\n", end):
+        start, end = line_start, end + 1  # block on its own lines
+    return html[:start] + html[end:]
+
+
+def static_imports(snapshot: DistSnapshot, rel: str) -> list[str]:
+    """dist paths a JS chunk imports statically, in source order."""
+    found: list[str] = []
+    for spec in STATIC_IMPORT_RE.findall(snapshot.read_text(rel)):
+        if spec.startswith("."):
+            target = posixpath.normpath(posixpath.join(posixpath.dirname(rel), spec))
+        elif spec.startswith("/"):
+            target = resolve_asset_href(spec)
+        else:
+            continue  # bare specifiers resolve through the import map / CDN
+        if snapshot.has(target) and target not in found:
+            found.append(target)
+    return found
+
+
+def plan_modulepreloads(
+    snapshot: DistSnapshot, *, max_depth: int = PRELOAD_MAX_DEPTH, budget_bytes: int = PRELOAD_BUDGET_BYTES
+) -> list[str]:
+    """Breadth-first static import chain of the entry chunk(s), within a depth and size budget.
+
+    Entry scripts and files index.html already preloads are not repeated.
+    Nearer chunks win: once the next chunk would exceed the byte budget the
+    walk stops, so the budget always covers the shallowest part of the chain.
+    """
+    html = strip_generated_preloads(snapshot.index_html or "")
+    entries = [resolve_asset_href(h) for h in MODULE_SCRIPT_RE.findall(html)]
+    seen = set(entries) | {resolve_asset_href(h) for h in PRELOAD_RE.findall(html)}
+    frontier = [rel for rel in entries if snapshot.has(rel)]
+    planned: list[str] = []
+    spent = 0
+    for _depth in range(max_depth):
+        next_frontier: list[str] = []
+        for rel in frontier:
+            for target in static_imports(snapshot, rel):
+                if target in seen:
+                    continue
+                seen.add(target)
+                size = snapshot.entries[target].size
+                if spent + size > budget_bytes:
+                    return planned
+                spent += size
+                planned.append(target)
+                next_frontier.append(target)
+        if not next_frontier:
+            break
+        frontier = next_frontier
+    return planned
+
+
+def entry_graph(snapshot: DistSnapshot) -> list[str]:
+    """index.html, the files it references and every chunk its scripts import statically: a first visit's payload."""
+    graph = [rel for rel in dict.fromkeys(["index.html", *snapshot.index_refs]) if snapshot.has(rel)]
+    stack = [rel for rel in graph if rel.endswith((".js", ".mjs"))]
+    while stack:
+        for target in static_imports(snapshot, stack.pop()):
+            if target not in graph:
+                graph.append(target)
+                stack.append(target)
+    return graph
+
+
+def inject_modulepreloads(snapshot: DistSnapshot, planned: list[str]) -> bool:
+    """Rewrite dist/index.html with one modulepreload per planned chunk; True when it changed.
+
+    Links go in a marked block before </head> (replacing the block from a
+    previous run) and reuse the entry script's URL prefix, e.g. /xm-player/.
+    """
+    original = snapshot.index_html
+    if original is None:
+        return False
+    html = strip_generated_preloads(original)
+    entry_hrefs = MODULE_SCRIPT_RE.findall(html)
+    prefix = f"/{PROJECT_NAME}/"
+    for href in entry_hrefs:
+        rel = resolve_asset_href(href)
+        if href.endswith(rel):
+            prefix = href[: len(href) - len(rel)]
+            break
+    if planned:
+        links = [f'<link rel="modulepreload" crossorigin href="{prefix}{rel}">' for rel in planned]
+        at = html.lower().find("</head>")
+        if at == -1:
+            at = html.find(entry_hrefs[0]) if entry_hrefs else 0
+            at = html.rfind("<", 0, at) if at > 0 else 0
+        line_start = html.rfind("\n", 0, at) + 1
+        if html[line_start:at].strip():
+            block = PRELOAD_BEGIN + "".join(links) + PRELOAD_END  # </head> shares a line: stay inline
+            html = html[:at] + block + html[at:]
+        else:
+            indent = "    "
+            block = "".join(f"{indent}{line}\n" for line in [PRELOAD_BEGIN, *links, PRELOAD_END])
+            html = html[:line_start] + block + html[line_start:]
+    if html == original:
+        return False
+    write_atomic(snapshot.root / "index.html", html.encode("utf-8"))
+    snapshot.refresh(["index.html"])
+    return True
+
+
+def validate_preloads(snapshot: DistSnapshot) -> None:
+    """Every modulepreload/preload href in index.html must exist in dist/."""
+    missing = [href for href in snapshot.preload_hrefs if not snapshot.has(resolve_asset_href(href))]
+    if missing:
+        print("ERROR: index.html preloads files missing from dist/:")
+        for href in missing:
+            print(f"  - {href}")
+        print("\nRebuild with:  npm run build:xm-player:verify")
+        sys.exit(1)
+    if snapshot.preload_hrefs:
+        print(f"  ✓ {len(snapshot.preload_hrefs)} preload(s) exist in dist/")
+
+
+def validate_build_base_path(snapshot: DistSnapshot) -> None:
     """Warn when dist was built without the /xm-player/ base path (breaks CSS/JS on deploy)."""
-    index_html = build_path / "index.html"
-    if not index_html.is_file():
+    html = snapshot.index_html
+    if html is None:
         return
-    html = index_html.read_text(encoding="utf-8")
+    index_html = snapshot.root / "index.html"
     expected_prefix = f"/{PROJECT_NAME}/"
     # Detect root-base builds: either classic /assets/ or the result of
     # post-build naive replaces that leave bare "assets/" in bundle refs.
@@ -167,18 +772,16 @@ def validate_build_base_path(build_path: Path) -> None:
         sys.exit(1)
 
 
-def validate_stylesheet_assets(build_path: Path) -> None:
+def validate_stylesheet_assets(snapshot: DistSnapshot) -> None:
     """Reject builds with non-.css stylesheet links or missing CSS chunks."""
-    index_html = build_path / "index.html"
-    if not index_html.is_file():
-        print(f"ERROR: missing {index_html}")
+    if not snapshot.has("index.html"):
+        print(f"ERROR: missing {snapshot.root / 'index.html'}")
         sys.exit(1)
 
-    html = index_html.read_text(encoding="utf-8")
-    if b"\x00" in index_html.read_bytes()[:128]:
+    if b"\x00" in snapshot.read_bytes("index.html")[:128]:
         print("ERROR: dist/index.html appears to be UTF-16 (NUL bytes in header)")
         sys.exit(1)
-    hrefs = STYLESHEET_RE.findall(html)
+    hrefs = snapshot.stylesheet_hrefs
     if not hrefs:
         print("ERROR: dist/index.html has no <link rel=\"stylesheet\">")
         sys.exit(1)
@@ -192,26 +795,23 @@ def validate_stylesheet_assets(build_path: Path) -> None:
             errors.append(f"stale/corrupt stylesheet name: {href}")
             continue
         rel = resolve_asset_href(href)
-        css_path = build_path / rel
-        if not css_path.is_file():
+        if not snapshot.has(rel):
             errors.append(f"stylesheet file missing: {rel}")
             continue
-        size = css_path.stat().st_size
+        size = snapshot.entries[rel].size
         if size < MIN_CSS_BYTES:
             errors.append(f"stylesheet {rel} too small ({size} bytes)")
-        head = css_path.read_bytes()[:64]
+        head = snapshot.read_bytes(rel)[:64]
         if b"\x00" in head:
             errors.append(f"stylesheet {rel} contains NUL bytes (likely UTF-16)")
 
-    assets_dir = build_path / "assets"
-    if assets_dir.is_dir():
-        stale = [f.name for f in assets_dir.iterdir() if f.suffix == ".1iss"]
-        if stale:
-            errors.append(f"stale .1iss files in dist/assets: {', '.join(stale)}")
+    stale = [rel[len("assets/") :] for rel in snapshot.under("assets/") if rel.endswith(".1iss")]
+    if stale:
+        errors.append(f"stale .1iss files in dist/assets: {', '.join(stale)}")
 
-    for href in MODULE_SCRIPT_RE.findall(html):
+    for href in snapshot.module_script_hrefs:
         rel = resolve_asset_href(href)
-        if not (build_path / rel).is_file():
+        if not snapshot.has(rel):
             errors.append(f"module script missing: {rel}")
 
     if errors:
@@ -224,40 +824,653 @@ def validate_stylesheet_assets(build_path: Path) -> None:
     print(f"  ✓ stylesheet OK ({', '.join(hrefs)})")
 
 
-def build_inventory(build_path: Path) -> dict[str, object]:
-    """Manifest of every file in dist/ plus asset prune hints for the server."""
-    files: list[str] = []
-    for file in sorted(build_path.rglob("*")):
-        if file.is_file():
-            files.append(str(file.relative_to(build_path)).replace("\\", "/"))
-    prune = collect_asset_prune_manifest(build_path, files)
+def sidecar_source(rel: str) -> Optional[str]:
+    """Source path of a .br/.gz sidecar of a compressible file, else None."""
+    stem, suffix = os.path.splitext(rel)
+    if suffix not in SIDECAR_ENCODINGS or os.path.splitext(stem)[1].lower() not in COMPRESSIBLE_SUFFIXES:
+        return None
+    return stem
+
+
+def image_variant_source(rel: str) -> Optional[str]:
+    """Source PNG of a WebP/AVIF variant written by scripts/optimize_images.py, else None."""
+    stem, suffix = os.path.splitext(rel)
+    if suffix not in IMAGE_VARIANT_SUFFIXES or not stem.lower().endswith(".png"):
+        return None
+    return stem
+
+
+def sidecar_suffixes() -> tuple[str, ...]:
+    return tuple(SIDECAR_ENCODINGS) if brotli is not None else (".gz",)
+
+
+def compress_sidecar(data: bytes, suffix: str) -> bytes:
+    if suffix == ".br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def decompress_sidecar(data: bytes, suffix: str) -> bytes:
+    return brotli.decompress(data) if suffix == ".br" else gzip.decompress(data)
+
+
+def write_sidecars(
+    snapshot: DistSnapshot, *, only: Optional[Collection[str]] = None, workers: Optional[int] = None
+) -> dict[str, int]:
+    """Write .br/.gz next to every compressible file in dist/ (or just ``only``) at maximum level.
+
+    Payloads are cached in the DeployCache by source content hash, so an
+    unchanged chunk is copied from cache instead of recompressed. Sidecars no
+    smaller than their source are not written. Stale ones (source gone or no
+    longer worth compressing) are removed only when the DeployCache records
+    that this function wrote them: authored files such as data.json.gz are
+    never deleted, and without a cache nothing is. The snapshot is refreshed
+    for every sidecar written or removed. Returns per-outcome counts.
+    """
+    cache = snapshot.cache
+    suffixes = sidecar_suffixes()
+    sources = [
+        rel
+        for rel, entry in snapshot.entries.items()
+        if os.path.splitext(rel)[1].lower() in COMPRESSIBLE_SUFFIXES
+        and entry.size >= SIDECAR_MIN_BYTES
+        and (only is None or rel in only)
+    ]
+    touched: list[str] = []
+
+    def sidecars_for(rel: str) -> list[str]:
+        entry = snapshot.entries[rel]
+        digest = snapshot.sha256(rel)
+        data: Optional[bytes] = None
+        outcomes: list[str] = []
+        for suffix in suffixes:
+            payload = cache.load_sidecar(digest, suffix) if cache is not None else None
+            outcome = "cached"
+            if payload is None:
+                if data is None:
+                    data = entry.path.read_bytes()
+                payload = compress_sidecar(data, suffix)
+                outcome = "compressed"
+                if cache is not None:
+                    cache.store_sidecar(digest, suffix, payload)
+            target = entry.path.with_name(entry.path.name + suffix)
+            if len(payload) >= entry.size:
+                if cache is not None and cache.is_generated(target):
+                    target.unlink(missing_ok=True)
+                    cache.mark_generated(target, False)
+                    touched.append(rel + suffix)
+                outcomes.append("skipped")
+                continue
+            if not (target.is_file() and target.stat().st_size == len(payload) and target.read_bytes() == payload):
+                write_atomic(target, payload)
+                touched.append(rel + suffix)
+            if cache is not None:
+                cache.mark_generated(target)
+                st = target.stat()
+                cache.store_hash(
+                    DistEntry(rel + suffix, target, st.st_size, st.st_mtime_ns, st.st_mode),
+                    hashlib.sha256(payload).hexdigest(),
+                )
+            outcomes.append(outcome)
+        return outcomes
+
+    counts: collections.Counter[str] = collections.Counter()
+    with ThreadPoolExecutor(max_workers=max(1, workers or ZIP_WORKERS)) as pool:
+        for outcomes in pool.map(sidecars_for, sources):
+            counts.update(outcomes)
+    wanted = {rel + suffix for rel in sources for suffix in suffixes}
+    for rel, entry in snapshot.entries.items():
+        source = sidecar_source(rel)
+        if source is None or rel in wanted or (only is not None and source not in only):
+            continue
+        if cache is not None and cache.is_generated(entry.path):
+            entry.path.unlink(missing_ok=True)
+            cache.mark_generated(entry.path, False)
+            touched.append(rel)
+            counts["removed"] += 1
+    snapshot.refresh(touched)
+    return dict(counts)
+
+
+def validate_sidecars(snapshot: DistSnapshot) -> None:
+    """Reject builds whose .br/.gz sidecars are orphaned or do not decompress to their source.
+
+    A .gz/.br with no source file is only an orphan when write_sidecars()
+    wrote it; otherwise it is an authored file (data.json.gz fetched as is).
+    """
+    cache = snapshot.cache
+    pairs = [
+        (rel, source)
+        for rel in snapshot.entries
+        if (source := sidecar_source(rel)) is not None
+        and (snapshot.has(source) or (cache is not None and cache.is_generated(snapshot.entries[rel].path)))
+    ]
+    if not pairs:
+        return
+
+    def check(pair: tuple[str, str]) -> Optional[str]:
+        rel, source = pair
+        suffix = os.path.splitext(rel)[1]
+        if not snapshot.has(source):
+            return f"sidecar {rel} has no source file {source}"
+        if suffix == ".br" and brotli is None:
+            return None
+        try:
+            data = decompress_sidecar(snapshot.entries[rel].path.read_bytes(), suffix)
+        except Exception as exc:
+            return f"sidecar {rel} does not decompress ({exc})"
+        if hashlib.sha256(data).hexdigest() != snapshot.sha256(source):
+            return f"sidecar {rel} does not match {source}"
+        return None
+
+    with ThreadPoolExecutor(max_workers=ZIP_WORKERS) as pool:
+        errors = [err for err in pool.map(check, pairs) if err]
+    if errors:
+        print("ERROR: Sidecar validation failed:")
+        for err in errors:
+            print(f"  - {err}")
+        print("\nRemove the stale sidecars or rebuild with:  npm run build:xm-player:verify")
+        sys.exit(1)
+    unchecked = "" if brotli is not None else " (.br unchecked: pip install brotli)"
+    print(f"  ✓ {len(pairs)} sidecar(s) match their sources{unchecked}")
+
+
+def is_content_hashed(rel: str, vite_files: Collection[str]) -> bool:
+    """True for files the Vite manifest lists (and their sidecars/variants): safe to cache forever."""
+    return (sidecar_source(rel) or image_variant_source(rel) or rel) in vite_files
+
+
+def build_precache_manifest(manifest: dict[str, object]) -> dict[str, object]:
+    """Precache list for public/sw.js: libopenmpt plus the entry graph (index.html and its static imports).
+
+    Hashed assets carry ``revision: null`` (the name is the revision); entry
+    files carry a content-hash revision. ``immutable`` lists every
+    content-hashed URL so the worker can serve those cache-first. ``version``
+    changes whenever either list does.
+    """
+    entries = manifest["entries"]
+    vite_files = manifest.get("viteFiles", {})
+    assert isinstance(entries, dict) and isinstance(vite_files, dict)
+    listed: list[dict[str, Optional[str]]] = []
+    for rel in dict.fromkeys([*PRECACHE_ENTRY_FILES, *manifest.get("entryGraph", [])]):
+        info = entries.get(rel)
+        if not isinstance(info, dict) or info["size"] > PRECACHE_MAX_FILE_BYTES:
+            continue
+        revision = None if is_content_hashed(rel, vite_files) else str(info["sha256"])[:16]
+        listed.append({"url": rel, "revision": revision})
+        if rel == "index.html":
+            listed.append({"url": "", "revision": revision})  # the directory URL serves index.html
+    immutable = sorted(rel for rel in vite_files if rel in entries)
+    version = hashlib.sha256(json.dumps([listed, immutable], sort_keys=True).encode("utf-8")).hexdigest()[:16]
+    return {"version": version, "entries": listed, "immutable": immutable}
+
+
+def unhashed_assets(manifest: dict[str, object]) -> list[str]:
+    """Files under assets/ the Vite manifest does not list: the static /assets/* rule must not apply to them."""
+    entries = manifest["entries"]
+    vite_files = manifest.get("viteFiles", {})
+    assert isinstance(entries, dict) and isinstance(vite_files, dict)
+    return sorted(
+        rel
+        for rel in entries
+        if rel.startswith("assets/")
+        and sidecar_source(rel) is None
+        and image_variant_source(rel) is None
+        and not is_content_hashed(rel, vite_files)
+    )
+
+
+def render_cache_headers(manifest: dict[str, object], flavor: str, dialect: str = HEADERS_DIALECT) -> str:
+    """Cache-Control block for dist/.htaccess (flavor "htaccess") or dist/_headers ("_headers").
+
+    The immutable list comes from the Vite manifest, never from file names.
+    For _headers the immutable ``/assets/*`` rule is static in public/_headers;
+    only the Cloudflare dialect can detach it for unhashed assets.
+    """
+    entries = manifest["entries"]
+    vite_files = manifest.get("viteFiles", {})
+    assert isinstance(entries, dict) and isinstance(vite_files, dict)
+    # Sidecars and image variants are only served through .htaccess rewrites; their source's rule covers them.
+    # precache-manifest.json is written alongside this block, so it is listed even before it is inventoried;
+    # sorting keeps the block independent of inventory order, so a second run rewrites nothing.
+    files = sorted(
+        {
+            rel
+            for rel in [*entries, PRECACHE_MANIFEST_NAME]
+            if Path(rel).name not in VERIFY_SKIP_NAMES
+            and sidecar_source(rel) is None
+            and image_variant_source(rel) is None
+        }
+    )
+    hashed = [rel for rel in files if is_content_hashed(rel, vite_files)]
+    lines = [CACHE_HEADERS_BEGIN]
+    if flavor == "htaccess":
+        lines += [
+            "<IfModule mod_headers.c>",
+            "  # Entry files (index.html, sw.js, precache-manifest.json, …) revalidate on every load.",
+            f'  Header set Cache-Control "{REVALIDATE_CACHE_CONTROL}"',
+            f"  # {len(hashed)} content-hashed file(s) from the Vite manifest never change under the same name.",
+        ]
+        if hashed:
+            names = "|".join(re.escape(rel) for rel in hashed)
+            lines += [
+                f'  <If "%{{REQUEST_URI}} =~ m#/(?:{names})(?:\\.br|\\.gz)?$#">',
+                f'    Header set Cache-Control "{IMMUTABLE_CACHE_CONTROL}"',
+                "  </If>",
+            ]
+        lines.append("</IfModule>")
+    else:
+        # Netlify/Cloudflare rules: one per root file or top-level directory keeps the list short.
+        if dialect == "cloudflare":
+            for rel in unhashed_assets(manifest):
+                lines += [f"/{rel}", "  ! Cache-Control", f"  Cache-Control: {REVALIDATE_CACHE_CONTROL}"]
+        patterns = dict.fromkeys(
+            f"/{rel.split('/', 1)[0]}/*" if "/" in rel else f"/{rel}" for rel in files if not rel.startswith("assets/")
+        )
+        for pattern in ["/", *patterns]:
+            lines += [pattern, f"  Cache-Control: {REVALIDATE_CACHE_CONTROL}"]
+    lines.append(CACHE_HEADERS_END)
+    return "\n".join(lines) + "\n"
+
+
+def replace_generated_block(text: str, block: str) -> str:
+    """Swap the BEGIN/END cache-header block in text for block (appended if absent)."""
+    start = text.find(CACHE_HEADERS_BEGIN)
+    end = text.find(CACHE_HEADERS_END, start)
+    if start != -1 and end != -1:
+        return text[:start] + block + text[end + len(CACHE_HEADERS_END) :].lstrip("\n")
+    return text.rstrip("\n") + "\n\n" + block
+
+
+def write_cache_artifacts(snapshot: DistSnapshot, manifest: dict[str, object]) -> list[str]:
+    """Write cache headers and the service-worker precache list into dist/ from the inventory.
+
+    Updates the generated block in .htaccess / _headers, writes
+    precache-manifest.json and stamps its version into sw.js. Returns the
+    paths whose content changed; their now-stale sidecars are removed. The
+    snapshot is refreshed for all of them.
+    """
+    if not manifest.get("viteFiles"):
+        print(f"  ⚠ no dist/{VITE_MANIFEST_NAME} (vite.config.ts build.manifest); no file is marked immutable")
+    if HEADERS_DIALECT not in ("generic", "cloudflare"):
+        print(f"  ⚠ DEPLOY_HEADERS_DIALECT={HEADERS_DIALECT!r} is not generic or cloudflare; writing generic _headers")
+    unhashed = unhashed_assets(manifest)
+    if snapshot.has("_headers") and unhashed and HEADERS_DIALECT != "cloudflare":
+        print(
+            f"  ⚠ {len(unhashed)} unhashed file(s) under assets/ get the static /assets/* immutable rule from "
+            f"_headers (only DEPLOY_HEADERS_DIALECT=cloudflare can override it): {', '.join(unhashed[:5])}"
+            + (" …" if len(unhashed) > 5 else "")
+        )
+    precache = build_precache_manifest(manifest)
+    outputs: dict[str, str] = {PRECACHE_MANIFEST_NAME: json.dumps(precache, indent=1) + "\n"}
+    for rel, flavor in ((".htaccess", "htaccess"), ("_headers", "_headers")):
+        if snapshot.has(rel):
+            outputs[rel] = replace_generated_block(snapshot.read_text(rel), render_cache_headers(manifest, flavor))
+    if snapshot.has("sw.js"):
+        sw = snapshot.read_text("sw.js")
+        stamped = PRECACHE_VERSION_RE.sub(f"const PRECACHE_VERSION = '{precache['version']}';", sw)
+        if stamped == sw and not PRECACHE_VERSION_RE.search(sw):
+            print("  ⚠ sw.js has no PRECACHE_VERSION line; browsers will not notice precache updates")
+        outputs["sw.js"] = stamped
+
+    changed: list[str] = []
+    for rel, text in outputs.items():
+        data = text.encode("utf-8")
+        path = snapshot.root / rel
+        if snapshot.has(rel) and snapshot.read_bytes(rel) == data:
+            continue
+        write_atomic(path, data)
+        for suffix in SIDECAR_ENCODINGS:
+            path.with_name(path.name + suffix).unlink(missing_ok=True)
+        changed.append(rel)
+    snapshot.refresh([*changed, *(rel + suffix for rel in changed for suffix in SIDECAR_ENCODINGS)])
+    return changed
+
+
+def logical_name(rel: str, vite_files: dict[str, str]) -> str:
+    """assets/index-AbCdEf12.js → vite:index.html (its Vite manifest name), so a chunk can be followed across builds."""
+    return vite_files.get(rel, rel)
+
+
+def gzip_size(snapshot: DistSnapshot, rel: str) -> int:
+    """Bytes on the wire with gzip: the .gz sidecar when there is one, else compressed on the fly."""
+    if snapshot.has(rel + ".gz"):
+        return snapshot.entries[rel + ".gz"].size
+    entry = snapshot.entries[rel]
+    if os.path.splitext(rel)[1].lower() not in COMPRESSIBLE_SUFFIXES:
+        return entry.size
+    return min(entry.size, len(gzip.compress(snapshot.read_bytes(rel), compresslevel=GZIP_LEVEL, mtime=0)))
+
+
+def measure_payload(snapshot: DistSnapshot) -> dict[str, Any]:
+    """Raw and gzip size per logical asset name, plus the startup payload index.html pulls in."""
+    assets: dict[str, dict[str, int]] = {}
+    for rel, entry in snapshot.entries.items():
+        if sidecar_source(rel) is not None or image_variant_source(rel) is not None or Path(rel).name in VERIFY_SKIP_NAMES:
+            continue
+        sizes = assets.setdefault(logical_name(rel, snapshot.vite_files), {"raw": 0, "gzip": 0, "files": 0})
+        sizes["raw"] += entry.size
+        sizes["gzip"] += gzip_size(snapshot, rel)
+        sizes["files"] += 1
+    startup_files = [rel for rel in dict.fromkeys(["index.html", *snapshot.index_refs]) if snapshot.has(rel)]
+    preloads = [resolve_asset_href(h) for h in snapshot.preload_hrefs]
+    return {
+        "assets": assets,
+        "startup": {
+            "raw": sum(snapshot.entries[rel].size for rel in startup_files),
+            "gzip": sum(gzip_size(snapshot, rel) for rel in startup_files),
+            "files": [logical_name(rel, snapshot.vite_files) for rel in startup_files],
+            "preloads": sorted(logical_name(rel, snapshot.vite_files) for rel in preloads),
+        },
+    }
+
+
+def startup_baseline_reset(previous: dict[str, Any], current: dict[str, Any]) -> bool:
+    """True when index.html preloads a different set of files than at the previous deploy.
+
+    The startup payload then changed by design, so that one deploy resets the
+    baseline instead of being gated; the next deploy compares against it.
+    """
+    return previous["startup"].get("preloads") != current["startup"]["preloads"]
+
+
+def load_size_history(path: Path = SIZE_HISTORY_PATH) -> list[dict[str, Any]]:
+    records: list[dict[str, Any]] = []
+    try:
+        lines = path.read_text(encoding="utf-8").splitlines()
+    except OSError:
+        return records
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(record, dict) and isinstance(record.get("assets"), dict):
+            records.append(record)
+    return records
+
+
+def size_history_key(target_sites: Sequence[str], args: argparse.Namespace) -> str:
+    """Which deploys a size record is compared with: the same sites and build flavor.
+
+    The flavor lists the switches that change what ships (``test`` vs
+    ``go,test:no-preload``), so skipping a stage never reads as growth.
+    """
+    sites = ",".join(sorted(target_sites))
+    flavor = [
+        name
+        for name, off in (
+            ("no-preload", args.no_preload),
+            ("no-optimize-images", args.no_optimize_images),
+            ("no-bundle-shaders", args.no_bundle_shaders),
+        )
+        if off
+    ]
+    return f"{sites}:{','.join(flavor)}" if flavor else sites
+
+
+def previous_size_record(history: list[dict[str, Any]], key: str) -> Optional[dict[str, Any]]:
+    """Newest record with the same size_history_key (other sites' deploys are not a baseline)."""
+    return next((record for record in reversed(history) if record.get("key") == key), None)
+
+
+def append_size_history(record: dict[str, object], path: Path = SIZE_HISTORY_PATH) -> None:
+    """Append one deploy's sizes, keeping the newest SIZE_HISTORY_MAX_RECORDS."""
+    records = [*load_size_history(path), record][-SIZE_HISTORY_MAX_RECORDS:]
+    write_atomic(path, "".join(json.dumps(r, sort_keys=True) + "\n" for r in records).encode("utf-8"))
+
+
+def size_regressions(
+    previous: dict[str, Any],
+    current: dict[str, Any],
+    *,
+    max_growth_pct: float = SIZE_MAX_GROWTH_PCT,
+    min_growth_kb: float = SIZE_MIN_GROWTH_KB,
+) -> list[str]:
+    """Chunks present in both deploys (and the startup total) whose gzip size grew past the budget."""
+
+    def grew(old: int, new: int) -> bool:
+        return new - old > min_growth_kb * 1024 and new > old * (1 + max_growth_pct / 100)
+
+    problems: list[str] = []
+    old_start, new_start = previous["startup"]["gzip"], current["startup"]["gzip"]
+    if not startup_baseline_reset(previous, current) and grew(old_start, new_start):
+        problems.append(f"startup payload {old_start / 1024:.1f} → {new_start / 1024:.1f} KB gzip")
+    for name, sizes in sorted(current["assets"].items()):
+        old = previous["assets"].get(name)
+        if old is not None and grew(old["gzip"], sizes["gzip"]):
+            problems.append(f"{name} {old['gzip'] / 1024:.1f} → {sizes['gzip'] / 1024:.1f} KB gzip")
+    return problems
+
+
+def print_size_diff(
+    previous: Optional[dict[str, Any]], current: dict[str, Any], *, key: str = "", limit: int = 15
+) -> None:
+    """Largest per-chunk gzip changes since the previous deploy with the same key, plus totals."""
+    startup = current["startup"]
+    total_raw = sum(s["raw"] for s in current["assets"].values())
+    total_gzip = sum(s["gzip"] for s in current["assets"].values())
+    print(
+        f"Payload: {total_raw / 1024:.1f} KB raw / {total_gzip / 1024:.1f} KB gzip total; "
+        f"startup {startup['raw'] / 1024:.1f} KB raw / {startup['gzip'] / 1024:.1f} KB gzip "
+        f"({len(startup['files'])} file(s))"
+    )
+    label = f"{key} deploy" if key else "deploy"
+    if previous is None:
+        print(f"  (no previous {label} in size history)")
+        return
+    old_assets, new_assets = previous["assets"], current["assets"]
+    changes = []
+    for name in old_assets.keys() | new_assets.keys():
+        old = old_assets.get(name, {}).get("gzip", 0)
+        new = new_assets.get(name, {}).get("gzip", 0)
+        if old != new:
+            changes.append((new - old, name, old, new))
+    startup_delta = startup["gzip"] - previous["startup"]["gzip"]
+    print(f"  vs previous {label} ({previous.get('at', '?')}): startup {startup_delta / 1024:+.1f} KB gzip")
+    if startup_baseline_reset(previous, current):
+        print("  preload set changed since the previous deploy: startup payload not gated, new baseline recorded")
+    for delta, name, old, new in sorted(changes, key=lambda c: -abs(c[0]))[:limit]:
+        status = "new" if name not in old_assets else "removed" if name not in new_assets else f"{delta / 1024:+.1f} KB"
+        print(f"    {status:>10}  {name}  ({old / 1024:.1f} → {new / 1024:.1f} KB gzip)")
+    if len(changes) > limit:
+        print(f"    … {len(changes) - limit} more changed")
+
+
+def refresh_inventory(manifest: dict[str, object], snapshot: DistSnapshot) -> None:
+    """Bring manifest file list and entries up to date with a re-walked snapshot."""
+    entries = manifest["entries"]
+    assert isinstance(entries, dict)
+    for rel in set(entries) - set(snapshot.entries):
+        del entries[rel]
+    for rel, entry in snapshot.entries.items():
+        entries[rel] = {"sha256": snapshot.sha256(rel), "size": entry.size}
+    attach_sidecar_encodings(entries)
+    manifest["files"] = snapshot.files
+
+
+def hash_file(path: Path) -> str:
+    """sha256 hex digest of a file, read in fixed-size chunks."""
+    digest = hashlib.sha256()
+    with path.open("rb") as fh:
+        for chunk in iter(lambda: fh.read(HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def build_inventory(snapshot: DistSnapshot, *, report: Optional["DeployReport"] = None) -> dict[str, object]:
+    """Manifest of every file in dist/ plus content hashes and asset prune hints."""
+    if report is None:
+        report = DeployReport()
+    with report.phase("inventory.hash") as phase:
+        entries: dict[str, dict[str, object]] = {
+            rel: {"sha256": snapshot.sha256(rel), "size": entry.size} for rel, entry in snapshot.entries.items()
+        }
+        phase.files = len(entries)
+        phase.bytes = sum(e.size for e in snapshot.entries.values())
+    attach_sidecar_encodings(entries)
+    with report.phase("inventory.prune-manifest") as phase:
+        graph = build_reference_graph(snapshot)
+        prune = collect_asset_prune_manifest(snapshot, graph)
+        phase.files = len(graph)
+        phase.detail = {"graphEdges": sum(len(targets) for targets in graph.values())}
     return {
         "project": PROJECT_NAME,
-        "files": files,
+        "files": snapshot.files,
+        "entries": entries,
         "pruneAssets": prune,
+        "referenceGraph": graph,
+        "viteFiles": snapshot.vite_files,
+        "entryGraph": entry_graph(snapshot),
     }
 
 
-def build_zip(build_path: Path) -> bytes:
-    """Zip the contents of build_path into an in-memory archive."""
-    manifest = build_inventory(build_path)
+def attach_sidecar_encodings(entries: dict[str, dict[str, object]]) -> None:
+    """Record each source's .br/.gz sidecars as ``encodings`` on its inventory entry."""
+    for info in entries.values():
+        info.pop("encodings", None)
+    for rel in entries:
+        source = sidecar_source(rel)
+        if source is not None and source in entries:
+            encodings = entries[source].setdefault("encodings", {})
+            assert isinstance(encodings, dict)
+            encodings[SIDECAR_ENCODINGS[os.path.splitext(rel)[1]]] = rel
+
+
+def fetch_remote_inventory(target_site: str, *, log: Log = print) -> Optional[dict[str, object]]:
+    """The .deploy-inventory.json left on the live site by the previous deploy, if readable."""
+    target_folder = DEPLOY_FOLDER or PROJECT_NAME
+    url = f"{live_base_url(target_site)}/{target_folder}/{INVENTORY_NAME}"
+    try:
+        resp = http_session().get(url, timeout=15, headers={"User-Agent": "mod-player-deploy-delta"})
+    except Exception as exc:
+        log(f"  Remote manifest unavailable ({exc})")
+        return None
+    if resp.status_code != 200:
+        log(f"  Remote manifest unavailable (HTTP {resp.status_code} for {url})")
+        return None
+    try:
+        remote = resp.json()
+    except ValueError:
+        log(f"  Remote manifest at {url} is not JSON")
+        return None
+    if not isinstance(remote, dict) or not isinstance(remote.get("entries"), dict):
+        # Manifests written before content hashing only list paths.
+        log("  Remote manifest has no content hashes (pre-delta deploy)")
+        return None
+    return remote
+
+
+def plan_delta(manifest: dict[str, object], remote: dict[str, object]) -> list[str]:
+    """Files in manifest whose hash or size differs from (or is absent in) remote."""
+    local_entries = manifest.get("entries", {})
+    remote_entries = remote.get("entries", {})
+    assert isinstance(local_entries, dict) and isinstance(remote_entries, dict)
+    changed: list[str] = []
+    for rel, entry in local_entries.items():
+        previous = remote_entries.get(rel)
+        if not isinstance(previous, dict) or previous.get("sha256") != entry.get("sha256"):
+            changed.append(rel)
+        elif previous.get("size") != entry.get("size"):
+            changed.append(rel)
+    return sorted(changed)
+
+
+def zip_compression_for(rel: str) -> int:
+    """ZIP_STORED for formats that are already compressed, else ZIP_DEFLATED."""
+    return zipfile.ZIP_STORED if Path(rel).suffix.lower() in STORED_SUFFIXES else zipfile.ZIP_DEFLATED
+
+
+def zip_info_for(entry: DistEntry) -> zipfile.ZipInfo:
+    """ZipInfo built from snapshot stat data (no second stat per member)."""
+    date_time = time.localtime(entry.mtime_ns / 1e9)[:6]
+    if date_time[0] < 1980:
+        date_time = (1980, 1, 1, 0, 0, 0)
+    zinfo = zipfile.ZipInfo(entry.rel, date_time)
+    zinfo.external_attr = (entry.mode & 0xFFFF) << 16
+    zinfo.file_size = entry.size
+    zinfo.compress_type = zip_compression_for(entry.rel)
+    return zinfo
+
+
+def deflate_member(snapshot: DistSnapshot, rel: str) -> tuple[int, int, bytes]:
+    """Raw-deflate one dist file for a zip member; returns (crc32, size, compressed bytes).
+
+    zlib releases the GIL while compressing, so this scales across a thread pool.
+    Contents already cached by the snapshot are reused instead of re-read, and
+    members already in the DeployCache are not recompressed at all.
+    """
+    cache = snapshot.cache
+    digest = snapshot.sha256(rel) if cache is not None else ""
+    if cache is not None:
+        hit = cache.load_member(digest)
+        if hit is not None:
+            return hit
+    compressor = zlib.compressobj(ZIP_DEFLATE_LEVEL, zlib.DEFLATED, -zlib.MAX_WBITS)
+    crc = 0
+    size = 0
+    out = io.BytesIO()
+    with snapshot.open(rel) as fh:
+        for chunk in iter(lambda: fh.read(HASH_CHUNK_BYTES), b""):
+            crc = zlib.crc32(chunk, crc)
+            size += len(chunk)
+            out.write(compressor.compress(chunk))
+    out.write(compressor.flush())
+    member = (crc, size, out.getvalue())
+    if cache is not None:
+        cache.store_member(digest, member)
+    return member
+
+
+def write_zip(
+    snapshot: DistSnapshot,
+    out: BinaryIO,
+    *,
+    manifest: Optional[dict[str, object]] = None,
+    only: Optional[set[str]] = None,
+    workers: Optional[int] = None,
+) -> None:
+    """Stream a zip of the snapshot's files into ``out``.
+
+    Already-compressed formats (STORED_SUFFIXES) are stored and copied in
+    chunks; everything else is deflated on a thread pool and appended in
+    sorted order. At most ``workers * 2`` compressed members are held in
+    memory at once, and files over PARALLEL_DEFLATE_MAX_BYTES are deflated
+    inline while they are copied. ``out`` must be seekable (see ZipStreamWriter).
+
+    ``only`` restricts the archive to those dist-relative paths (delta deploys);
+    the full manifest is always included so the server sees the complete tree.
+    """
+    if manifest is None:
+        manifest = build_inventory(snapshot)
     inventory = manifest["files"]
     assert isinstance(inventory, list)
-    buf = io.BytesIO()
-    with zipfile.ZipFile(buf, "w", compression=zipfile.ZIP_DEFLATED) as zf:
-        for file in sorted(build_path.rglob("*")):
-            if file.is_dir():
-                continue
-            rel = file.relative_to(build_path)
-            parts = rel.parts
-            if any(p in (".git", "node_modules", "__pycache__") for p in parts):
-                continue
-            zf.write(file, str(rel))
-            print(f"  + {rel}")
-        zf.writestr(
-            ".deploy-inventory.json",
-            json.dumps(manifest, indent=2),
-        )
+    workers = max(1, workers or ZIP_WORKERS)
+    members = [entry for rel, entry in snapshot.entries.items() if only is None or rel in only]
+
+    with ZipStreamWriter(out) as zf, ThreadPoolExecutor(max_workers=workers) as pool:
+        pending: collections.deque[tuple[DistEntry, Optional[Future[tuple[int, int, bytes]]]]] = collections.deque()
+
+        def flush_one() -> None:
+            entry, future = pending.popleft()
+            zinfo = zip_info_for(entry)
+            if future is None:
+                zf.add_stream(zinfo, snapshot.open(entry.rel))
+            else:
+                zf.add_compressed(zinfo, future.result())
+            print(f"  + {entry.rel}")
+
+        for entry in members:
+            future = None
+            if zip_compression_for(entry.rel) == zipfile.ZIP_DEFLATED and entry.size <= PARALLEL_DEFLATE_MAX_BYTES:
+                future = pool.submit(deflate_member, snapshot, entry.rel)
+            pending.append((entry, future))
+            while len(pending) > workers * 2:
+                flush_one()
+        while pending:
+            flush_one()
+
+        zf.add_bytes(INVENTORY_NAME, json.dumps(manifest, indent=2).encode("utf-8"))
         prune = manifest.get("pruneAssets", {})
         if isinstance(prune, dict):
             keep = prune.get("keep", [])
@@ -265,62 +1478,671 @@ def build_zip(build_path: Path) -> bytes:
                 print(f"  + .deploy-inventory.json ({len(inventory)} files, keep {len(keep)} assets)")
         else:
             print("  + .deploy-inventory.json (manifest for remote prune)")
+
+
+def build_zip(
+    snapshot: DistSnapshot,
+    *,
+    manifest: Optional[dict[str, object]] = None,
+    only: Optional[set[str]] = None,
+    workers: Optional[int] = None,
+) -> bytes:
+    """Zip the snapshot into an in-memory archive (small trees / tests)."""
+    buf = io.BytesIO()
+    write_zip(snapshot, buf, manifest=manifest, only=only, workers=workers)
     return buf.getvalue()
 
 
-def deploy_bundle(build_path: Path, *, clean: bool, target_site: str) -> bool:
-    """Zip the build and upload it as a single bundle."""
-    target_folder = DEPLOY_FOLDER or PROJECT_NAME
-    url = f"{CONTABO_BASE_URL}/api/deploy/{PROJECT_NAME}/bundle"
-    headers = {}
-    if DEPLOY_TOKEN:
-        headers["X-Deploy-Token"] = DEPLOY_TOKEN
+@contextlib.contextmanager
+def bundle_archive(
+    snapshot: DistSnapshot,
+    *,
+    manifest: Optional[dict[str, object]] = None,
+    only: Optional[set[str]] = None,
+    workers: Optional[int] = None,
+) -> Iterator[Path]:
+    """Write the bundle zip to a temp file on disk; removed on exit.
+
+    Peak memory stays at one copy buffer regardless of dist/ size, and the
+    file can be reopened by independent readers for upload.
+    """
+    fd, name = tempfile.mkstemp(prefix=f"{PROJECT_NAME}-bundle-", suffix=".zip")
+    path = Path(name)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            write_zip(snapshot, out, manifest=manifest, only=only, workers=workers)
+        yield path
+    finally:
+        path.unlink(missing_ok=True)
+
+
+class MultipartFileStream:
+    """multipart/form-data body that reads the file part from disk on demand.
+
+    Exposes ``read()`` and ``__len__`` so requests sends it with a fixed
+    Content-Length, pulling the zip through in small reads instead of
+    buffering the whole body.
+    """
+
+    def __init__(self, fields: dict[str, str], field_name: str, file_path: Path, *, filename: str, content_type: str):
+        self.boundary = f"----xm-player-deploy-{uuid.uuid4().hex}"
+        self.content_type = f"multipart/form-data; boundary={self.boundary}"
+        head = io.BytesIO()
+        for key, value in fields.items():
+            head.write(
+                f'--{self.boundary}\r\nContent-Disposition: form-data; name="{key}"\r\n\r\n{value}\r\n'.encode("utf-8")
+            )
+        head.write(
+            f'--{self.boundary}\r\nContent-Disposition: form-data; name="{field_name}"; filename="{filename}"\r\n'
+            f"Content-Type: {content_type}\r\n\r\n".encode("utf-8")
+        )
+        self._parts: list[Union[bytes, Path]] = [head.getvalue(), file_path, f"\r\n--{self.boundary}--\r\n".encode("utf-8")]
+        self._length = sum(p.stat().st_size if isinstance(p, Path) else len(p) for p in self._parts)
+        self._index = 0
+        self._offset = 0
+        self._fh: Optional[BinaryIO] = None
+
+    def __len__(self) -> int:
+        return self._length
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = HASH_CHUNK_BYTES
+        while self._index < len(self._parts):
+            part = self._parts[self._index]
+            if isinstance(part, Path):
+                if self._fh is None:
+                    self._fh = part.open("rb")
+                chunk = self._fh.read(size)
+                if chunk:
+                    return chunk
+                self._fh.close()
+                self._fh = None
+            else:
+                chunk = part[self._offset : self._offset + size]
+                if chunk:
+                    self._offset += len(chunk)
+                    return chunk
+                self._offset = 0
+            self._index += 1
+        return b""
+
+    def close(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+
+def deploy_bundle(
+    snapshot: DistSnapshot,
+    *,
+    clean: bool,
+    target_sites: Sequence[str],
+    delta: bool = False,
+    manifest: Optional[dict[str, object]] = None,
+    report: Optional[DeployReport] = None,
+) -> dict[str, bool]:
+    """Zip the build once and upload it to every target site concurrently.
 
-    print("Building zip archive...")
-    zip_bytes = build_zip(build_path)
-    print(f"Archive size: {len(zip_bytes) / 1024:.1f} KB\n")
+    With ``delta``, only files whose content hash differs from each site's
+    remote .deploy-inventory.json are zipped; sites with the same plan share
+    one archive. Falls back to a full bundle when the remote manifest is
+    missing or predates content hashes. Returns the upload result per site.
+    """
+    if report is None:
+        report = DeployReport()
+    if manifest is None:
+        manifest = build_inventory(snapshot)
+    plans: dict[str, Optional[frozenset[str]]] = {site: None for site in target_sites}
+    if delta:
+
+        def plan(site: str, log: Log) -> Optional[frozenset[str]]:
+            with report.phase(site_phase("delta-plan", site, target_sites)) as phase:
+                log("Fetching remote manifest for delta upload...")
+                remote = fetch_remote_inventory(site, log=log)
+                if remote is None:
+                    log("  Falling back to full bundle\n")
+                    return None
+                changed = plan_delta(manifest, remote)
+                phase.files = len(changed)
+                log(f"  Delta: {len(changed)} of {len(manifest['files'])} file(s) changed\n")
+                return frozenset(changed)
+
+        plans = fan_out(target_sites, plan)
+
+    groups: dict[Optional[frozenset[str]], list[str]] = {}
+    for site in target_sites:
+        groups.setdefault(plans[site], []).append(site)
+
+    with contextlib.ExitStack() as stack:
+        archives: dict[str, Path] = {}
+        for only, sites in groups.items():
+            print("Building zip archive..." if len(groups) == 1 else f"Building zip archive for {', '.join(sites)}...")
+            with report.phase("zip" if len(groups) == 1 else f"zip:{','.join(sites)}") as phase:
+                archive = stack.enter_context(
+                    bundle_archive(snapshot, manifest=manifest, only=None if only is None else set(only))
+                )
+                phase.files = len(snapshot.entries) if only is None else len(only)
+                phase.bytes = archive.stat().st_size
+            print(f"Archive size: {archive.stat().st_size / 1024:.1f} KB\n")
+            archives.update(dict.fromkeys(sites, archive))
+
+        def upload(site: str, log: Log) -> bool:
+            # Each upload opens the archive on its own handle, so sites can share one temp file.
+            with report.phase(site_phase("upload", site, target_sites)) as phase:
+                phase.bytes = archives[site].stat().st_size
+                phase.ok = upload_bundle(
+                    archives[site], clean=clean, target_site=site, delta=plans[site] is not None, log=log
+                )
+            return phase.ok
+
+        return fan_out(target_sites, upload)
+
+
+def site_phase(name: str, site: str, target_sites: Sequence[str]) -> str:
+    """Report phase name; suffixed with the site only when deploying to several."""
+    return f"{name}:{site}" if len(target_sites) > 1 else name
+
+
+def site_logger(prefix: str, lock: threading.Lock) -> Log:
+    """print() stand-in for one fan_out() site: every line gets ``prefix`` and is written whole under ``lock``."""
+
+    def log(text: str = "") -> None:
+        lines = "".join(f"{prefix}{line}\n" for line in str(text).split("\n"))
+        with lock:
+            sys.stdout.write(lines)
+            sys.stdout.flush()
+
+    return log
+
+
+_T = TypeVar("_T")
 
+
+def fan_out(target_sites: Sequence[str], fn: Callable[[str, Log], _T]) -> dict[str, _T]:
+    """Run ``fn(site, log)`` for every site concurrently; ``log`` tags each line with "[site] ".
+
+    A single site runs inline with ``log=print``. Output is routed through the
+    per-site ``log`` rather than a swapped sys.stdout, so other threads' output
+    and tracebacks are never rewritten.
+    """
+    if len(target_sites) == 1:
+        return {target_sites[0]: fn(target_sites[0], print)}
+    lock = threading.Lock()
+    loggers = {site: site_logger(f"[{site}] ", lock) for site in target_sites}
+    with ThreadPoolExecutor(max_workers=len(target_sites)) as pool:
+        return dict(zip(target_sites, pool.map(lambda site: fn(site, loggers[site]), target_sites)))
+
+
+def upload_bundle(archive: Path, *, clean: bool, target_site: str, delta: bool = False, log: Log = print) -> bool:
+    """Upload a bundle zip from disk: chunked + resumable, else one streamed POST."""
+    target_folder = DEPLOY_FOLDER or PROJECT_NAME
     data: dict[str, str] = {
         "target_folder": target_folder,
         "target_site": target_site,
     }
+    if delta:
+        # Server must not treat files absent from the zip as deleted.
+        data["delta"] = "1"
     if clean:
         data["clean"] = "1"
         data["prune_assets"] = "1"
-        print("Requesting remote asset prune before extract (clean=1)\n")
+        log("Requesting remote asset prune before extract (clean=1)\n")
 
     host = live_host_for_target(target_site)
-    print(f"Uploading bundle (target_site={target_site} → {host}/{target_folder})...")
+    log(f"Uploading bundle (target_site={target_site} → {host}/{target_folder})...")
+    session = http_session()
+    result = upload_bundle_chunked(session, archive, data, log=log)
+    if result is CHUNKED_UNSUPPORTED:
+        log("  Server has no chunked upload endpoint; sending one multipart POST")
+        result = post_bundle(session, archive, data, log=log)
+    if not isinstance(result, dict):
+        return False
+
+    log(f"  ✓ {result.get('uploaded', 0)} files uploaded")
+    if result.get("failed"):
+        log("  Failures:")
+        for f in result["failed"]:
+            log(f"    ✗ {f['path']}: {f['error']}")
+    return not result.get("failed")
+
+
+def auth_headers() -> dict[str, str]:
+    return {"X-Deploy-Token": DEPLOY_TOKEN} if DEPLOY_TOKEN else {}
+
+
+def http_session() -> requests.Session:
+    """Process-wide pooled Session shared by health, upload and live checks.
+
+    Created under a lock: fan_out() threads may ask for it at the same time.
+    """
+    global _HTTP_SESSION
+    with _HTTP_SESSION_LOCK:
+        if _HTTP_SESSION is None:
+            _HTTP_SESSION = pooled_session(VERIFY_WORKERS)
+        return _HTTP_SESSION
+
+
+def backoff_delay(attempt: int) -> float:
+    """Exponential backoff with jitter: ~0.5s, 1s, 2s, … capped at RETRY_MAX_DELAY."""
+    return min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2**attempt) * random.uniform(0.5, 1.0)
+
+
+def request_with_retry(
+    session: requests.Session, method: str, url: str, *, what: str, log: Log = print, **kwargs: Any
+) -> Optional[requests.Response]:
+    """Send a request, retrying connection errors and 429/5xx with backoff."""
+    for attempt in range(RETRY_ATTEMPTS + 1):
+        try:
+            resp = session.request(method, url, **kwargs)
+            if resp.status_code != 429 and resp.status_code < 500:
+                return resp
+            problem = f"HTTP {resp.status_code}"
+        except requests.RequestException as exc:
+            problem = str(exc)
+        if attempt == RETRY_ATTEMPTS:
+            log(f"  ✗ {what} failed after {RETRY_ATTEMPTS + 1} attempts: {problem}")
+            return None
+        delay = backoff_delay(attempt)
+        log(f"    ↻ {what}: {problem}; retry {attempt + 1}/{RETRY_ATTEMPTS} in {delay:.1f}s")
+        time.sleep(delay)
+    return None
+
+
+def post_bundle(
+    session: requests.Session, archive: Path, data: dict[str, str], *, log: Log = print
+) -> Optional[dict[str, object]]:
+    """Legacy single-request upload: one streamed multipart POST, retried whole."""
+    url = f"{CONTABO_BASE_URL}/api/deploy/{PROJECT_NAME}/bundle"
+    for attempt in range(RETRY_ATTEMPTS + 1):
+        body = MultipartFileStream(data, "bundle", archive, filename="build.zip", content_type="application/zip")
+        headers = {**auth_headers(), "Content-Type": body.content_type}
+        try:
+            response = session.post(url, data=body, headers=headers, timeout=300)
+            problem = f"HTTP {response.status_code}"
+        except requests.RequestException as exc:
+            response = None
+            problem = str(exc)
+        finally:
+            body.close()
+        if response is not None and response.status_code == 200:
+            return response.json()
+        if response is not None and response.status_code < 500:
+            log(f"  ✗ {response.status_code}: {response.text[:400]}")
+            return None
+        if attempt == RETRY_ATTEMPTS:
+            log(f"  ✗ Upload failed after {RETRY_ATTEMPTS + 1} attempts: {problem}")
+            return None
+        delay = backoff_delay(attempt)
+        log(f"    ↻ upload: {problem}; retry {attempt + 1}/{RETRY_ATTEMPTS} in {delay:.1f}s")
+        time.sleep(delay)
+    return None
+
+
+def _pending_uploads_path() -> Path:
+    return DEPLOY_CACHE_DIR / "uploads.json"
+
+
+def load_pending_upload(key: str) -> Optional[str]:
     try:
-        response = requests.post(
-            url,
-            files={"bundle": ("build.zip", zip_bytes, "application/zip")},
-            data=data,
-            headers=headers,
-            timeout=300,
+        pending = json.loads(_pending_uploads_path().read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    upload_id = pending.get(key) if isinstance(pending, dict) else None
+    return upload_id if isinstance(upload_id, str) else None
+
+
+def store_pending_upload(key: str, upload_id: Optional[str]) -> None:
+    """Remember (or forget, with None) the server upload id for a bundle so a re-run can resume."""
+    with _PENDING_UPLOADS_LOCK:
+        try:
+            pending = json.loads(_pending_uploads_path().read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            pending = {}
+        if not isinstance(pending, dict):
+            pending = {}
+        if upload_id is None:
+            pending.pop(key, None)
+        else:
+            pending[key] = upload_id
+        try:
+            write_atomic(_pending_uploads_path(), json.dumps(pending, indent=2).encode("utf-8"))
+        except OSError:
+            pass
+
+
+def query_upload_offset(session: requests.Session, url: str, *, log: Log = print) -> Optional[int]:
+    """Bytes the server has acknowledged for an upload, or None if it no longer exists."""
+    resp = request_with_retry(session, "GET", url, what="upload status", log=log, headers=auth_headers(), timeout=30)
+    if resp is None or resp.status_code != 200:
+        return None
+    offset = resp.json().get("offset")
+    return offset if isinstance(offset, int) else None
+
+
+def upload_bundle_chunked(
+    session: requests.Session,
+    archive: Path,
+    data: dict[str, str],
+    *,
+    chunk_size: int = UPLOAD_CHUNK_BYTES,
+    log: Log = print,
+) -> Union[dict[str, object], object, None]:
+    """Resumable upload: init → PUT checksummed chunks → complete.
+
+    Each chunk carries Content-Range and X-Chunk-SHA256. On a dropped
+    connection, 5xx or rejected chunk the client backs off, asks the server
+    for its acknowledged offset and resumes from there. The upload id is kept
+    in DEPLOY_CACHE_DIR/uploads.json so a re-run with the same bundle resumes
+    too. Returns the server's bundle response, None on failure, or
+    CHUNKED_UNSUPPORTED when the server only has the single-POST endpoint.
+    """
+    base = f"{CONTABO_BASE_URL}/api/deploy/{PROJECT_NAME}/upload"
+    total = archive.stat().st_size
+    digest = hash_file(archive)
+    key = f"{data['target_site']}:{data['target_folder']}:{digest}"
+
+    upload_id = load_pending_upload(key)
+    offset: Optional[int] = None
+    if upload_id is not None:
+        offset = query_upload_offset(session, f"{base}/{upload_id}", log=log)
+        if offset is not None:
+            log(f"  Resuming upload {upload_id} at {offset / 1024:.1f} of {total / 1024:.1f} KB")
+    if upload_id is None or offset is None:
+        resp = request_with_retry(
+            session,
+            "POST",
+            base,
+            what="upload init",
+            log=log,
+            json={"size": total, "sha256": digest, "filename": "build.zip"},
+            headers=auth_headers(),
+            timeout=30,
         )
-    except Exception as exc:
-        print(f"  ✗ Upload exception: {exc}")
-        return False
+        if resp is None:
+            return None
+        if resp.status_code in (404, 405):
+            return CHUNKED_UNSUPPORTED
+        if resp.status_code not in (200, 201):
+            log(f"  ✗ upload init {resp.status_code}: {resp.text[:400]}")
+            return None
+        upload_id = str(resp.json()["upload_id"])
+        offset = 0
+        store_pending_upload(key, upload_id)
 
-    if response.status_code == 200:
-        data = response.json()
-        print(f"  ✓ {data.get('uploaded', 0)} files uploaded")
-        if data.get("failed"):
-            print("  Failures:")
-            for f in data["failed"]:
-                print(f"    ✗ {f['path']}: {f['error']}")
-        return not data.get("failed")
-    else:
-        print(f"  ✗ {response.status_code}: {response.text[:400]}")
+    url = f"{base}/{upload_id}"
+    failures = 0
+    with archive.open("rb") as fh:
+        while offset < total:
+            fh.seek(offset)
+            chunk = fh.read(chunk_size)
+            headers = {
+                **auth_headers(),
+                "Content-Type": "application/octet-stream",
+                "Content-Range": f"bytes {offset}-{offset + len(chunk) - 1}/{total}",
+                "X-Chunk-SHA256": hashlib.sha256(chunk).hexdigest(),
+            }
+            try:
+                resp = session.put(url, data=chunk, headers=headers, timeout=120)
+                problem = f"HTTP {resp.status_code}"
+            except requests.RequestException as exc:
+                resp = None
+                problem = str(exc)
+            if resp is not None and resp.status_code == 200:
+                offset = int(resp.json()["offset"])
+                failures = 0
+                log(f"    ↑ {offset / 1024:.0f}/{total / 1024:.0f} KB")
+                continue
+            if resp is not None and resp.status_code in (400, 401, 403, 404, 410):
+                log(f"  ✗ chunk rejected {resp.status_code}: {resp.text[:400]}")
+                store_pending_upload(key, None)
+                return None
+            failures += 1
+            if failures > RETRY_ATTEMPTS:
+                log(f"  ✗ Upload stalled at {offset} bytes after {RETRY_ATTEMPTS} retries: {problem}")
+                return None
+            delay = backoff_delay(failures - 1)
+            log(f"    ↻ chunk at {offset}: {problem}; retry {failures}/{RETRY_ATTEMPTS} in {delay:.1f}s")
+            time.sleep(delay)
+            acked = query_upload_offset(session, url, log=log)
+            if acked is not None:
+                offset = acked
+
+    resp = request_with_retry(
+        session,
+        "POST",
+        f"{url}/complete",
+        what="upload complete",
+        log=log,
+        json=data,
+        headers=auth_headers(),
+        timeout=300,
+    )
+    if resp is None:
+        return None
+    if resp.status_code != 200:
+        log(f"  ✗ {resp.status_code}: {resp.text[:400]}")
+        if resp.status_code < 500:
+            store_pending_upload(key, None)
+        return None
+    store_pending_upload(key, None)
+    return resp.json()
+
+
+@dataclass
+class PhaseRecord:
+    """Timing and resource usage of one deploy phase."""
+
+    name: str
+    wall_s: float = 0.0
+    bytes: int = 0
+    files: int = 0
+    peak_rss_kb: Optional[int] = None
+    ok: bool = True
+    detail: dict[str, object] = field(default_factory=dict)
+
+
+def peak_rss_kb(who: int = 0) -> Optional[int]:
+    """High-water RSS in KB for this process (or children with who=RUSAGE_CHILDREN)."""
+    if resource is None:
+        return None
+    usage = resource.getrusage(who or resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KB on Linux but bytes on macOS.
+    return usage // 1024 if sys.platform == "darwin" else usage
+
+
+class DeployReport:
+    """Per-phase wall time, bytes, file counts and peak RSS for one deploy.py run."""
+
+    def __init__(self, **meta: object):
+        self.meta = meta
+        self.phases: list[PhaseRecord] = []
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[PhaseRecord]:
+        record = PhaseRecord(name)
+        started = time.perf_counter()
+        try:
+            yield record
+        except BaseException:
+            record.ok = False
+            raise
+        finally:
+            record.wall_s = time.perf_counter() - started
+            record.peak_rss_kb = peak_rss_kb()
+            self.phases.append(record)
+
+    def to_json(self) -> dict[str, object]:
+        return {
+            **self.meta,
+            "project": PROJECT_NAME,
+            "startedAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(self.started_at)),
+            "totalWallS": round(time.perf_counter() - self._started, 4),
+            "peakRssKb": peak_rss_kb(),
+            "childPeakRssKb": peak_rss_kb(resource.RUSAGE_CHILDREN) if resource is not None else None,
+            "phases": [
+                {**asdict(p), "wall_s": round(p.wall_s, 4)} for p in self.phases
+            ],
+        }
+
+    def print_summary(self) -> None:
+        if not self.phases:
+            return
+        print("\nPhase timings:")
+        for p in self.phases:
+            extra = []
+            if p.files:
+                extra.append(f"{p.files} files")
+            if p.bytes:
+                extra.append(f"{p.bytes / 1024:.1f} KB")
+                if p.wall_s > 0:
+                    extra.append(f"{p.bytes / 1024 / 1024 / p.wall_s:.1f} MB/s")
+            mark = "" if p.ok else "  ✗"
+            print(f"  {p.name:<26} {p.wall_s * 1000:>9.1f} ms  {', '.join(extra)}{mark}".rstrip())
+        rss = peak_rss_kb()
+        if rss is not None:
+            print(f"  peak RSS {rss / 1024:.1f} MB")
+
+    def write(self, path: Path) -> None:
+        write_atomic(path, (json.dumps(self.to_json(), indent=2) + "\n").encode("utf-8"))
+        print(f"Wrote deploy report to {path}")
+
+
+def build_input_files(root: Path) -> Optional[list[str]]:
+    """Tracked + untracked-but-not-ignored files that can affect the Vite build (None without git)."""
+    try:
+        out = subprocess.run(
+            ["git", "ls-files", "-z", "--cached", "--others", "--exclude-standard"],
+            cwd=root,
+            check=True,
+            capture_output=True,
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    files = set()
+    for rel in out.decode("utf-8", errors="surrogateescape").split("\0"):
+        if not rel or rel.endswith(".md") or rel.startswith(BUILD_INPUT_EXCLUDES):
+            continue
+        files.add(rel)
+    return sorted(files)
+
+
+def compute_build_fingerprint(root: Path, cache: Optional[DeployCache] = None) -> Optional[dict[str, object]]:
+    """sha256 over every build input's content hash plus VITE_*/NODE_ENV and the node version.
+
+    Content hashes come from the DeployCache stat index where possible, so an
+    unchanged tree is fingerprinted without reading file contents.
+    """
+    files = build_input_files(root)
+    if files is None:
+        return None
+    digest = hashlib.sha256()
+    for rel in files:
+        path = root / rel
+        try:
+            st = path.stat()
+        except OSError:
+            continue  # deleted but still in the index
+        if not stat.S_ISREG(st.st_mode):
+            continue
+        entry = DistEntry(rel, path, st.st_size, st.st_mtime_ns, st.st_mode)
+        content = cache.lookup_hash(entry) if cache is not None else None
+        if content is None:
+            content = hash_file(path)
+            if cache is not None:
+                cache.store_hash(entry, content)
+        digest.update(f"{rel}\0{content}\n".encode("utf-8", errors="surrogateescape"))
+    env = {k: v for k, v in sorted(os.environ.items()) if k.startswith("VITE_") or k == "NODE_ENV"}
+    try:
+        env["node"] = subprocess.run(["node", "--version"], capture_output=True, text=True, check=False).stdout.strip()
+    except OSError:
+        env["node"] = ""
+    for key, value in env.items():
+        digest.update(f"env:{key}={value}\n".encode("utf-8"))
+    return {"fingerprint": digest.hexdigest(), "inputs": len(files), "env": env}
+
+
+def build_is_current(fingerprint: dict[str, object], build_path: Path) -> bool:
+    """True when the stored fingerprint matches and dist/index.html is the one that build produced."""
+    try:
+        stored = json.loads(BUILD_FINGERPRINT_PATH.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
         return False
+    index_html = build_path / "index.html"
+    if not isinstance(stored, dict) or not index_html.is_file():
+        return False
+    return stored.get("fingerprint") == fingerprint["fingerprint"] and stored.get("distIndexSha256") == built_index_sha256(
+        index_html
+    )
 
 
-def run_build() -> None:
+def built_index_sha256(index_html: Path) -> str:
+    """sha256 of index.html as the build wrote it (ignoring deploy-time modulepreload injection)."""
+    html = index_html.read_text(encoding="utf-8", errors="surrogateescape")
+    return hashlib.sha256(strip_generated_preloads(html).encode("utf-8", errors="surrogateescape")).hexdigest()
+
+
+def optimize_images(build_path: Path, cache_dir: Optional[Path]) -> Optional[dict[str, Any]]:
+    """Run scripts/optimize_images.py over dist/ and return its JSON summary.
+
+    Returns None (images ship as built) when Pillow/NumPy are not installed
+    or the optimizer fails; its writes are atomic, so a failure never leaves
+    a half-written PNG behind.
+    """
+    if importlib.util.find_spec("PIL") is None or importlib.util.find_spec("numpy") is None:
+        print("Image optimization skipped (pip install pillow numpy)")
+        return None
+    with tempfile.TemporaryDirectory(prefix="deploy-images-") as tmp:
+        summary_path = Path(tmp) / "images.json"
+        cmd = [sys.executable, str(IMAGE_OPTIMIZER), "--root", str(build_path), "--json", str(summary_path)]
+        cmd += ["--cache-dir", str(cache_dir)] if cache_dir is not None else ["--no-cache"]
+        result = subprocess.run(cmd, check=False)
+        if result.returncode != 0 or not summary_path.is_file():
+            print("WARNING: scripts/optimize_images.py failed; shipping images as built")
+            return None
+        return json.loads(summary_path.read_text(encoding="utf-8"))
+
+
+def bundle_shaders(build_path: Path) -> Optional[dict[str, Any]]:
+    """Run scripts/bundle_wgsl.py over dist/shaders/*.wgsl in place and return its JSON summary.
+
+    Bundling is idempotent, so a dist/ reused by a skipped build is left as is.
+    Exits on failure: a shader the bundler cannot parse must not ship half-processed.
+    """
+    shader_dir = build_path / "shaders"
+    shaders = sorted(str(p) for p in shader_dir.glob("*.wgsl"))
+    if not shaders:
+        return None
+    with tempfile.TemporaryDirectory(prefix="deploy-shaders-") as tmp:
+        summary_path = Path(tmp) / "shaders.json"
+        cmd = [sys.executable, str(SHADER_BUNDLER), *shaders, "--out", str(shader_dir), "--json", str(summary_path)]
+        if subprocess.run(cmd, check=False).returncode != 0:
+            print("ERROR: scripts/bundle_wgsl.py failed (deploy with --no-bundle-shaders to ship them unprocessed)")
+            sys.exit(1)
+        return json.loads(summary_path.read_text(encoding="utf-8"))
+
+
+def run_build(*, force: bool = False, cache: Optional[DeployCache] = None) -> bool:
+    """npm run build:xm-player + verify:build unless the input fingerprint is unchanged.
+
+    Returns True when the build ran, False when it was skipped.
+    """
+    root = Path(__file__).resolve().parent
+    build_path = root / BUILD_DIR
+    fingerprint = compute_build_fingerprint(root, cache)
+    if fingerprint is not None and not force and build_is_current(fingerprint, build_path):
+        print(
+            f"Build inputs unchanged ({fingerprint['inputs']} files, fingerprint "
+            f"{str(fingerprint['fingerprint'])[:12]}); skipping npm build + verify:build"
+        )
+        return False
+
     print("Running npm run build:xm-player ...")
     result = subprocess.run(
         ["npm", "run", "build:xm-player"],
-        cwd=Path(__file__).resolve().parent,
+        cwd=root,
         check=False,
     )
     if result.returncode != 0:
@@ -328,12 +2150,21 @@ def run_build() -> None:
         sys.exit(1)
     result = subprocess.run(
         ["npm", "run", "verify:build"],
-        cwd=Path(__file__).resolve().parent,
+        cwd=root,
         check=False,
     )
     if result.returncode != 0:
         sys.exit(1)
 
+    if fingerprint is not None and (build_path / "index.html").is_file():
+        record = {
+            **fingerprint,
+            "distIndexSha256": built_index_sha256(build_path / "index.html"),
+            "builtAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        }
+        write_atomic(BUILD_FINGERPRINT_PATH, (json.dumps(record, indent=2) + "\n").encode("utf-8"))
+    return True
+
 
 def main() -> None:
     parser = argparse.ArgumentParser(
@@ -342,13 +2173,15 @@ def main() -> None:
     parser.add_argument(
         "--no-build",
         action="store_true",
-        help="Skip npm run build:xm-player:verify (upload existing dist/ only)",
+        help="Skip npm run build:xm-player:verify (upload existing dist/ only). "
+        "Without it the build is still skipped when build inputs are unchanged.",
     )
     parser.add_argument(
         "--site",
-        choices=("test", "go"),
         default=None,
-        help="Deploy target site: test (test.1ink.us) or go (go.1ink.us). "
+        metavar="SITE[,SITE]",
+        help="Deploy target site(s): test (test.1ink.us), go (go.1ink.us), or a comma list "
+        "like test,go to build once and upload to each concurrently. "
         "Default from DEPLOY_TARGET env or 'test'.",
     )
     prune_group = parser.add_mutually_exclusive_group()
@@ -362,18 +2195,150 @@ def main() -> None:
         action="store_true",
         help="Skip remote asset prune (upload only)",
     )
+    parser.add_argument(
+        "--delta",
+        action="store_true",
+        default=os.getenv("DEPLOY_DELTA", "0") == "1",
+        help="Upload only files changed since the remote .deploy-inventory.json "
+        "(default from DEPLOY_DELTA=1)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help=f"Ignore the hash/compression cache in {DEPLOY_CACHE_DIR.name}/ (rehash and recompress everything)",
+    )
+    parser.add_argument(
+        "--no-verify",
+        action="store_true",
+        help="Skip post-deploy verification of every shipped file",
+    )
+    parser.add_argument(
+        "--verify-only",
+        action="store_true",
+        help="Only verify the live site against local dist/ (no build, no upload)",
+    )
+    parser.add_argument(
+        "--verify-url",
+        default=None,
+        help="Base URL to verify instead of https://<host>/xm-player "
+        "(e.g. http://127.0.0.1:8000 for python -m http.server -d dist)",
+    )
+    parser.add_argument(
+        "--verify-hash",
+        action="store_true",
+        help="Download every live file and compare sha256 (default: HEAD size/ETag check)",
+    )
+    parser.add_argument(
+        "--no-preload",
+        action="store_true",
+        help="Do not inject <link rel=modulepreload> for the entry chunk's static imports into index.html",
+    )
+    parser.add_argument(
+        "--preload-depth",
+        type=int,
+        default=PRELOAD_MAX_DEPTH,
+        metavar="N",
+        help=f"Static import levels below the entry chunk to preload (default {PRELOAD_MAX_DEPTH}, env DEPLOY_PRELOAD_DEPTH)",
+    )
+    parser.add_argument(
+        "--preload-budget-kb",
+        type=int,
+        default=PRELOAD_BUDGET_BYTES >> 10,
+        metavar="KB",
+        help=f"Stop adding preloads past this many KB (default {PRELOAD_BUDGET_BYTES >> 10}, env DEPLOY_PRELOAD_KB)",
+    )
+    parser.add_argument(
+        "--no-optimize-images",
+        action="store_true",
+        help="Ship dist/ PNGs as built (skip recompression and .webp/.avif variants)",
+    )
+    parser.add_argument(
+        "--no-bundle-shaders",
+        action="store_true",
+        help="Ship dist/shaders/*.wgsl as synced (skip dead-code elimination and minification)",
+    )
+    parser.add_argument(
+        "--no-sidecars",
+        action="store_true",
+        help="Do not write .br/.gz sidecars for compressible files (existing ones are still validated)",
+    )
+    parser.add_argument(
+        "--size-max-growth-pct",
+        type=float,
+        default=SIZE_MAX_GROWTH_PCT,
+        metavar="PCT",
+        help="Fail when a chunk or the startup payload grows by more than PCT%% gzip "
+        f"vs the previous deploy (default {SIZE_MAX_GROWTH_PCT:g}, env DEPLOY_SIZE_MAX_GROWTH_PCT)",
+    )
+    parser.add_argument(
+        "--size-min-growth-kb",
+        type=float,
+        default=SIZE_MIN_GROWTH_KB,
+        metavar="KB",
+        help="…and by more than KB gzip, so small files cannot trip the gate "
+        f"(default {SIZE_MIN_GROWTH_KB:g}, env DEPLOY_SIZE_MIN_GROWTH_KB)",
+    )
+    parser.add_argument(
+        "--accept-size-growth",
+        action="store_true",
+        help="Report size regressions but deploy anyway (the new sizes become the baseline)",
+    )
+    parser.add_argument(
+        "--force-build",
+        action="store_true",
+        help="Run npm build even when the build input fingerprint is unchanged",
+    )
+    parser.add_argument(
+        "--report",
+        type=Path,
+        default=None,
+        metavar="OUT.json",
+        help="Write per-phase timings, bytes, file counts and peak RSS to this JSON file",
+    )
     args = parser.parse_args()
 
-    target_site = (args.site or DEPLOY_TARGET).strip().lower()
-    if target_site not in ("test", "go"):
-        print(f"ERROR: invalid target site '{target_site}' (use test or go)")
+    target_sites: list[str] = []
+    for site in (args.site or DEPLOY_TARGET).lower().split(","):
+        site = site.strip()
+        if site not in ("test", "go"):
+            print(f"ERROR: invalid target site '{site}' (use test, go or test,go)")
+            sys.exit(1)
+        if site not in target_sites:
+            target_sites.append(site)
+    if args.verify_url and len(target_sites) > 1:
+        print("ERROR: --verify-url applies to a single --site")
         sys.exit(1)
-    host = live_host_for_target(target_site)
 
-    print(f"\n=== Deploying '{PROJECT_NAME}' via Contabo -> {host}/xm-player ===\n")
+    report = DeployReport(site=",".join(target_sites), delta=args.delta, verifyOnly=args.verify_only)
+    success = False
+    try:
+        success = run_deploy(args, target_sites, report)
+    finally:
+        report.meta["success"] = success
+        report.print_summary()
+        if args.report is not None:
+            report.write(args.report)
+    sys.exit(0 if success else 1)
 
-    if not args.no_build:
-        run_build()
+
+def run_deploy(args: argparse.Namespace, target_sites: Sequence[str], report: DeployReport) -> bool:
+    """Build, validate, upload and verify; each step is recorded as a report phase.
+
+    Build, validation, inventory and zip run once; upload and verification
+    run per site, concurrently when there are several.
+    """
+    hosts = ", ".join(f"{live_host_for_target(site)}/xm-player" for site in target_sites)
+    action = "Verifying" if args.verify_only else "Deploying"
+    print(f"\n=== {action} '{PROJECT_NAME}' via Contabo -> {hosts} ===\n")
+
+    cache = None if args.no_cache else DeployCache(DEPLOY_CACHE_DIR)
+    if not args.no_build and not args.verify_only:
+        with report.phase("build") as phase:
+            phase.detail = {"skipped": not run_build(force=args.force_build, cache=cache)}
+            if cache is not None:
+                # Fingerprint lookups are not dist/ hits; keep inventory stats about dist/ only.
+                phase.detail.update(cacheHits=cache.hits, cacheMisses=cache.misses)
+                cache.hits = cache.misses = 0
 
     build_path = Path(BUILD_DIR)
     if not build_path.exists() or not build_path.is_dir():
@@ -381,11 +2346,104 @@ def main() -> None:
         print("Run:  npm run build:xm-player:verify")
         sys.exit(1)
 
-    validate_build_base_path(build_path)
+    if not args.verify_only and not args.no_optimize_images:
+        with report.phase("optimize-images") as phase:
+            images = optimize_images(build_path, None if cache is None else DEPLOY_CACHE_DIR / "images")
+            if images is not None:
+                phase.files = len(images["files"])
+                phase.bytes = images["bytesBefore"] - images["bytesAfter"]
+                phase.detail = {"cached": sum(1 for f in images["files"] if f["cached"])}
+
+    if not args.verify_only and not args.no_bundle_shaders:
+        with report.phase("bundle-shaders") as phase:
+            bundled = bundle_shaders(build_path)
+            if bundled is not None:
+                phase.files = len(bundled["shaders"])
+                phase.bytes = bundled["flatBytes"] - bundled["bytes"]
+
+    with report.phase("snapshot") as phase:
+        snapshot = DistSnapshot(build_path, cache=cache)
+        phase.files = len(snapshot.entries)
+    with report.phase("validate-base-path") as phase:
+        validate_build_base_path(snapshot)
     print("Validating stylesheet assets...")
-    validate_stylesheet_assets(build_path)
+    with report.phase("validate-stylesheets"):
+        validate_stylesheet_assets(snapshot)
+    if not args.verify_only and not args.no_preload:
+        with report.phase("modulepreload") as phase:
+            planned = plan_modulepreloads(
+                snapshot, max_depth=args.preload_depth, budget_bytes=args.preload_budget_kb << 10
+            )
+            inject_modulepreloads(snapshot, planned)
+            phase.files = len(planned)
+            phase.bytes = sum(snapshot.entries[rel].size for rel in planned)
+        print(
+            f"Startup modulepreload: {len(planned)} chunk(s), {phase.bytes / 1024:.1f} KB "
+            f"(depth ≤ {args.preload_depth}, budget {args.preload_budget_kb} KB)"
+        )
+    with report.phase("validate-preloads"):
+        validate_preloads(snapshot)
+    if not args.verify_only and not args.no_sidecars:
+        with report.phase("sidecars") as phase:
+            counts = write_sidecars(snapshot)
+            phase.files = counts.get("compressed", 0)
+            phase.detail = counts
+        encodings = "br + gzip" if brotli is not None else "gzip only (pip install brotli for .br)"
+        print(f"Precompressed sidecars ({encodings}): " + ", ".join(f"{n} {k}" for k, n in sorted(counts.items())))
+    with report.phase("validate-sidecars"):
+        validate_sidecars(snapshot)
+
+    with report.phase("inventory") as phase:
+        manifest = build_inventory(snapshot, report=report)
+        phase.files = len(snapshot.entries)
+        phase.bytes = sum(e.size for e in snapshot.entries.values())
+        if cache is not None:
+            phase.detail = {"cacheHits": cache.hits, "cacheMisses": cache.misses}
+    if not args.verify_only:
+        with report.phase("cache-headers") as phase:
+            changed = write_cache_artifacts(snapshot, manifest)
+            if changed:
+                if not args.no_sidecars:
+                    write_sidecars(snapshot, only=changed)
+                refresh_inventory(manifest, snapshot)
+            phase.files = len(changed)
+        precache = build_precache_manifest(manifest)
+        print(
+            f"Cache headers + {PRECACHE_MANIFEST_NAME} (version {precache['version']}, "
+            f"{len(precache['entries'])} URL(s)): {', '.join(changed) or 'unchanged'}"
+        )
+    if args.verify_only:
+        verified = fan_out(target_sites, lambda site, log: verify_site(args, manifest, site, target_sites, report, log))
+        report.meta["sites"] = verified
+        return all(verified.values())
 
-    manifest = build_inventory(build_path)
+    with report.phase("size-history") as phase:
+        size_key = size_history_key(target_sites, args)
+        previous = previous_size_record(load_size_history(), size_key)
+        sizes = measure_payload(snapshot)
+        print()
+        print_size_diff(previous, sizes, key=size_key)
+        regressions = (
+            size_regressions(
+                previous, sizes, max_growth_pct=args.size_max_growth_pct, min_growth_kb=args.size_min_growth_kb
+            )
+            if previous is not None
+            else []
+        )
+        phase.files = len(sizes["assets"])
+        phase.detail = {"startupGzip": sizes["startup"]["gzip"], "regressions": regressions}
+        if regressions:
+            print(
+                f"\n{'⚠' if args.accept_size_growth else 'ERROR:'} payload grew past the size budget "
+                f"(>{args.size_max_growth_pct:g}% and >{args.size_min_growth_kb:g} KB gzip):"
+            )
+            for problem in regressions:
+                print(f"  - {problem}")
+            if not args.accept_size_growth:
+                print("\nRe-run with --accept-size-growth if the growth is intended.")
+                phase.ok = False
+                return False
+    print()
     prune_info = manifest.get("pruneAssets", {})
     if isinstance(prune_info, dict):
         keep = prune_info.get("keep", [])
@@ -393,9 +2451,14 @@ def main() -> None:
             print(f"Asset prune manifest: keep {len(keep)} file(s) under assets/")
             for path in keep:
                 print(f"    · {path}")
+        unreachable = prune_info.get("unreachable", [])
+        if isinstance(unreachable, list) and unreachable:
+            print(f"  {len(unreachable)} asset(s) not named by any shipped file (kept; remove them from the build if unused):")
+            for path in unreachable:
+                print(f"    ✗ {path}")
 
     try:
-        health = requests.get(f"{CONTABO_BASE_URL}/api/deploy/health", timeout=10)
+        health = http_session().get(f"{CONTABO_BASE_URL}/api/deploy/health", timeout=10)
         if health.status_code == 200:
             print(f"Contabo deploy service: {health.json().get('status', 'unknown')}")
     except Exception:
@@ -408,7 +2471,34 @@ def main() -> None:
     else:
         clean = os.getenv("DEPLOY_CLEAN", "1") != "0"
     print()
-    success = deploy_bundle(build_path, clean=clean, target_site=target_site)
+    uploaded = deploy_bundle(
+        snapshot,
+        clean=clean,
+        target_sites=target_sites,
+        delta=args.delta,
+        manifest=manifest,
+        report=report,
+    )
+    report.meta["sites"] = dict(uploaded)
+    if len(target_sites) > 1:
+        print("\nUpload results:")
+        for site, ok in uploaded.items():
+            print(f"  {'✓' if ok else '✗'} {site} ({live_host_for_target(site)})")
+    success = all(uploaded.values())
+    if success:
+        append_size_history(
+            {
+                "at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                "key": size_key,
+                "sites": list(target_sites),
+                "delta": args.delta,
+                **sizes,
+            }
+        )
+    if cache is not None:
+        cache.retain(snapshot)
+        cache.save()
+        print(f"Deploy cache: {cache.hits} hash hit(s), {cache.misses} miss(es)")
 
     if success:
         if clean:
@@ -422,30 +2512,62 @@ def main() -> None:
             )
 
     print(f"\n=== {'Deployment complete' if success else 'Deployment finished with errors'} ===")
-    if success:
-        verify_live_directory_index(build_path, target_site=target_site)
-    sys.exit(0 if success else 1)
+    live_sites = [site for site, ok in uploaded.items() if ok]
+
+    def check_site(site: str, log: Log) -> bool:
+        with report.phase(site_phase("live-index", site, target_sites)):
+            verify_live_directory_index(snapshot, target_site=site, log=log)
+        if args.no_verify:
+            return True
+        return verify_site(args, manifest, site, target_sites, report, log)
+
+    if live_sites:
+        verified = fan_out(live_sites, check_site)
+        report.meta["sites"] = {site: ok and verified.get(site, False) for site, ok in uploaded.items()}
+        success = success and all(verified.values())
+    return success
+
+
+def verify_site(
+    args: argparse.Namespace,
+    manifest: dict[str, object],
+    site: str,
+    target_sites: Sequence[str],
+    report: DeployReport,
+    log: Log = print,
+) -> bool:
+    """verify_live_assets for one site, on its own session when sites are checked in parallel."""
+    with report.phase(site_phase("verify-assets", site, target_sites)) as phase:
+        session = pooled_session(VERIFY_WORKERS) if len(target_sites) > 1 else None
+        phase.ok = verify_live_assets(
+            manifest,
+            target_site=site,
+            base_url=args.verify_url,
+            full_hash=args.verify_hash,
+            session=session,
+            log=log,
+        )
+        entries = manifest.get("entries", {})
+        phase.files = len(entries) if isinstance(entries, dict) else 0
+    return phase.ok
 
 
-def verify_live_directory_index(build_path: Path, *, target_site: str = "test") -> None:
+def verify_live_directory_index(snapshot: DistSnapshot, *, target_site: str = "test", log: Log = print) -> None:
     """Warn when the live directory URL serves a different bundle than index.html."""
-    index_html = build_path / "index.html"
-    if not index_html.is_file():
-        return
-    expected_scripts = MODULE_SCRIPT_RE.findall(index_html.read_text(encoding="utf-8"))
+    expected_scripts = snapshot.module_script_hrefs
     if not expected_scripts:
         return
     expected = expected_scripts[0]
     host = live_host_for_target(target_site)
-    live_url = f"https://{host}/xm-player/"
+    live_url = f"{live_base_url(target_site)}/xm-player/"
     try:
-        resp = requests.get(live_url, timeout=15, headers={"User-Agent": "mod-player-deploy-verify"})
+        resp = http_session().get(live_url, timeout=15, headers={"User-Agent": "mod-player-deploy-verify"})
         if resp.status_code != 200:
-            print(f"\n⚠ Live check: {live_url} returned HTTP {resp.status_code}")
+            log(f"\n⚠ Live check: {live_url} returned HTTP {resp.status_code}")
             return
         charset = resp.headers.get("content-type", "")
         if "utf-16" in charset.lower():
-            print(
+            log(
                 "\n⚠ LIVE MISMATCH: /xm-player/ is served as UTF-16 (stale directory index). "
                 "Browsers load the OLD bundle and XM/MOD audio breaks.\n"
                 "  Fix: redeploy with DEPLOY_CLEAN=1, ensure .htaccess DirectoryIndex is active,\n"
@@ -456,15 +2578,140 @@ def verify_live_directory_index(build_path: Path, *, target_site: str = "test")
             found = re.search(r"index-[A-Za-z0-9_-]+\.js", body)
             found_name = found.group(0) if found else "(none)"
             expected_name = re.search(r"index-[A-Za-z0-9_-]+\.js", expected)
-            print(
+            log(
                 f"\n⚠ LIVE MISMATCH: /xm-player/ references {found_name} "
                 f"but dist/index.html has {expected_name.group(0) if expected_name else expected}.\n"
                 f"  Users visiting {host}/xm-player/ get the OLD app until the server index is replaced."
             )
         else:
-            print(f"\n✓ Live directory index references current bundle ({expected})")
+            log(f"\n✓ Live directory index references current bundle ({expected})")
     except Exception as exc:
-        print(f"\n⚠ Live directory index check skipped: {exc}")
+        log(f"\n⚠ Live directory index check skipped: {exc}")
+
+
+@dataclass
+class AssetCheck:
+    """Outcome of one live verification request."""
+
+    rel: str
+    ok: bool
+    status: int
+    latency: float
+    bytes: int = 0  # body bytes downloaded (GET+sha256 mode only)
+    problem: str = ""
+
+
+def check_live_asset(
+    session: requests.Session, base_url: str, rel: str, expected: dict[str, object], *, full_hash: bool
+) -> AssetCheck:
+    """HEAD (or GET + sha256 with ``full_hash``) one shipped file and compare it to the inventory."""
+    url = f"{base_url}/{urllib.parse.quote(rel)}"
+    size = expected.get("size")
+    digest = expected.get("sha256")
+    headers = {"User-Agent": "mod-player-deploy-verify", "Accept-Encoding": "identity"}
+    started = time.perf_counter()
+    try:
+        if full_hash:
+            hasher = hashlib.sha256()
+            received = 0
+            with session.get(url, headers=headers, stream=True, timeout=30) as resp:
+                if resp.status_code != 200:
+                    return AssetCheck(rel, False, resp.status_code, time.perf_counter() - started, problem="HTTP error")
+                for chunk in resp.iter_content(HASH_CHUNK_BYTES):
+                    hasher.update(chunk)
+                    received += len(chunk)
+            latency = time.perf_counter() - started
+            if hasher.hexdigest() != digest:
+                return AssetCheck(rel, False, 200, latency, received, "content hash differs")
+            return AssetCheck(rel, True, 200, latency, received)
+
+        resp = session.head(url, headers=headers, allow_redirects=True, timeout=15)
+        if resp.status_code in (405, 501):
+            # HEAD not allowed: a one-byte ranged GET still reports the full size.
+            resp = session.get(url, headers={**headers, "Range": "bytes=0-0"}, timeout=15)
+            resp.close()
+        latency = time.perf_counter() - started
+        if resp.status_code not in (200, 206):
+            return AssetCheck(rel, False, resp.status_code, latency, problem="HTTP error")
+        live_size: Optional[int] = None
+        content_range = resp.headers.get("Content-Range", "")
+        if resp.status_code == 206 and "/" in content_range:
+            total = content_range.rsplit("/", 1)[1]
+            live_size = int(total) if total.isdigit() else None
+        elif resp.headers.get("Content-Length", "").isdigit() and not resp.headers.get("Content-Encoding"):
+            live_size = int(resp.headers["Content-Length"])
+        if live_size is not None and live_size != size:
+            return AssetCheck(rel, False, resp.status_code, latency, problem=f"size {live_size} != {size}")
+        etag = resp.headers.get("ETag", "").strip('W/"')
+        if len(etag) == 64 and all(c in "0123456789abcdef" for c in etag.lower()) and etag.lower() != digest:
+            return AssetCheck(rel, False, resp.status_code, latency, problem="ETag hash differs")
+        return AssetCheck(rel, True, resp.status_code, latency)
+    except requests.RequestException as exc:
+        return AssetCheck(rel, False, 0, time.perf_counter() - started, problem=str(exc))
+
+
+def verify_live_assets(
+    manifest: dict[str, object],
+    *,
+    target_site: str = "test",
+    base_url: Optional[str] = None,
+    workers: int = VERIFY_WORKERS,
+    full_hash: bool = False,
+    session: Optional[requests.Session] = None,
+    log: Log = print,
+) -> bool:
+    """Check every inventory entry against the live host concurrently.
+
+    Uses a bounded thread pool over one pooled Session. Sizes come from HEAD
+    (falling back to a one-byte ranged GET); ``full_hash`` downloads each
+    file and compares sha256 instead. Prints failures plus a latency and
+    throughput summary; returns False when any file is missing or differs.
+    """
+    entries = manifest.get("entries", {})
+    assert isinstance(entries, dict)
+    if base_url is None:
+        base_url = f"{live_base_url(target_site)}/{DEPLOY_FOLDER or PROJECT_NAME}"
+    base_url = base_url.rstrip("/")
+    targets = sorted(rel for rel in entries if Path(rel).name not in VERIFY_SKIP_NAMES)
+    if not targets:
+        return True
+    if session is None:
+        session = http_session()
+    mode = "GET+sha256" if full_hash else "HEAD"
+    log(f"\nVerifying {len(targets)} live file(s) at {base_url}/ ({mode}, {workers} workers)...")
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(
+            pool.map(lambda rel: check_live_asset(session, base_url, rel, entries[rel], full_hash=full_hash), targets)
+        )
+    elapsed = time.perf_counter() - started
+
+    failures = [r for r in results if not r.ok]
+    for r in failures:
+        status = f"HTTP {r.status}" if r.status else "no response"
+        log(f"  ✗ {r.rel}: {r.problem} ({status})")
+    latencies = sorted(r.latency for r in results)
+    p50 = latencies[len(latencies) // 2]
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    transferred = sum(r.bytes for r in results)
+    elapsed = max(elapsed, 1e-9)
+    throughput = f"{len(results) / elapsed:.0f} req/s"
+    if transferred:
+        throughput += f", {transferred / 1024 / 1024 / elapsed:.1f} MB/s"
+    log(
+        f"  {'✓' if not failures else '⚠'} {len(results) - len(failures)}/{len(results)} OK in {elapsed:.2f}s "
+        f"({throughput}); latency p50 {p50 * 1000:.0f} ms, p95 {p95 * 1000:.0f} ms, max {latencies[-1] * 1000:.0f} ms"
+    )
+    return not failures
+
+
+def pooled_session(pool_size: int) -> requests.Session:
+    """Session whose connection pool can serve ``pool_size`` concurrent requests."""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
 
 
 if __name__ == "__main__":
@@ -0,0 +1,183 @@
+"""
+deploy_zip.py — zip writer for deploy.py bundles
+
+zipfile has no public way to append a member that was deflated elsewhere
+(deploy.py compresses members on a thread pool and caches them in
+.deploy-cache/), so the bundle is laid out here from the format spec
+(PKWARE APPNOTE 4.3). Archives read back with the stdlib zipfile module.
+"""
+
+from __future__ import annotations
+
+import struct
+import time
+import zipfile
+import zlib
+from typing import BinaryIO
+
+ZIP_DEFLATE_LEVEL = 6  # zlib default, same as zipfile.ZIP_DEFLATED without compresslevel
+ZIP64_LIMIT = (1 << 31) - 1  # sizes/offsets past this need ZIP64 records (same threshold as zipfile)
+ZIP_MAX_32 = 0xFFFFFFFF
+COPY_CHUNK_BYTES = 1 << 20
+
+
+class ZipStreamWriter:
+    """Zip archive writer that accepts members deflated outside zipfile (see deploy.deflate_member).
+
+    Each member is a local header plus data, followed by the central directory
+    and end records, with ZIP64 extensions past 2 GiB. ZipInfo is only used
+    for its public fields. ``out`` must be seekable: streamed members have
+    their CRC and sizes patched into the local header once the data is written.
+    """
+
+    LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")
+    CENTRAL_HEADER = struct.Struct("<IHHHHHHIIIHHHHHII")
+    END_RECORD = struct.Struct("<IHHHHIIH")
+    ZIP64_END_RECORD = struct.Struct("<IQHHIIQQQQ")
+    ZIP64_LOCATOR = struct.Struct("<IIQI")
+    ZIP64_LOCAL_EXTRA = struct.Struct("<HHQQ")  # uncompressed, compressed size
+    ZIP64_CENTRAL_EXTRA = struct.Struct("<HHQQQ")  # uncompressed, compressed size, header offset
+    UTF8_FLAG = 0x800
+    VERSION = 20
+    ZIP64_VERSION = 45
+    CREATE_SYSTEM_UNIX = 3  # external_attr carries st_mode in its high 16 bits
+
+    def __init__(self, out: BinaryIO):
+        self.out = out
+        self.base = out.tell()
+        self.members: list[tuple[zipfile.ZipInfo, int]] = []
+
+    def __enter__(self) -> "ZipStreamWriter":
+        return self
+
+    def __exit__(self, exc_type: object, *_exc: object) -> None:
+        if exc_type is None:
+            self.close()
+
+    @staticmethod
+    def _dos_time(zinfo: zipfile.ZipInfo) -> tuple[int, int]:
+        year, month, day, hour, minute, second = zinfo.date_time
+        return (hour << 11) | (minute << 5) | (second // 2), ((year - 1980) << 9) | (month << 5) | day
+
+    def _name(self, zinfo: zipfile.ZipInfo) -> tuple[bytes, int]:
+        try:
+            return zinfo.filename.encode("ascii"), 0
+        except UnicodeEncodeError:
+            return zinfo.filename.encode("utf-8"), self.UTF8_FLAG
+
+    def _local_header(self, zinfo: zipfile.ZipInfo, zip64: bool) -> bytes:
+        name, flags = self._name(zinfo)
+        dostime, dosdate = self._dos_time(zinfo)
+        sizes = (ZIP_MAX_32, ZIP_MAX_32) if zip64 else (zinfo.compress_size, zinfo.file_size)
+        extra = self.ZIP64_LOCAL_EXTRA.pack(1, 16, zinfo.file_size, zinfo.compress_size) if zip64 else b""
+        header = self.LOCAL_HEADER.pack(
+            0x04034B50,
+            self.ZIP64_VERSION if zip64 else self.VERSION,
+            flags,
+            zinfo.compress_type,
+            dostime,
+            dosdate,
+            zinfo.CRC,
+            *sizes,
+            len(name),
+            len(extra),
+        )
+        return header + name + extra
+
+    def add_compressed(self, zinfo: zipfile.ZipInfo, member: tuple[int, int, bytes]) -> None:
+        """Append a pre-deflated member given as (crc32, uncompressed size, raw deflate bytes)."""
+        crc, size, payload = member
+        zinfo.compress_type = zipfile.ZIP_DEFLATED
+        zinfo.CRC = crc
+        zinfo.file_size = size
+        zinfo.compress_size = len(payload)
+        offset = self.out.tell() - self.base
+        self.out.write(self._local_header(zinfo, max(size, len(payload)) > ZIP64_LIMIT))
+        self.out.write(payload)
+        self.members.append((zinfo, offset))
+
+    def add_stream(self, zinfo: zipfile.ZipInfo, src_file: BinaryIO) -> None:
+        """Copy a file into the archive in chunks, stored or deflated per zinfo.compress_type."""
+        # Sizes are only final after the copy; reserve the ZIP64 extra up front when they could need it.
+        zip64 = zinfo.file_size * 1.05 > ZIP64_LIMIT
+        zinfo.CRC = zinfo.compress_size = 0
+        offset = self.out.tell() - self.base
+        self.out.write(self._local_header(zinfo, zip64))
+        compressor = (
+            zlib.compressobj(ZIP_DEFLATE_LEVEL, zlib.DEFLATED, -zlib.MAX_WBITS)
+            if zinfo.compress_type == zipfile.ZIP_DEFLATED
+            else None
+        )
+        crc = size = written = 0
+        with src_file as src:
+            for chunk in iter(lambda: src.read(COPY_CHUNK_BYTES), b""):
+                crc = zlib.crc32(chunk, crc)
+                size += len(chunk)
+                data = compressor.compress(chunk) if compressor is not None else chunk
+                self.out.write(data)
+                written += len(data)
+        if compressor is not None:
+            tail = compressor.flush()
+            self.out.write(tail)
+            written += len(tail)
+        if not zip64 and max(size, written) > ZIP64_LIMIT:
+            raise RuntimeError(f"{zinfo.filename} grew past {ZIP64_LIMIT} bytes while being zipped")
+        zinfo.CRC, zinfo.file_size, zinfo.compress_size = crc, size, written
+        end = self.out.tell()
+        self.out.seek(self.base + offset)
+        self.out.write(self._local_header(zinfo, zip64))
+        self.out.seek(end)
+        self.members.append((zinfo, offset))
+
+    def add_bytes(self, name: str, data: bytes) -> None:
+        """Append an in-memory file, deflated, stamped with the current time (like ZipFile.writestr)."""
+        zinfo = zipfile.ZipInfo(name, time.localtime()[:6])
+        zinfo.external_attr = 0o600 << 16
+        compressor = zlib.compressobj(ZIP_DEFLATE_LEVEL, zlib.DEFLATED, -zlib.MAX_WBITS)
+        self.add_compressed(zinfo, (zlib.crc32(data), len(data), compressor.compress(data) + compressor.flush()))
+
+    def close(self) -> None:
+        """Write the central directory and end-of-archive records."""
+        start = self.out.tell() - self.base
+        for zinfo, offset in self.members:
+            name, flags = self._name(zinfo)
+            dostime, dosdate = self._dos_time(zinfo)
+            zip64 = max(zinfo.file_size, zinfo.compress_size, offset) > ZIP64_LIMIT
+            if zip64:
+                extra = self.ZIP64_CENTRAL_EXTRA.pack(1, 24, zinfo.file_size, zinfo.compress_size, offset)
+                sizes = (ZIP_MAX_32, ZIP_MAX_32, ZIP_MAX_32)
+            else:
+                extra = b""
+                sizes = (zinfo.compress_size, zinfo.file_size, offset)
+            version = self.ZIP64_VERSION if zip64 else self.VERSION
+            header = self.CENTRAL_HEADER.pack(
+                0x02014B50,
+                (self.CREATE_SYSTEM_UNIX << 8) | version,
+                version,
+                flags,
+                zinfo.compress_type,
+                dostime,
+                dosdate,
+                zinfo.CRC,
+                sizes[0],
+                sizes[1],
+                len(name),
+                len(extra),
+                0,  # comment length
+                0,  # disk number start
+                0,  # internal attributes
+                zinfo.external_attr,
+                sizes[2],
+            )
+            self.out.write(header + name + extra)
+        end = self.out.tell() - self.base
+        count, size = len(self.members), end - start
+        if count >= 0xFFFF or size > ZIP64_LIMIT or start > ZIP64_LIMIT:
+            self.out.write(
+                self.ZIP64_END_RECORD.pack(
+                    0x06064B50, 44, self.ZIP64_VERSION, self.ZIP64_VERSION, 0, 0, count, count, size, start
+                )
+            )
+            self.out.write(self.ZIP64_LOCATOR.pack(0x07064B50, 0, end, 1))
+            count, size, start = min(count, 0xFFFF), min(size, ZIP_MAX_32), min(start, ZIP_MAX_32)
+        self.out.write(self.END_RECORD.pack(0x06054B50, 0, 0, count, count, size, start, 0))
@@ -1,25 +1,66 @@
 #!/usr/bin/env python3
-"""Generate shader thumbnail previews."""
+"""Generate shader thumbnail previews.
 
+Shaders are discovered from shaders/patternv*.wgsl. Pixel work (background
+gradient, ring pattern) is done on whole NumPy arrays and shaders are
+rendered in parallel across a process pool.
+
+shaders/thumbnails/manifest.json records the source hash of every shader
+and the generator version that rendered it, so a run only re-renders
+thumbnails whose shader changed (or are missing) and deletes thumbnails of
+shaders that no longer exist. With nothing changed a run is a directory
+listing plus a hash per shader, cheap enough to run on every build.
+
+Usage:
+  python generate-thumbnails.py                 # 96px thumbnails, changed shaders only
+  python generate-thumbnails.py --sizes 96,192  # also patternv0.21.wgsl@192.png etc.
+  python generate-thumbnails.py --force         # re-render everything
+  python generate-thumbnails.py --atlas webp    # also atlas.webp + atlas@2x.webp + atlas.json
+
+Atlas mode packs every shader's thumbnail into one sheet at 1x and 2x so
+the picker can load a single cached image instead of one request per
+shader. atlas.json maps shader name to its {x, y, w, h} rect in 1x pixels
+(multiply by 2 for the @2x sheet). The sheet is rebuilt only when a member
+shader, the member list or the atlas format changes.
+"""
+
+import argparse
+import contextlib
+import hashlib
+import io
+import json
 import os
 import math
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Optional
 
-# Try to use PIL if available, otherwise generate SVGs
+from scripts.atomic_write import write_atomic
+
+# Try to use PIL + NumPy if available, otherwise generate SVGs
 try:
-    from PIL import Image, ImageDraw
+    import numpy as np
+    from PIL import Image, ImageDraw, ImageFont
     HAS_PIL = True
 except ImportError:
     HAS_PIL = False
-    print("PIL not available, generating SVG thumbnails instead")
+    print("PIL/NumPy not available, generating SVG thumbnails instead")
+
+SHADER_DIR = Path(__file__).parent / 'shaders'
+OUTPUT_DIR = SHADER_DIR / 'thumbnails'
+SHADER_GLOB = 'patternv*.wgsl'
+MANIFEST_NAME = 'manifest.json'
+# Bump whenever render output changes so every thumbnail is re-rendered once.
+GENERATOR_VERSION = 2
+ATLAS_NAME = 'atlas'
+ATLAS_SCALES = (1, 2)
+ATLAS_FORMATS = ('png', 'webp')
 
-SHADER_NAMES = [
-    "patternv0.21", "patternv0.23", "patternv0.24", "patternv0.30",
-    "patternv0.35_bloom", "patternv0.37", "patternv0.38", "patternv0.39",
-    "patternv0.40", "patternv0.42", "patternv0.43", "patternv0.44",
-    "patternv0.45", "patternv0.45b", "patternv0.46", "patternv0.47",
-    "patternv0.48", "patternv0.49", "patternv0.50", "patternv0.51", "patternv0.55"
-]
+BASE_SIZE = 96
+# Ring radii of the 96px design (8, 24, ... 88); scaled for other sizes.
+RING_RADII = tuple(range(8, BASE_SIZE, 16))
+RING_COLOR = (200, 200, 200)
+TEXT_COLOR = (200, 200, 200)
 
 def get_color_for_shader(name: str) -> tuple[int, int, int]:
     """Generate a color based on shader name."""
@@ -57,76 +98,218 @@ def get_color_for_shader(name: str) -> tuple[int, int, int]:
     # Default colors for non-versioned shaders
     return (100, 150, 200)
 
-def generate_pil_thumbnail(name: str, output_path: str) -> None:
-    """Generate a PNG thumbnail using PIL."""
-    size = 96
-    color = get_color_for_shader(name)
+def render_thumbnail_pixels(name: str, size: int = BASE_SIZE) -> "np.ndarray":
+    """RGB uint8 array: vertical gradient of the shader colour with concentric rings."""
+    color = np.asarray(get_color_for_shader(name), dtype=np.float32)
+    scale = size / BASE_SIZE
 
-    # Create a new image
-    img = Image.new('RGB', (size, size), color='black')
-    draw = ImageDraw.Draw(img)
+    # Background gradient: row i is color * (0.5 + 0.5 * i / size), truncated like the band version.
+    shade = 0.5 + 0.5 * np.arange(size, dtype=np.float32) / size
+    img = np.floor(shade[:, None, None] * color[None, None, :]).astype(np.float32)
+    img = np.broadcast_to(img, (size, size, 3)).copy()
+
+    # Rings: anti-aliased coverage from each pixel's distance to the nearest ring radius.
+    center = size / 2
+    ys, xs = np.ogrid[:size, :size]
+    dist = np.hypot(xs + 0.5 - center, ys + 0.5 - center)
+    radii = np.asarray(RING_RADII, dtype=np.float32) * scale
+    nearest = np.min(np.abs(dist[..., None] - radii), axis=-1)
+    half_width = max(1.0, scale) / 2
+    coverage = np.clip(half_width + 0.5 - nearest, 0.0, 1.0)[..., None]
+    img += coverage * (np.asarray(RING_COLOR, dtype=np.float32) - img)
 
-    # Draw background gradient (approximated with bands)
-    for i in range(size):
-        ratio = i / size
-        r = int(color[0] * (0.5 + ratio * 0.5))
-        g = int(color[1] * (0.5 + ratio * 0.5))
-        b = int(color[2] * (0.5 + ratio * 0.5))
-        draw.line([(0, i), (size, i)], fill=(r, g, b))
-
-    # Draw a geometric pattern
-    center = size // 2
-    for i in range(0, size, 16):
-        # Draw circles
-        r = (i + 8) % size
-        if r > 0:
-            draw.ellipse(
-                [(center - r, center - r), (center + r, center + r)],
-                outline=(200, 200, 200),
-                width=1
-            )
+    return np.clip(img + 0.5, 0, 255).astype(np.uint8)
+
+def render_pil_image(name: str, size: int = BASE_SIZE) -> "Image.Image":
+    """Thumbnail pixels plus the shader name label."""
+    img = Image.fromarray(render_thumbnail_pixels(name, size), 'RGB')
 
     # Add shader name text
-    draw.text((size // 2, size - 12), name, fill=(200, 200, 200), anchor="mm")
+    draw = ImageDraw.Draw(img)
+    try:
+        font = ImageFont.load_default(size=max(10, round(10 * size / BASE_SIZE)))
+    except TypeError:  # Pillow < 10.1: fixed-size bitmap font
+        font = ImageFont.load_default()
+    draw.text((size // 2, size - round(12 * size / BASE_SIZE)), name, fill=TEXT_COLOR, anchor="mm", font=font)
+    return img
 
-    img.save(output_path, 'PNG')
-    print(f"Generated: {output_path}")
+def generate_pil_thumbnail(name: str, output_path: str, size: int = BASE_SIZE) -> str:
+    """Generate a PNG thumbnail using PIL."""
+    render_pil_image(name, size).save(output_path, 'PNG', optimize=True)
+    return output_path
 
-def generate_svg_thumbnail(name: str, output_path: str) -> None:
+def generate_svg_thumbnail(name: str, output_path: str, size: int = BASE_SIZE) -> str:
     """Generate an SVG thumbnail (saved as .svg, not .png)."""
-    size = 96
     color = get_color_for_shader(name)
 
     svg_content = f'''<?xml version="1.0" encoding="UTF-8"?>
-<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" viewBox="0 0 {size} {size}">
+<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" viewBox="0 0 {BASE_SIZE} {BASE_SIZE}">
   <defs>
     <linearGradient id="grad" x1="0%" y1="0%" x2="100%" y2="100%">
       <stop offset="0%" style="stop-color:rgb({color[0]},{color[1]},{color[2]});stop-opacity:1" />
       <stop offset="100%" style="stop-color:rgb({color[0]//2},{color[1]//2},{color[2]//2});stop-opacity:1" />
     </linearGradient>
   </defs>
-  <rect width="{size}" height="{size}" fill="url(#grad)"/>
-  <circle cx="{size//2}" cy="{size//2}" r="{size//4}" fill="none" stroke="#cccccc" stroke-width="1" opacity="0.6"/>
-  <circle cx="{size//2}" cy="{size//2}" r="{size//3}" fill="none" stroke="#cccccc" stroke-width="1" opacity="0.4"/>
-  <text x="{size//2}" y="{size - 8}" font-size="8" fill="#cccccc" text-anchor="middle" font-family="monospace">{name}</text>
+  <rect width="{BASE_SIZE}" height="{BASE_SIZE}" fill="url(#grad)"/>
+  <circle cx="{BASE_SIZE//2}" cy="{BASE_SIZE//2}" r="{BASE_SIZE//4}" fill="none" stroke="#cccccc" stroke-width="1" opacity="0.6"/>
+  <circle cx="{BASE_SIZE//2}" cy="{BASE_SIZE//2}" r="{BASE_SIZE//3}" fill="none" stroke="#cccccc" stroke-width="1" opacity="0.4"/>
+  <text x="{BASE_SIZE//2}" y="{BASE_SIZE - 8}" font-size="8" fill="#cccccc" text-anchor="middle" font-family="monospace">{name}</text>
 </svg>'''
 
     with open(output_path, 'w') as f:
         f.write(svg_content)
-    print(f"Generated: {output_path}")
+    return output_path
+
+def thumbnail_filename(name: str, size: int, ext: str) -> str:
+    """patternv0.21.wgsl.png at the base size (what the shader picker loads), patternv0.21.wgsl@192.png for others."""
+    suffix = "" if size == BASE_SIZE else f"@{size}"
+    return f"{name}.wgsl{suffix}.{ext}"
+
+def discover_shaders(shader_dir: Path = SHADER_DIR) -> dict[str, Path]:
+    """Shader name (file stem) -> path for every shaders/patternv*.wgsl."""
+    return {path.stem: path for path in sorted(shader_dir.glob(SHADER_GLOB))}
+
+def file_sha256(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+def generator_key() -> str:
+    """Version plus backend: PNG and SVG fallbacks are different outputs."""
+    return f"{GENERATOR_VERSION}-{'png' if HAS_PIL else 'svg'}"
+
+def load_manifest(output_dir: Path) -> dict:
+    """Previous run's manifest, or an empty one if missing, unreadable or from another generator."""
+    try:
+        manifest = json.loads((output_dir / MANIFEST_NAME).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(manifest, dict) or manifest.get('generator') != generator_key():
+        return {}
+    return manifest
+
+def save_manifest(output_dir: Path, shaders: dict, atlas: Optional[dict]) -> None:
+    manifest = {'generator': generator_key(), 'shaders': shaders}
+    if atlas:
+        manifest['atlas'] = atlas
+    write_atomic(output_dir / MANIFEST_NAME, (json.dumps(manifest, indent=2, sort_keys=True) + '\n').encode('utf-8'))
+
+def is_thumbnail_file(filename: str) -> bool:
+    """Files this script owns in the output directory (anything else is left alone)."""
+    return filename.startswith('patternv') and filename.endswith(('.png', '.svg'))
+
+def atlas_filenames(fmt: str) -> list[str]:
+    """atlas.webp, atlas@2x.webp, ... plus the rect map."""
+    sheets = [f"{ATLAS_NAME}{'' if scale == 1 else f'@{scale}x'}.{fmt}" for scale in ATLAS_SCALES]
+    return sheets + [f"{ATLAS_NAME}.json"]
+
+def atlas_key(shaders: dict, fmt: str) -> str:
+    """Changes when any member's source, the member list or the sheet format changes."""
+    members = sorted((name, entry["sha256"]) for name, entry in shaders.items())
+    return hashlib.sha256(json.dumps([generator_key(), fmt, ATLAS_SCALES, members]).encode('utf-8')).hexdigest()
+
+def render_tile(job: tuple[str, int]) -> "np.ndarray":
+    """Process-pool entry point: one atlas tile as an RGB array."""
+    name, size = job
+    return np.asarray(render_pil_image(name, size))
+
+def build_atlas(names: list[str], output_dir: Path, fmt: str, pool: Optional[ProcessPoolExecutor]) -> list[str]:
+    """Pack every thumbnail into a near-square grid sheet per scale and write the rect map."""
+    columns = max(1, math.ceil(math.sqrt(len(names))))
+    rows = max(1, math.ceil(len(names) / columns))
+    rects = {
+        name: {"x": (i % columns) * BASE_SIZE, "y": (i // columns) * BASE_SIZE, "w": BASE_SIZE, "h": BASE_SIZE}
+        for i, name in enumerate(names)
+    }
+    sheet_names = atlas_filenames(fmt)
+    for scale, sheet_name in zip(ATLAS_SCALES, sheet_names):
+        tile = BASE_SIZE * scale
+        sheet = np.zeros((rows * tile, columns * tile, 3), dtype=np.uint8)
+        jobs = [(name, tile) for name in names]
+        tiles = pool.map(render_tile, jobs) if pool is not None else map(render_tile, jobs)
+        for name, pixels in zip(names, tiles):
+            x, y = rects[name]["x"] * scale, rects[name]["y"] * scale
+            sheet[y:y + tile, x:x + tile] = pixels
+        buf = io.BytesIO()
+        if fmt == 'webp':
+            Image.fromarray(sheet, 'RGB').save(buf, 'WEBP', lossless=True, method=6)
+        else:
+            Image.fromarray(sheet, 'RGB').save(buf, 'PNG', optimize=True)
+        write_atomic(output_dir / sheet_name, buf.getvalue())
+    rect_map = {
+        "tile": BASE_SIZE,
+        "sheets": {f"{scale}x": sheet_name for scale, sheet_name in zip(ATLAS_SCALES, sheet_names)},
+        "width": columns * BASE_SIZE,
+        "height": rows * BASE_SIZE,
+        "frames": rects,
+    }
+    write_atomic(output_dir / sheet_names[-1], (json.dumps(rect_map, indent=2) + '\n').encode('utf-8'))
+    return sheet_names
+
+def render_job(job: tuple[str, int, str]) -> str:
+    """Process-pool entry point: render one (shader, size) thumbnail."""
+    name, size, output_dir = job
+    if HAS_PIL:
+        return generate_pil_thumbnail(name, os.path.join(output_dir, thumbnail_filename(name, size, "png")), size)
+    return generate_svg_thumbnail(name, os.path.join(output_dir, thumbnail_filename(name, size, "svg")), size)
 
 def main():
-    """Generate all shader thumbnails."""
-    output_dir = Path(__file__).parent / 'shaders' / 'thumbnails'
+    """Render thumbnails for new or changed shaders and delete orphaned ones."""
+    parser = argparse.ArgumentParser(description="Generate shader thumbnail previews")
+    parser.add_argument("--sizes", default=str(BASE_SIZE), help=f"Comma-separated pixel sizes (default {BASE_SIZE})")
+    parser.add_argument("--workers", type=int, default=0, help="Worker processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="Re-render every thumbnail, ignoring the manifest")
+    parser.add_argument("--atlas", choices=ATLAS_FORMATS, default=None, help="Also pack thumbnails into a 1x/2x sprite sheet")
+    args = parser.parse_args()
+    if args.atlas and not HAS_PIL:
+        parser.error("--atlas needs PIL and NumPy")
+    sizes = sorted({int(s) for s in args.sizes.split(",") if s.strip()})
+    ext = "png" if HAS_PIL else "svg"
+
+    output_dir = OUTPUT_DIR
     output_dir.mkdir(parents=True, exist_ok=True)
+    manifest = {} if args.force else load_manifest(output_dir)
+    previous = manifest.get("shaders", {})
+    previous_atlas = manifest.get("atlas") or {}
+    existing = {p.name for p in output_dir.iterdir() if is_thumbnail_file(p.name)}
 
-    for shader_name in SHADER_NAMES:
-        if HAS_PIL:
-            output_path = output_dir / f"{shader_name}.png"
-            generate_pil_thumbnail(shader_name, str(output_path))
-        else:
-            output_path = output_dir / f"{shader_name}.svg"
-            generate_svg_thumbnail(shader_name, str(output_path))
+    shaders: dict[str, dict] = {}
+    jobs: list[tuple[str, int, str]] = []
+    for name, path in discover_shaders().items():
+        sha256 = file_sha256(path)
+        shaders[name] = {"sha256": sha256, "files": [thumbnail_filename(name, size, ext) for size in sizes]}
+        old = previous.get(name, {})
+        done = set(old.get("files", ())) & existing if old.get("sha256") == sha256 else set()
+        jobs.extend((name, size, str(output_dir)) for size in sizes if thumbnail_filename(name, size, ext) not in done)
+    stale = sorted({name for name, _, _ in jobs})
+
+    wanted = {f for entry in shaders.values() for f in entry["files"]}
+    for orphan in sorted(existing - wanted):
+        (output_dir / orphan).unlink()
+        print(f"Removed: {output_dir / orphan}")
+
+    atlas = None
+    if args.atlas:
+        atlas = {"key": atlas_key(shaders, args.atlas), "files": atlas_filenames(args.atlas)}
+        if atlas == previous_atlas and all((output_dir / f).exists() for f in atlas["files"]):
+            atlas = dict(atlas, fresh=True)
+    # Sheets from an older --atlas format (or from a run before --atlas was dropped) are orphans too.
+    for orphan in sorted(set(previous_atlas.get("files", ())) - set(atlas["files"] if atlas else ())):
+        if (output_dir / orphan).exists():
+            (output_dir / orphan).unlink()
+            print(f"Removed: {output_dir / orphan}")
+
+    workers = max(1, min(args.workers or os.cpu_count() or 1, len(jobs) + len(shaders)))
+    with ProcessPoolExecutor(max_workers=workers) if workers > 1 else contextlib.nullcontext() as pool:
+        chunksize = max(1, math.ceil(len(jobs) / (workers * 4)))
+        for path in pool.map(render_job, jobs, chunksize=chunksize) if pool else map(render_job, jobs):
+            print(f"Generated: {path}")
+        if atlas and not atlas.pop("fresh", False):
+            for sheet_name in build_atlas(list(shaders), output_dir, args.atlas, pool):
+                print(f"Generated: {output_dir / sheet_name}")
+
+    # Written last: an interrupted run leaves the old manifest, so unfinished shaders stay stale.
+    if stale or previous != shaders or previous_atlas != (atlas or {}):
+        save_manifest(output_dir, shaders, atlas)
+    print(f"{len(shaders)} shaders: {len(stale)} rendered, {len(shaders) - len(stale)} up to date")
 
 if __name__ == '__main__':
     main()
@@ -3,16 +3,23 @@
 // Service Worker for MOD Player
 // This SW is scope-aware and works under any base path (e.g., /xm-player/)
 
-const CACHE_NAME = 'mod-player-v5';
+const CACHE_NAME = 'mod-player-v6';
+const PRECACHE_PREFIX = 'mod-player-precache-';
+// Stamped by deploy.py from precache-manifest.json so every deploy ships a byte-different worker.
+const PRECACHE_VERSION = 'dev';
 
 // Get the scope (base path) from the service worker's registration
 const getScope = () => self.registration.scope || '/';
 
+// Scope with a trailing slash
+const getBase = () => {
+  const scope = getScope();
+  return scope.endsWith('/') ? scope : scope + '/';
+};
+
 // Build precache URLs relative to the scope
 const getPrecacheUrls = () => {
-  const scope = getScope();
-  // Ensure scope ends with /
-  const base = scope.endsWith('/') ? scope : scope + '/';
+  const base = getBase();
   return [
     base,
     base + 'index.html',
@@ -21,9 +28,62 @@ const getPrecacheUrls = () => {
   ];
 };
 
+// precache-manifest.json is written by deploy.py: { version, entries: [{ url, revision }], immutable: [url] }.
+// Hashed assets have revision null and are copied from the previous precache instead of refetched.
+// The manifest itself is kept in the precache so `immutable` survives worker restarts.
+const precacheFromManifest = async () => {
+  const base = getBase();
+  const response = await fetch(base + 'precache-manifest.json', { cache: 'no-cache' });
+  if (!response.ok) throw new Error(`precache-manifest.json: HTTP ${response.status}`);
+  const manifest = await response.clone().json();
+  const cache = await caches.open(PRECACHE_PREFIX + manifest.version);
+  await Promise.all(
+    manifest.entries.map(async ({ url, revision }) => {
+      const request = new Request(base + url, { cache: revision ? 'no-cache' : 'default' });
+      if (await cache.match(request)) return;
+      const previous = revision ? undefined : await caches.match(request);
+      const fetched = previous || (await fetch(request));
+      if (!fetched.ok) throw new Error(`${url}: HTTP ${fetched.status}`);
+      await cache.put(request, fetched);
+    })
+  );
+  await cache.put(base + 'precache-manifest.json', response);
+};
+
+// Content-hashed Vite output listed by the manifest never changes under the same URL.
+let immutableUrls;
+const getImmutableUrls = () => {
+  immutableUrls ??= caches
+    .open(PRECACHE_PREFIX + PRECACHE_VERSION)
+    .then((cache) => cache.match(getBase() + 'precache-manifest.json'))
+    .then((response) => (response ? response.json() : { immutable: [] }))
+    .then((manifest) => new Set((manifest.immutable || []).map((url) => getBase() + url)))
+    .catch(() => new Set());
+  return immutableUrls;
+};
+
+const cacheFirst = (request) =>
+  caches.match(request).then((cached) => {
+    if (cached) return cached;
+    return fetch(request).then((response) => {
+      if (response.ok) {
+        const clone = response.clone();
+        caches.open(CACHE_NAME).then((cache) => cache.put(request, clone));
+      }
+      return response;
+    });
+  });
+
+const networkFirst = (request) =>
+  fetch(request).catch(() => caches.match(request).then((r) => r || new Response('Offline', { status: 503 })));
+
 self.addEventListener('install', (event) => {
   event.waitUntil(
-    caches.open(CACHE_NAME).then((cache) => cache.addAll(getPrecacheUrls()))
+    precacheFromManifest().catch((err) => {
+      // Dev server / older deploys have no manifest: fall back to the fixed list.
+      console.warn('[SW] Precache manifest unavailable, using fixed list:', err);
+      return caches.open(CACHE_NAME).then((cache) => cache.addAll(getPrecacheUrls()));
+    })
   );
   self.skipWaiting();
 });
@@ -31,7 +91,11 @@ self.addEventListener('install', (event) => {
 self.addEventListener('activate', (event) => {
   event.waitUntil(
     caches.keys().then((keys) =>
-      Promise.all(keys.filter((k) => k !== CACHE_NAME).map((k) => caches.delete(k)))
+      Promise.all(
+        keys
+          .filter((k) => k !== CACHE_NAME && k !== PRECACHE_PREFIX + PRECACHE_VERSION)
+          .map((k) => caches.delete(k))
+      )
     )
   );
   self.clients.claim();
@@ -44,23 +108,14 @@ self.addEventListener('fetch', (event) => {
   const isModuleFile = /\.(mod|xm|s3m|it|mptm|wasm)$/i.test(url.pathname);
 
   if (isLibOpenMPT || isModuleFile) {
-    // Cache-first for module files
-    event.respondWith(
-      caches.match(event.request).then((cached) => {
-        if (cached) return cached;
-        return fetch(event.request).then((response) => {
-          if (response.ok) {
-            const clone = response.clone();
-            caches.open(CACHE_NAME).then((cache) => cache.put(event.request, clone));
-          }
-          return response;
-        });
-      })
-    );
+    // Cache-first for module files and libopenmpt (precached on install)
+    event.respondWith(cacheFirst(event.request));
   } else {
-    // Network-first for everything else
+    // Cache-first for hashed assets, network-first for everything else
     event.respondWith(
-      fetch(event.request).catch(() => caches.match(event.request).then((r) => r || new Response('Offline', { status: 503 })))
+      getImmutableUrls().then((immutable) =>
+        immutable.has(url.origin + url.pathname) ? cacheFirst(event.request) : networkFirst(event.request)
+      )
     );
   }
 });
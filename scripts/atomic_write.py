@@ -0,0 +1,29 @@
+"""Crash-safe file replacement shared by deploy.py and the scripts it drives.
+
+Each write goes to a uniquely named temp file next to the target and is
+renamed over it, so readers never see a partial file and concurrent writers
+(process pools, fan-out threads) never share a temp file.
+"""
+from __future__ import annotations
+
+import os
+import tempfile
+from pathlib import Path
+from typing import Union
+
+
+def write_atomic(path: Path, data: Union[bytes, str]) -> None:
+    """Replace path with data (str is written as UTF-8), keeping its permission bits if it exists."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    mode = path.stat().st_mode & 0o777 if path.exists() else 0o644
+    payload = data.encode("utf-8") if isinstance(data, str) else data
+    fh = tempfile.NamedTemporaryFile(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp", delete=False)
+    tmp = Path(fh.name)
+    try:
+        with fh:
+            fh.write(payload)
+        os.chmod(tmp, mode)
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""End-to-end benchmark of deploy.py hot paths on synthetic Vite-like dist/ trees.
+
+For each tree size the harness generates a dist/ with index.html, hashed JS
+chunks importing each other, CSS, PNG and WASM blobs, then times the same
+stages deploy.py runs:
+
+  snapshot                   DistSnapshot walk
+  inventory.hash             content hashes (no .deploy-cache, always cold)
+  inventory.prune-manifest   reference graph + reachability
+  zip                        bundle_archive to a temp file
+  upload                     chunked upload to scripts/deploy_stub_server.py
+
+and reports wall time, files/s, MB/s, Python peak allocation (tracemalloc)
+and process peak RSS per stage. The stub runs in its own process so its
+memory is not counted against deploy.py.
+
+Usage:
+  python scripts/bench_deploy.py                          # 20, 200, 2000, 20000 files
+  python scripts/bench_deploy.py --sizes 200,2000 --json bench.json
+  python scripts/bench_deploy.py --baseline bench.json    # print wall-time change vs a previous run
+"""
+from __future__ import annotations
+
+import argparse
+import base64
+import contextlib
+import io
+import json
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Iterator, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import deploy  # noqa: E402
+
+STUB_SERVER = Path(__file__).resolve().parent / "deploy_stub_server.py"
+
+DEFAULT_SIZES = (20, 200, 2000, 20000)
+# Share of generated files per kind; JS chunks make up the rest.
+MIX = {"css": 0.04, "png": 0.15, "wasm": 0.01, "json": 0.03}
+ORPHAN_RATE = 0.05
+FILLER_WORDS = (
+    "const let return function export import await async this new class extends if else for of "
+    "while break continue switch case default typeof instanceof null undefined true false "
+    "buffer channel sample pattern row order tempo volume pan effect note instrument player"
+).split()
+
+
+def vite_hash(rng: random.Random) -> str:
+    return base64.urlsafe_b64encode(rng.randbytes(6)).decode("ascii")
+
+
+def filler_corpus(rng: random.Random, size: int = 1 << 16) -> str:
+    """Minified-JS-looking text to slice chunk bodies from (compresses like real bundles)."""
+    parts: list[str] = []
+    length = 0
+    while length < size:
+        word = rng.choice(FILLER_WORDS)
+        token = f"{word} {rng.choice(FILLER_WORDS)}{rng.randrange(100)}=" if rng.random() < 0.3 else f"{word};"
+        parts.append(token)
+        length += len(token)
+    return "".join(parts)
+
+
+def generate_dist(root: Path, n_files: int, *, seed: int = 0) -> None:
+    """Write a synthetic Vite build with about ``n_files`` files under ``root``."""
+    rng = random.Random(seed)
+    corpus = filler_corpus(rng)
+    assets = root / "assets"
+    assets.mkdir(parents=True)
+
+    def body(lo: int, hi: int) -> str:
+        size = rng.randint(lo, hi)
+        start = rng.randrange(len(corpus) - size) if size < len(corpus) else 0
+        return corpus[start : start + size]
+
+    n_assets = max(8, n_files - 3)  # index.html, sw.js, manifest.json
+    counts = {kind: max(1, int(n_assets * share)) for kind, share in MIX.items()}
+    n_js = max(2, n_assets - sum(counts.values()))
+
+    pngs = [f"img-{vite_hash(rng)}.png" for _ in range(counts["png"])]
+    wasms = [f"engine-{vite_hash(rng)}.wasm" for _ in range(counts["wasm"])]
+    jsons = [f"data-{vite_hash(rng)}.json" for _ in range(counts["json"])]
+    csses = [f"index-{vite_hash(rng)}.css"] + [f"chunk-{vite_hash(rng)}.css" for _ in range(counts["css"] - 1)]
+    chunks = [f"index-{vite_hash(rng)}.js"] + [f"chunk-{vite_hash(rng)}.js" for _ in range(n_js - 1)]
+
+    for name in pngs:
+        (assets / name).write_bytes(b"\x89PNG\r\n\x1a\n" + rng.randbytes(rng.randint(512, 64 * 1024)))
+    for name in wasms:
+        (assets / name).write_bytes(b"\0asm\x01\0\0\0" + rng.randbytes(rng.randint(64 * 1024, 512 * 1024)))
+    for name in jsons:
+        (assets / name).write_text(json.dumps({"rows": body(200, 4000)}), encoding="utf-8")
+    for i, name in enumerate(csses):
+        refs = "".join(f".i{j}{{background:url(./{png})}}" for j, png in enumerate(rng.sample(pngs, min(3, len(pngs)))))
+        size = deploy.MIN_CSS_BYTES + 2000 if i == 0 else 4000
+        (assets / name).write_text(refs + f"/*{body(size, size + 4000)}*/", encoding="utf-8")
+
+    # Chunks form a 4-ary import tree rooted at the entry; orphans have no parent (reported as unreachable).
+    linked = [0] + [i for i in range(1, len(chunks)) if rng.random() >= ORPHAN_RATE]
+    children: dict[int, list[int]] = {}
+    for pos, idx in enumerate(linked[1:], start=1):
+        children.setdefault(linked[(pos - 1) // 4], []).append(idx)
+    for i, name in enumerate(chunks):
+        imports = "".join(f'import"./{chunks[c]}";' for c in children.get(i, ()))
+        lazy = "".join(
+            f'const u{k}=new URL("./{blob}",import.meta.url);'
+            for k, blob in enumerate(rng.sample(pngs + wasms + jsons + csses[1:], 2))
+            if rng.random() < 0.3
+        )
+        (assets / name).write_text(imports + lazy + body(1000, 16 * 1024), encoding="utf-8")
+
+    (root / "index.html").write_text(
+        "<!doctype html><html><head>"
+        f'<script type="module" crossorigin src="/xm-player/assets/{chunks[0]}"></script>'
+        f'<link rel="stylesheet" crossorigin href="/xm-player/assets/{csses[0]}">'
+        "</head><body><div id=app></div></body></html>\n",
+        encoding="utf-8",
+    )
+    (root / "sw.js").write_text("const CACHE='bench';self.addEventListener('install',()=>{});\n", encoding="utf-8")
+    (root / "manifest.json").write_text(json.dumps({"name": "bench", "icons": []}), encoding="utf-8")
+
+
+class BenchReport(deploy.DeployReport):
+    """DeployReport whose phases also record Python peak allocation via tracemalloc."""
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[deploy.PhaseRecord]:
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+        with super().phase(name) as record:
+            yield record
+        if tracing:
+            record.detail["pyPeakKb"] = max(0, tracemalloc.get_traced_memory()[1] - baseline) // 1024
+
+
+@contextlib.contextmanager
+def stub_server(site_root: Path) -> Iterator[str]:
+    """Run deploy_stub_server.py on a free port in a child process; yields its base URL."""
+    proc = subprocess.Popen(
+        [sys.executable, "-u", str(STUB_SERVER), "--root", str(site_root), "--port", "0"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+    )
+    try:
+        assert proc.stdout is not None
+        for line in proc.stdout:
+            if "DEPLOY_API_URL=" in line:
+                yield line.split("=", 1)[1].strip()
+                return
+        raise RuntimeError("deploy_stub_server.py exited before printing its URL")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def bench_size(n_files: int, work: Path, *, seed: int) -> BenchReport:
+    dist = work / f"dist-{n_files}"
+    generate_dist(dist, n_files, seed=seed)
+    report = BenchReport(files=n_files)
+    with report.phase("snapshot") as phase:
+        snapshot = deploy.DistSnapshot(dist)
+        phase.files = len(snapshot.entries)
+        phase.bytes = sum(e.size for e in snapshot.entries.values())
+    manifest = deploy.build_inventory(snapshot, report=report)
+    with contextlib.ExitStack() as stack:
+        with report.phase("zip") as phase:
+            archive = stack.enter_context(deploy.bundle_archive(snapshot, manifest=manifest))
+            phase.files = len(snapshot.entries)
+            phase.bytes = archive.stat().st_size
+        with report.phase("upload") as phase:
+            phase.files = len(snapshot.entries)
+            phase.bytes = archive.stat().st_size
+            phase.ok = deploy.upload_bundle(archive, clean=True, target_site="test")
+    shutil.rmtree(dist)
+    return report
+
+
+def print_table(results: dict[int, BenchReport], baseline: Optional[dict[str, object]]) -> None:
+    print(f"\n{'files':>6}  {'stage':<26} {'wall ms':>9} {'files/s':>10} {'MB/s':>8} {'py peak MB':>10} {'RSS MB':>7}")
+    for n_files, report in results.items():
+        base_phases = {}
+        if baseline is not None:
+            base_phases = {p["name"]: p for p in baseline.get("sizes", {}).get(str(n_files), {}).get("phases", [])}
+        for p in report.phases:
+            wall = max(p.wall_s, 1e-9)
+            py_peak = p.detail.get("pyPeakKb")
+            cols = [
+                f"{n_files:>6}",
+                f"{p.name:<26}",
+                f"{p.wall_s * 1000:>9.1f}",
+                f"{p.files / wall:>10.0f}" if p.files else f"{'':>10}",
+                f"{p.bytes / 1024 / 1024 / wall:>8.1f}" if p.bytes else f"{'':>8}",
+                f"{py_peak / 1024:>10.1f}" if isinstance(py_peak, int) else f"{'':>10}",
+                f"{p.peak_rss_kb / 1024:>7.1f}" if p.peak_rss_kb is not None else f"{'':>7}",
+            ]
+            old = base_phases.get(p.name)
+            if old and old.get("wall_s"):
+                cols.append(f"{(p.wall_s / old['wall_s'] - 1) * 100:+.0f}% vs baseline")
+            if not p.ok:
+                cols.append("✗")
+            print("  ".join(cols))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark deploy.py stages on synthetic dist/ trees")
+    parser.add_argument(
+        "--sizes",
+        default=",".join(map(str, DEFAULT_SIZES)),
+        help=f"Comma-separated file counts (default {','.join(map(str, DEFAULT_SIZES))})",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic trees")
+    parser.add_argument("--json", type=Path, default=None, metavar="OUT.json", help="Write results as JSON")
+    parser.add_argument("--baseline", type=Path, default=None, help="Previous --json output to compare against")
+    parser.add_argument(
+        "--no-tracemalloc", action="store_true", help="Skip Python allocation tracking (faster, no py peak column)"
+    )
+    parser.add_argument("--verbose", action="store_true", help="Show deploy.py output for each stage")
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8")) if args.baseline else None
+
+    results: dict[int, BenchReport] = {}
+    with tempfile.TemporaryDirectory(prefix="deploy-bench-") as tmp:
+        work = Path(tmp)
+        stack = contextlib.ExitStack()
+        deploy.CONTABO_BASE_URL = stack.enter_context(stub_server(work / "sites"))
+        deploy.DEPLOY_CACHE_DIR = work / "cache"
+        if not args.no_tracemalloc:
+            tracemalloc.start()
+        with stack:
+            for n_files in sizes:
+                print(f"Benchmarking {n_files} files...", flush=True)
+                started = time.perf_counter()
+                quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+                with quiet:
+                    results[n_files] = bench_size(n_files, work, seed=args.seed)
+                print(f"  done in {time.perf_counter() - started:.1f}s")
+        tracemalloc.stop()
+
+    print_table(results, baseline)
+    if args.json is not None:
+        payload = {
+            "python": sys.version.split()[0],
+            "tracemalloc": not args.no_tracemalloc,
+            "sizes": {str(n): report.to_json() for n, report in results.items()},
+        }
+        deploy.write_atomic(args.json, (json.dumps(payload, indent=2) + "\n").encode("utf-8"))
+        print(f"\nWrote {args.json}")
+    if not all(p.ok for report in results.values() for p in report.phases):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
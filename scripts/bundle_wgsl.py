@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""Bundle WGSL shaders into one compact file each.
+
+For every input shader:
+
+  1. flatten //#include "lib/x.wgsl" directives recursively against the
+     shader source root, each file at most once (same rules as
+     scripts/sync-shaders.mjs)
+  2. drop top-level fn/struct/const/alias/var declarations nothing reachable
+     from the entry points uses; roots are @vertex/@fragment/@compute
+     functions, --entry names, every override and every @binding resource
+     (bind group layouts are built explicitly, so bindings always stay)
+  3. strip comments and whitespace that does not separate tokens
+
+Declarations are found with tier_a_strip.index_decls, so braces and
+keywords inside comments never confuse the pass. A shader without an entry
+point is only flattened and minified.
+
+Usage:
+  python scripts/bundle_wgsl.py --out dist/shaders                   # shaders/*.wgsl
+  python scripts/bundle_wgsl.py dist/shaders/*.wgsl --out dist/shaders  # in place
+  python scripts/bundle_wgsl.py shaders/patternv0.50.wgsl --out /tmp/b --no-minify
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from atomic_write import write_atomic
+from tier_a_strip import SHADERS, Decl, index_decls, skip_block_comment
+
+INCLUDE_RE = re.compile(r'^\s*//\s*#include\s+"([^"]+)"\s*$')
+COMMENT_RE = re.compile(r"//[^\n]*|/\*")
+IDENT_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+ENTRY_ATTR_RE = re.compile(r"@(?:vertex|fragment|compute)\b")
+# Identifiers and numbers; everything else is a single punctuation character.
+MIN_TOKEN_RE = re.compile(r"[A-Za-z0-9_.]+|\S")
+WORD_CHARS = frozenset("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_.")
+# Two of these separated by whitespace may not be joined: "- -x" is not "--x", "/ /" is not "//".
+OPERATOR_CHARS = frozenset("+-*/%&|^!<>=~")
+
+
+def flatten(path: Path, root: Path = SHADERS, seen: set[Path] | None = None) -> tuple[str, list[str]]:
+    """Source with includes expanded in place, plus the included files (relative to root) in order."""
+    seen = set() if seen is None else seen
+    path = path.resolve()
+    if path in seen:
+        return "", []
+    seen.add(path)
+    out: list[str] = []
+    included: list[str] = []
+    for lineno, line in enumerate(path.read_text(encoding="utf-8").split("\n"), start=1):
+        m = INCLUDE_RE.match(line)
+        if m is None:
+            out.append(line)
+            continue
+        target = (root / m.group(1)).resolve()
+        if not target.is_relative_to(root.resolve()):
+            raise ValueError(f'Include escapes source root in {path}:{lineno}: "{m.group(1)}"')
+        if not target.is_file():
+            raise ValueError(f'Unresolved include in {path}:{lineno}: "{m.group(1)}" (looked at {target})')
+        if target in seen:
+            continue
+        included.append(target.relative_to(root.resolve()).as_posix())
+        body, nested = flatten(target, root, seen)
+        included.extend(nested)
+        out.append(body[:-1] if body.endswith("\n") else body)
+    return "\n".join(out), included
+
+
+def strip_comments(text: str) -> str:
+    """Text with line and (nested) block comments replaced by a space."""
+    parts: list[str] = []
+    pos = 0
+    while (m := COMMENT_RE.search(text, pos)) is not None:
+        parts.append(text[pos : m.start()])
+        parts.append(" ")
+        pos = m.end() if m.group().startswith("//") else skip_block_comment(text, m.start())
+    parts.append(text[pos:])
+    return "".join(parts)
+
+
+def minify(code: str) -> str:
+    """Comment-free code with only the whitespace that separates tokens."""
+    out: list[str] = []
+    prev = ""
+    spaced = False
+    pos = 0
+    for m in MIN_TOKEN_RE.finditer(code):
+        tok = m.group()
+        spaced = m.start() > pos
+        pos = m.end()
+        if prev and spaced:
+            if (prev[-1] in WORD_CHARS and tok[0] in WORD_CHARS) or (prev[-1] in OPERATOR_CHARS and tok[0] in OPERATOR_CHARS):
+                out.append(" ")
+        out.append(tok)
+        prev = tok
+    return "".join(out)
+
+
+def is_root(decl: Decl, code: str, entries: set[str]) -> bool:
+    if decl.name in entries or decl.kind == "override":
+        return True
+    keyword = re.search(rf"\b{decl.kind}\b", code[decl.start : decl.end])
+    head = code[decl.start : decl.start + keyword.start()] if keyword else ""
+    if decl.kind == "fn":
+        return ENTRY_ATTR_RE.search(head) is not None
+    return decl.kind == "var" and "@binding" in head
+
+
+def live_decls(decls: list[Decl], code: str, entries: set[str]) -> list[Decl]:
+    """Declarations reachable from the roots through identifier references."""
+    by_name: dict[str, list[Decl]] = {}
+    for d in decls:
+        by_name.setdefault(d.name, []).append(d)
+    live = {id(d): d for d in decls if is_root(d, code, entries)}
+    stack = list(live.values())
+    while stack:
+        d = stack.pop()
+        for ident in set(IDENT_RE.findall(code, d.start, d.end)) - {d.name}:
+            for target in by_name.get(ident, ()):
+                if id(target) not in live:
+                    live[id(target)] = target
+                    stack.append(target)
+    return [d for d in decls if id(d) in live]
+
+
+def bundle(path: Path, *, root: Path = SHADERS, entries: set[str] = frozenset(), dce: bool = True, compact: bool = True) -> tuple[str, dict]:
+    """One self-contained, compact WGSL module for path, plus a summary of what was removed."""
+    flat, included = flatten(path, root)
+    code = strip_comments(flat)
+    decls = index_decls(code)
+    has_entry = any(is_root(d, code, entries) and d.kind == "fn" for d in decls)
+    keep = live_decls(decls, code, entries) if dce and has_entry else decls
+    kept = {id(d) for d in keep}
+
+    # Top-level text between declarations (enable/requires/diagnostic/const_assert) always stays.
+    pieces: list[str] = []
+    pos = 0
+    for d in decls:
+        if code[pos : d.start].strip():
+            pieces.append(code[pos : d.start])
+        if id(d) in kept:
+            pieces.append(code[d.start : d.end])
+        pos = d.end
+    if code[pos:].strip():
+        pieces.append(code[pos:])
+    if compact:
+        out = "\n".join(minify(p) for p in pieces) + "\n"
+    else:
+        out = "\n\n".join(p.strip("\n") for p in pieces) + "\n"
+
+    removed = [f"{d.kind} {d.name}" for d in decls if id(d) not in kept]
+    info = {
+        "file": path.name,
+        "includes": included,
+        "flatBytes": len(flat.encode()),
+        "bytes": len(out.encode()),
+        "removed": removed,
+    }
+    if dce and not has_entry:
+        info["note"] = "no entry point; dead-code elimination skipped"
+    return out, info
+
+
+def bundle_job(job: tuple[str, str, str, tuple[str, ...], bool, bool]) -> dict:
+    """Process-pool entry point: bundle one shader into the output directory."""
+    src, root, out_dir, entries, dce, compact = job
+    path = Path(src)
+    try:
+        out, info = bundle(path, root=Path(root), entries=set(entries), dce=dce, compact=compact)
+    except (OSError, ValueError) as exc:
+        return {"file": path.name, "error": str(exc)}
+    write_atomic(Path(out_dir) / path.name, out)
+    return info
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Flatten, tree-shake and minify WGSL shaders")
+    parser.add_argument("files", nargs="*", type=Path, help="Shaders to bundle (default: shaders/*.wgsl)")
+    parser.add_argument("--out", type=Path, required=True, help="Output directory (may be the input directory)")
+    parser.add_argument("--root", type=Path, default=SHADERS, help="Directory //#include paths resolve against (default shaders/)")
+    parser.add_argument("--entry", action="append", default=[], metavar="NAME", help="Extra root declaration to keep (repeatable)")
+    parser.add_argument("--no-dce", action="store_true", help="Keep unreferenced declarations")
+    parser.add_argument("--no-minify", action="store_true", help="Keep whitespace (comments are still stripped)")
+    parser.add_argument("--json", type=Path, default=None, metavar="OUT.json", help="Write a per-shader JSON summary")
+    parser.add_argument("--workers", type=int, default=0, help="Worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    files = args.files or sorted(SHADERS.glob("*.wgsl"))
+    args.out.mkdir(parents=True, exist_ok=True)
+    jobs = [
+        (str(f), str(args.root), str(args.out), tuple(args.entry), not args.no_dce, not args.no_minify)
+        for f in files
+    ]
+    workers = min(args.workers or os.cpu_count() or 1, len(jobs)) or 1
+    if workers <= 1:
+        results = list(map(bundle_job, jobs))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(bundle_job, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+
+    failed = [r for r in results if "error" in r]
+    for r in results:
+        if "error" in r:
+            print(f"  ✗ {r['file']}: {r['error']}")
+        else:
+            note = f"  ({r['note']})" if "note" in r else ""
+            print(
+                f"  {r['file']:<36} {r['flatBytes'] / 1024:>7.1f} KB -> {r['bytes'] / 1024:>6.1f} KB"
+                f"  {len(r['removed'])} unused decl(s) dropped{note}"
+            )
+    ok = [r for r in results if "error" not in r]
+    before = sum(r["flatBytes"] for r in ok)
+    after = sum(r["bytes"] for r in ok)
+    print(f"{len(ok)} shader(s): {before / 1024:.1f} KB flattened -> {after / 1024:.1f} KB bundled")
+    if args.json is not None:
+        write_atomic(args.json, json.dumps({"flatBytes": before, "bytes": after, "shaders": results}, indent=2) + "\n")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""Local stand-in for the storage.noahcohn.com deploy API (offline deploy.py testing).
+
+Implements the subset of the VPS deploy service that deploy.py talks to:
+
+  GET  /api/deploy/health                 → {"status": "ok"}
+  POST /api/deploy/<project>/bundle       → extract zip into <root>/<site>/<folder>/
+  POST /api/deploy/<project>/upload       → start a chunked upload {size, sha256} → {upload_id}
+  PUT  /api/deploy/<project>/upload/<id>  → append one chunk (Content-Range, X-Chunk-SHA256)
+  GET  /api/deploy/<project>/upload/<id>  → {"offset": acknowledged bytes}
+  POST /api/deploy/<project>/upload/<id>/complete → verify sha256, then same as /bundle
+  GET  /sites/<site>/<folder>/...         → static files (stands in for test/go.1ink.us)
+
+Usage:
+  python scripts/deploy_stub_server.py --root /tmp/deploy-stub --port 8765
+  DEPLOY_API_URL=http://127.0.0.1:8765 \\
+  DEPLOY_LIVE_URL=http://127.0.0.1:8765/sites/{site} \\
+    python deploy.py --no-build --delta
+
+Prune mirrors the server contract in docs/DEPLOY.md: with clean=1 every file
+under <folder>/assets/ not listed in the bundle's .deploy-inventory.json
+pruneAssets.keep is removed before extract. Delta bundles (delta=1) only
+overwrite the files they carry.
+
+--fail-rate injects faults into chunk PUTs so deploy.py's retry/resume path
+can be exercised: 503 responses, connections dropped mid-chunk, and chunks
+stored but never acknowledged (lost ack).
+"""
+from __future__ import annotations
+
+import argparse
+import email.parser
+import email.policy
+import io
+import hashlib
+import json
+import random
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import uuid
+import zipfile
+from dataclasses import dataclass
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional
+from urllib.parse import unquote, urlsplit
+
+INVENTORY_NAME = ".deploy-inventory.json"
+CONTENT_RANGE_RE = re.compile(r"bytes (\d+)-(\d+)/(\d+)")
+FAULTS = ("503", "drop", "lost-ack")
+
+
+@dataclass
+class PendingUpload:
+    """Server-side state of one chunked upload."""
+
+    upload_id: str
+    size: int
+    sha256: str
+    path: Path
+    offset: int = 0
+    result: Optional[dict[str, object]] = None
+
+
+def parse_multipart(content_type: str, body: bytes) -> tuple[dict[str, str], dict[str, bytes]]:
+    """Split a multipart/form-data body into (fields, files)."""
+    head = f"Content-Type: {content_type}\r\nMIME-Version: 1.0\r\n\r\n".encode("latin-1")
+    message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(head + body)
+    fields: dict[str, str] = {}
+    files: dict[str, bytes] = {}
+    for part in message.iter_parts():
+        name = part.get_param("name", header="content-disposition")
+        if not name:
+            continue
+        payload = part.get_payload(decode=True) or b""
+        if part.get_filename() is not None:
+            files[name] = payload
+        else:
+            fields[name] = payload.decode("utf-8")
+    return fields, files
+
+
+def safe_join(base: Path, rel: str) -> Optional[Path]:
+    """base/rel, or None when rel escapes base (zip-slip guard)."""
+    target = (base / rel).resolve()
+    if target != base.resolve() and base.resolve() not in target.parents:
+        return None
+    return target
+
+
+def apply_bundle(site_root: Path, bundle: bytes, fields: dict[str, str]) -> dict[str, object]:
+    """Prune (when requested) and extract one uploaded bundle; returns the API response."""
+    folder = fields.get("target_folder", "").strip("/")
+    if not folder:
+        return {"uploaded": 0, "failed": [{"path": "", "error": "missing target_folder"}]}
+    dest = site_root / fields.get("target_site", "test") / folder
+    dest.mkdir(parents=True, exist_ok=True)
+    failed: list[dict[str, str]] = []
+    uploaded = 0
+    pruned: list[str] = []
+    with zipfile.ZipFile(io.BytesIO(bundle)) as zf:
+        if fields.get("clean") == "1" and INVENTORY_NAME in zf.namelist():
+            manifest = json.loads(zf.read(INVENTORY_NAME))
+            prune = manifest.get("pruneAssets", {})
+            keep = set(prune.get("keep", [])) if isinstance(prune, dict) else set()
+            assets = dest / "assets"
+            if keep and assets.is_dir():
+                for path in sorted(assets.rglob("*")):
+                    rel = path.relative_to(dest).as_posix()
+                    if path.is_file() and rel not in keep:
+                        path.unlink()
+                        pruned.append(rel)
+        for info in zf.infolist():
+            if info.is_dir():
+                continue
+            target = safe_join(dest, info.filename)
+            if target is None:
+                failed.append({"path": info.filename, "error": "path escapes target folder"})
+                continue
+            target.parent.mkdir(parents=True, exist_ok=True)
+            with zf.open(info) as src, target.open("wb") as out:
+                shutil.copyfileobj(src, out)
+            uploaded += 1
+    return {"uploaded": uploaded, "failed": failed, "pruned": pruned, "delta": fields.get("delta") == "1"}
+
+
+class DeployStubHandler(SimpleHTTPRequestHandler):
+    """Deploy API + static hosting rooted at the server's ``site_root``."""
+
+    server: "DeployStubServer"
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002 - stdlib signature
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    def send_json(self, status: int, payload: object) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def authorized(self) -> bool:
+        token = self.server.token
+        return not token or self.headers.get("X-Deploy-Token") == token
+
+    def translate_path(self, path: str) -> str:
+        parts = unquote(urlsplit(path).path).lstrip("/").split("/")
+        if len(parts) < 2 or parts[0] != "sites":
+            return str(self.server.site_root / "__missing__")
+        target = safe_join(self.server.site_root, "/".join(parts[1:]))
+        return str(target or self.server.site_root / "__missing__")
+
+    def api_route(self) -> Optional[list[str]]:
+        """Path segments after /api/deploy/<project>/, or None for non-API paths."""
+        parts = urlsplit(self.path).path.strip("/").split("/")
+        if len(parts) < 4 or parts[:2] != ["api", "deploy"]:
+            return None
+        return parts[3:]
+
+    def read_body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length", "0")))
+
+    def pending(self, upload_id: str) -> Optional[PendingUpload]:
+        upload = self.server.uploads.get(upload_id)
+        if upload is None:
+            self.send_json(404, {"error": f"unknown upload {upload_id}"})
+        return upload
+
+    def do_GET(self) -> None:
+        if urlsplit(self.path).path == "/api/deploy/health":
+            self.send_json(200, {"status": "ok"})
+            return
+        route = self.api_route()
+        if route is not None and len(route) == 2 and route[0] == "upload":
+            upload = self.pending(route[1])
+            if upload is not None:
+                self.send_json(200, {"upload_id": upload.upload_id, "offset": upload.offset, "size": upload.size})
+            return
+        super().do_GET()
+
+    def do_POST(self) -> None:
+        route = self.api_route()
+        if route is None:
+            self.send_json(404, {"error": f"no route for {self.path}"})
+            return
+        if not self.authorized():
+            self.send_json(401, {"error": "bad deploy token"})
+            return
+        if route == ["bundle"]:
+            fields, files = parse_multipart(self.headers.get("Content-Type", ""), self.read_body())
+            bundle = files.get("bundle")
+            if bundle is None:
+                self.send_json(400, {"error": "missing bundle file"})
+                return
+            with self.server.lock:
+                result = apply_bundle(self.server.site_root, bundle, fields)
+            self.send_json(200, result)
+        elif route == ["upload"]:
+            spec = json.loads(self.read_body() or b"{}")
+            upload_id = uuid.uuid4().hex
+            path = self.server.uploads_dir / f"{upload_id}.part"
+            path.write_bytes(b"")
+            self.server.uploads[upload_id] = PendingUpload(upload_id, int(spec["size"]), str(spec["sha256"]), path)
+            self.send_json(201, {"upload_id": upload_id, "offset": 0})
+        elif len(route) == 3 and route[0] == "upload" and route[2] == "complete":
+            upload = self.pending(route[1])
+            if upload is None:
+                return
+            fields = {k: str(v) for k, v in json.loads(self.read_body() or b"{}").items()}
+            with self.server.lock:
+                if upload.result is None:
+                    bundle = upload.path.read_bytes()
+                    if upload.offset != upload.size or hashlib.sha256(bundle).hexdigest() != upload.sha256:
+                        self.send_json(409, {"error": "upload incomplete or sha256 mismatch", "offset": upload.offset})
+                        return
+                    upload.result = apply_bundle(self.server.site_root, bundle, fields)
+            self.send_json(200, upload.result)
+        else:
+            self.send_json(404, {"error": f"no route for {self.path}"})
+
+    def do_PUT(self) -> None:
+        route = self.api_route()
+        if route is None or len(route) != 2 or route[0] != "upload":
+            self.send_json(404, {"error": f"no route for {self.path}"})
+            return
+        if not self.authorized():
+            self.send_json(401, {"error": "bad deploy token"})
+            return
+        upload = self.pending(route[1])
+        if upload is None:
+            return
+        match = CONTENT_RANGE_RE.fullmatch(self.headers.get("Content-Range", ""))
+        if match is None:
+            self.send_json(400, {"error": "missing or malformed Content-Range"})
+            return
+        start = int(match.group(1))
+        fault = self.server.pick_fault()
+        if fault == "503":
+            self.read_body()
+            self.send_json(503, {"error": "injected fault"})
+            return
+        if fault == "drop":
+            # Read part of the chunk, then hang up without a response.
+            self.rfile.read(int(self.headers.get("Content-Length", "0")) // 2)
+            self.close_connection = True
+            return
+        body = self.read_body()
+        with self.server.lock:
+            if start != upload.offset:
+                self.send_json(409, {"error": "offset mismatch", "offset": upload.offset})
+                return
+            if hashlib.sha256(body).hexdigest() != self.headers.get("X-Chunk-SHA256"):
+                self.send_json(409, {"error": "chunk checksum mismatch", "offset": upload.offset})
+                return
+            with upload.path.open("ab") as out:
+                out.write(body)
+            upload.offset += len(body)
+        if fault == "lost-ack":
+            self.close_connection = True
+            return
+        self.send_json(200, {"offset": upload.offset})
+
+
+class DeployStubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: tuple[str, int],
+        site_root: Path,
+        *,
+        token: str = "",
+        quiet: bool = False,
+        fail_rate: float = 0.0,
+        seed: Optional[int] = None,
+        uploads_dir: Optional[Path] = None,
+    ):
+        super().__init__(address, DeployStubHandler)
+        self.site_root = site_root
+        self.token = token
+        self.quiet = quiet
+        self.fail_rate = fail_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.uploads: dict[str, PendingUpload] = {}
+        # Partial uploads live outside site_root so the static handler never serves them.
+        self._own_uploads_dir = uploads_dir is None
+        self.uploads_dir = Path(tempfile.mkdtemp(prefix="deploy-stub-uploads-")) if uploads_dir is None else uploads_dir
+        self.uploads_dir.mkdir(parents=True, exist_ok=True)
+
+    def server_close(self) -> None:
+        super().server_close()
+        if self._own_uploads_dir:
+            shutil.rmtree(self.uploads_dir, ignore_errors=True)
+
+    def pick_fault(self) -> Optional[str]:
+        with self.lock:
+            if self.fail_rate and self.rng.random() < self.fail_rate:
+                return self.rng.choice(FAULTS)
+        return None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def start_background(
+    site_root: Path, *, port: int = 0, token: str = "", fail_rate: float = 0.0, seed: Optional[int] = None
+) -> DeployStubServer:
+    """Start a quiet stub on a daemon thread (port 0 = pick a free port)."""
+    server = DeployStubServer(("127.0.0.1", port), site_root, token=token, quiet=True, fail_rate=fail_rate, seed=seed)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local stand-in for the storage.noahcohn.com deploy API")
+    parser.add_argument("--root", type=Path, default=None, help="Directory receiving deployed sites (default: temp dir)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--token", default="", help="Require this X-Deploy-Token (default: accept any)")
+    parser.add_argument(
+        "--fail-rate",
+        type=float,
+        default=0.0,
+        help="Probability (0-1) that a chunk PUT hits an injected fault: 503, dropped connection or lost ack",
+    )
+    parser.add_argument("--seed", type=int, default=None, help="Seed for --fail-rate fault selection")
+    args = parser.parse_args()
+
+    root = args.root or Path(tempfile.mkdtemp(prefix="deploy-stub-"))
+    root.mkdir(parents=True, exist_ok=True)
+    server = DeployStubServer((args.host, args.port), root, token=args.token, fail_rate=args.fail_rate, seed=args.seed)
+    print(f"Deploy stub serving {root}")
+    print(f"  DEPLOY_API_URL={server.base_url}")
+    print(f"  DEPLOY_LIVE_URL={server.base_url}/sites/{{site}}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,142 @@
 #!/usr/bin/env python3
-from PIL import Image
+"""Key the near-white background of bezel images to transparency.
+
+Alpha follows a soft ramp on the darkest channel of each pixel: at or above
+--threshold it is fully transparent, at or below threshold - fuzz it keeps
+its original alpha, and in between it fades linearly. Partially keyed edge
+pixels have the white background un-mixed from their colour so the edges
+don't leave a light halo over dark UI.
+
+Each input is backed up once under originals/ (public/bezel.png →
+originals/public/bezel.png, outside the served tree) and always keyed from
+that backup, so re-running with different settings is safe. Inputs named
+*.orig.* (backups left next to the image by older versions of this script)
+are skipped; such a backup is moved to originals/ on the next run.
+
+Usage:
+  python scripts/make_bezel_transparent.py                        # public/bezel.png
+  python scripts/make_bezel_transparent.py public/bezel.png public/bezel-square.png
+  python scripts/make_bezel_transparent.py --threshold 245 --fuzz 12 public/bezel*.png
+"""
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
-p = Path('public/bezel.png')
-if not p.exists():
-    print('bezel.png not found')
-    raise SystemExit(1)
-
-backup = p.with_name('bezel.orig.png')
-if not backup.exists():
-    p.rename(backup)
-    print('backup created at', backup)
-else:
-    print('backup already exists at', backup)
-
-img = Image.open(backup).convert('RGBA')
-px = img.load()
-width, height = img.size
-
-# threshold: treat pixels near white as transparent
-threshold = 250
-fuzz = 6
-for y in range(height):
-    for x in range(width):
-        r,g,b,a = px[x,y]
-        if r >= threshold and g >= threshold and b >= threshold:
-            px[x,y] = (r,g,b,0)
+import numpy as np
+from PIL import Image
+
+ROOT = Path(__file__).resolve().parent.parent
+ORIGINALS_DIR = ROOT / 'originals'
+DEFAULT_INPUTS = ('public/bezel.png',)
+
+
+def key_white(rgba: np.ndarray, threshold: int = 250, fuzz: int = 6) -> np.ndarray:
+    """Return a copy of an RGBA uint8 array with near-white pixels faded to transparent."""
+    rgb = rgba[..., :3].astype(np.float32)
+    lightness = rgb.min(axis=-1)
+    # keep = 1 below the ramp, 0 at/above threshold; fuzz == 0 is a hard key.
+    if fuzz > 0:
+        keep = np.clip((threshold - lightness) / fuzz, 0.0, 1.0)
+    else:
+        keep = (lightness < threshold).astype(np.float32)
+
+    out = rgba.copy()
+    out[..., 3] = np.rint(rgba[..., 3] * keep).astype(np.uint8)
+
+    # Edge pixels are foreground blended over white: c = k * fg + (1 - k) * 255.
+    edge = (keep > 0.0) & (keep < 1.0)
+    if edge.any():
+        k = keep[edge][:, None]
+        fg = (rgb[edge] - (1.0 - k) * 255.0) / k
+        out[..., :3][edge] = np.clip(np.rint(fg), 0, 255).astype(np.uint8)
+    return out
+
+
+def legacy_backup_path(p: Path) -> Path:
+    """Where older versions of this script kept the backup: next to the image, inside public/."""
+    return p.with_name(f'{p.stem}.orig{p.suffix}')
+
+
+def is_backup(p: Path) -> bool:
+    return p.stem.endswith('.orig')
+
+
+def backup_path(p: Path) -> Path:
+    """originals/<path relative to the repo> for images in the repo, else <name>.orig.png next to it."""
+    resolved = p.resolve()
+    if resolved.is_relative_to(ROOT):
+        return ORIGINALS_DIR / resolved.relative_to(ROOT)
+    return legacy_backup_path(p)
+
+
+def process(job: tuple[str, int, int]) -> str:
+    """Process-pool entry point: back up one image and write its keyed version in place."""
+    path_str, threshold, fuzz = job
+    p = Path(path_str)
+    backup = backup_path(p)
+    legacy = legacy_backup_path(p)
+    if backup.exists():
+        note = f'backup already exists at {backup}'
+    else:
+        backup.parent.mkdir(parents=True, exist_ok=True)
+        if legacy != backup and legacy.exists():
+            legacy.rename(backup)
+            note = f'backup moved from {legacy} to {backup}'
         else:
-            # preserve pixel as-is
-            pass
+            p.rename(backup)
+            note = f'backup created at {backup}'
+
+    with Image.open(backup) as src:
+        rgba = np.asarray(src.convert('RGBA'))
+    keyed = key_white(rgba, threshold, fuzz)
+    transparent = int(np.count_nonzero(keyed[..., 3] == 0))
+    Image.fromarray(keyed).save(p, optimize=True)
+    return f'{note}\nSaved transparent {p.name} to {p} ({transparent} of {keyed.shape[0] * keyed.shape[1]} pixels transparent)'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Make the white background of bezel images transparent')
+    parser.add_argument('inputs', nargs='*', default=list(DEFAULT_INPUTS), help='Images to key (default: public/bezel.png)')
+    parser.add_argument('--threshold', type=int, default=250, help='Darkest-channel value at which pixels become fully transparent')
+    parser.add_argument('--fuzz', type=int, default=6, help='Width of the soft alpha ramp below the threshold (0 = hard edge)')
+    parser.add_argument('--workers', type=int, default=0, help='Worker processes (default: CPU count)')
+    args = parser.parse_args()
+
+    # A glob like public/bezel*.png also matches old public/bezel.orig.png backups; key each image once.
+    inputs: dict[Path, str] = {}
+    for path in args.inputs:
+        if is_backup(Path(path)):
+            print(f'{path} is a backup, skipping')
+            continue
+        inputs.setdefault(Path(path).resolve(), path)
+    sources = {backup_path(Path(path)).resolve() for path in inputs.values()}
+    inputs = {resolved: path for resolved, path in inputs.items() if resolved not in sources}
+
+    missing = [
+        path
+        for path in inputs.values()
+        if not Path(path).exists()
+        and not backup_path(Path(path)).exists()
+        and not legacy_backup_path(Path(path)).exists()
+    ]
+    if missing:
+        for path in missing:
+            print(f'{path} not found')
+        raise SystemExit(1)
+    if not inputs:
+        return
+
+    jobs = [(path, args.threshold, args.fuzz) for path in inputs.values()]
+    workers = min(args.workers or os.cpu_count() or 1, len(jobs))
+    if workers <= 1:
+        for message in map(process, jobs):
+            print(message)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for message in pool.map(process, jobs):
+            print(message)
+
 
-img.save(p)
-print('Saved transparent bezel to', p)
+if __name__ == '__main__':
+    main()
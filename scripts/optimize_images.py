@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""Shrink the PNGs a build ships and write WebP/AVIF variants next to them.
+
+Vite copies public/*.png (bezels, button caps) into dist/ as authored. For
+each PNG under --root this:
+
+  - re-encodes it losslessly: drops an all-opaque alpha channel, converts to
+    greyscale when R == G == B, and to an exact palette when the image has at
+    most 256 distinct colours; the smallest encoding whose decoded pixels are
+    identical to the original wins, and the file is only replaced if smaller
+  - writes <name>.png.webp and <name>.png.avif when they beat the optimized
+    PNG and decode to identical pixels; .htaccess serves them to browsers
+    that send image/webp or image/avif in Accept under the .png URL, so a
+    variant must never be lossy. AVIF is encoded at quality 100, 4:4:4, but
+    libavif's YUV conversion usually costs a few levels, in which case no
+    .avif is written.
+
+Results are cached under --cache-dir keyed by the file's sha256 and the
+encoder settings, so unchanged images (including ones this script already
+optimized) are copied from the cache instead of re-encoded. Files are
+processed in a process pool.
+
+Usage:
+  python scripts/optimize_images.py                       # dist/, cache in .deploy-cache/images
+  python scripts/optimize_images.py --root public --dry-run
+  python scripts/optimize_images.py --json images.json --no-avif
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+from PIL import Image, features
+
+from atomic_write import write_atomic
+
+CACHE_VERSION = 2
+VARIANTS = (".webp", ".avif")
+ROOT = Path(__file__).resolve().parent.parent
+# Same resolution as deploy.py's DEPLOY_CACHE_DIR, so running from any directory shares one cache.
+DEFAULT_CACHE_DIR = Path(os.getenv("DEPLOY_CACHE_DIR", str(ROOT / ".deploy-cache"))) / "images"
+
+
+@dataclass
+class ImageResult:
+    """Per-file outcome; sizes in bytes, variants only when written."""
+
+    rel: str
+    before: int
+    after: int
+    variants: dict[str, int] = field(default_factory=dict)
+    cached: bool = False
+    note: str = ""
+
+    @property
+    def saved(self) -> int:
+        return self.before - self.after
+
+
+def sha256_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def encode_png(img: Image.Image, **params) -> bytes:
+    buf = io.BytesIO()
+    img.save(buf, "PNG", optimize=True, **params)
+    return buf.getvalue()
+
+
+def exact_palette(rgba: np.ndarray) -> Optional[Image.Image]:
+    """P-mode image with the same pixels as ``rgba``, or None if it has more than 256 colours."""
+    flat = rgba.reshape(-1, 4)
+    colors, indices = np.unique(flat.view(np.uint32).ravel(), return_inverse=True)
+    if len(colors) > 256:
+        return None
+    palette = colors.view(np.uint8).reshape(-1, 4)
+    img = Image.fromarray(indices.reshape(rgba.shape[:2]).astype(np.uint8), "P")
+    img.putpalette(palette[:, :3].tobytes(), "RGB")
+    alphas = palette[:, 3]
+    if (alphas < 255).any():
+        img.info["transparency"] = alphas.tobytes()
+    return img
+
+
+def png_candidates(rgba: np.ndarray) -> list[tuple[str, Image.Image]]:
+    """Lossless re-encodings of ``rgba``, narrowest colour type first."""
+    opaque = bool((rgba[..., 3] == 255).all())
+    grey = bool((rgba[..., 0] == rgba[..., 1]).all() and (rgba[..., 1] == rgba[..., 2]).all())
+    candidates: list[tuple[str, Image.Image]] = []
+    palette = exact_palette(rgba)
+    if palette is not None:
+        candidates.append(("palette", palette))
+    if grey:
+        candidates.append(("grey", Image.fromarray(rgba[..., 0] if opaque else rgba[..., [0, 3]], "L" if opaque else "LA")))
+    candidates.append(("rgb" if opaque else "rgba", Image.fromarray(rgba[..., :3] if opaque else rgba, "RGB" if opaque else "RGBA")))
+    return candidates
+
+
+def decoded_rgba(data: bytes) -> np.ndarray:
+    with Image.open(io.BytesIO(data)) as img:
+        return np.asarray(img.convert("RGBA"))
+
+
+def optimize_png(data: bytes) -> tuple[bytes, str]:
+    """Smallest pixel-identical PNG encoding of ``data`` (``data`` itself if nothing beats it)."""
+    rgba = decoded_rgba(data)
+    best, kind = data, "original"
+    for name, img in png_candidates(rgba):
+        params = {"transparency": img.info["transparency"]} if "transparency" in img.info else {}
+        encoded = encode_png(img, **params)
+        if len(encoded) < len(best) and np.array_equal(decoded_rgba(encoded), rgba):
+            best, kind = encoded, name
+    return best, kind
+
+
+def encode_variant(data: bytes, suffix: str) -> bytes:
+    buf = io.BytesIO()
+    with Image.open(io.BytesIO(data)) as img:
+        img = img.convert("RGBA" if img.mode in ("P", "LA", "RGBA", "PA") or "transparency" in img.info else "RGB")
+        if suffix == ".webp":
+            img.save(buf, "WEBP", lossless=True, quality=100, method=4)
+        else:
+            img.save(buf, "AVIF", quality=100, subsampling="4:4:4", speed=6)
+    return buf.getvalue()
+
+
+class ImageCache:
+    """``<dir>/<settings>/<sha256>.json`` records per source hash; encoded bytes in ``<dir>/blobs/``."""
+
+    def __init__(self, root: Optional[Path], settings: str):
+        self.root = root
+        self.records = root / settings if root is not None else None
+        self.blobs = root / "blobs" if root is not None else None
+
+    def load(self, digest: str) -> Optional[dict[str, Optional[str]]]:
+        if self.records is None:
+            return None
+        try:
+            record = json.loads((self.records / f"{digest}.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if not all(ref is None or (self.blobs / ref).is_file() for ref in record.values()):
+            return None
+        return record
+
+    def blob(self, ref: str) -> bytes:
+        assert self.blobs is not None
+        return (self.blobs / ref).read_bytes()
+
+    def store(self, digest: str, outputs: dict[str, Optional[bytes]]) -> dict[str, Optional[str]]:
+        record: dict[str, Optional[str]] = {}
+        for key, payload in outputs.items():
+            record[key] = None if payload is None else f"{sha256_bytes(payload)}{key}"
+        if self.records is None or self.blobs is None:
+            return record
+        self.records.mkdir(parents=True, exist_ok=True)
+        self.blobs.mkdir(parents=True, exist_ok=True)
+        for key, payload in outputs.items():
+            if payload is not None and not (self.blobs / str(record[key])).exists():
+                write_atomic(self.blobs / str(record[key]), payload)
+        write_atomic(self.records / f"{digest}.json", json.dumps(record, sort_keys=True).encode("utf-8"))
+        return record
+
+    def retain(self, used: set[str]) -> None:
+        """Drop records of images no longer shipped and blobs nothing refers to."""
+        if self.root is None or not self.root.is_dir():
+            return
+        live: set[str] = set()
+        for settings_dir in [p for p in self.root.iterdir() if p.is_dir() and p.name != "blobs"]:
+            for record_path in settings_dir.glob("*.json"):
+                if settings_dir != self.records or record_path.stem not in used:
+                    record_path.unlink(missing_ok=True)
+                    continue
+                try:
+                    live.update(ref for ref in json.loads(record_path.read_text(encoding="utf-8")).values() if ref)
+                except (OSError, ValueError):
+                    record_path.unlink(missing_ok=True)
+            if settings_dir != self.records:
+                settings_dir.rmdir()
+        if self.blobs is not None and self.blobs.is_dir():
+            for blob in self.blobs.iterdir():
+                if blob.name not in live:
+                    blob.unlink(missing_ok=True)
+
+
+def process(job: tuple[str, str, Optional[str], str, bool, bool]) -> tuple[ImageResult, list[str]]:
+    """Process-pool entry point: optimize one PNG. Returns its result and the source hashes it cached."""
+    root_str, rel, cache_dir, settings, avif, dry_run = job
+    path = Path(root_str) / rel
+    data = path.read_bytes()
+    digest = sha256_bytes(data)
+    cache = ImageCache(Path(cache_dir) if cache_dir else None, settings)
+    suffixes = [s for s in VARIANTS if s != ".avif" or avif]
+
+    record = cache.load(digest)
+    cached = record is not None
+    outputs: dict[str, Optional[bytes]]
+    if record is not None:
+        outputs = {key: None if ref is None else cache.blob(ref) for key, ref in record.items()}
+        kind = "cached"
+    else:
+        try:
+            png, kind = optimize_png(data)
+        except OSError:  # not a PNG Pillow can decode; ship it untouched
+            return ImageResult(rel=rel, before=len(data), after=len(data), note="skipped: not decodable"), []
+        outputs = {".png": png if len(png) < len(data) else None}
+        best = outputs[".png"] or data
+        pixels = decoded_rgba(best)
+        for suffix in suffixes:
+            variant = encode_variant(best, suffix)
+            exact = len(variant) < len(best) and np.array_equal(decoded_rgba(variant), pixels)
+            outputs[suffix] = variant if exact else None
+    png = outputs.get(".png")
+    result = ImageResult(rel=rel, before=len(data), after=len(png) if png is not None else len(data), cached=cached, note=kind)
+    result.variants = {suffix: len(payload) for suffix, payload in outputs.items() if suffix != ".png" and payload is not None}
+    if dry_run:
+        return result, []
+
+    hashes = [digest]
+    if record is None:
+        cache.store(digest, outputs)
+    if png is not None:
+        write_atomic(path, png)
+        # The optimized file maps to itself, so the next run over this tree is a cache hit.
+        hashes.append(sha256_bytes(png))
+        cache.store(hashes[-1], {**outputs, ".png": None})
+    for suffix in VARIANTS:
+        variant_path = path.with_name(path.name + suffix)
+        payload = outputs.get(suffix)
+        if payload is None:
+            variant_path.unlink(missing_ok=True)  # stale variant from an earlier source
+        elif not variant_path.is_file() or variant_path.read_bytes() != payload:
+            write_atomic(variant_path, payload)
+    return result, hashes
+
+
+def print_report(results: list[ImageResult], dry_run: bool) -> None:
+    print(f"\n{'file':<40} {'before KB':>10} {'after KB':>9} {'saved':>7} {'webp KB':>8} {'avif KB':>8}")
+    for r in results:
+        pct = f"{r.saved / r.before * 100:.0f}%" if r.before else "-"
+        webp = f"{r.variants['.webp'] / 1024:.1f}" if ".webp" in r.variants else "-"
+        avif = f"{r.variants['.avif'] / 1024:.1f}" if ".avif" in r.variants else "-"
+        tag = " (cached)" if r.cached else f" ({r.note})"
+        print(f"{r.rel:<40} {r.before / 1024:>10.1f} {r.after / 1024:>9.1f} {pct:>7} {webp:>8} {avif:>8}{tag}")
+    before = sum(r.before for r in results)
+    after = sum(r.after for r in results)
+    smallest = sum(min([r.after, *r.variants.values()]) for r in results)
+    verb = "would save" if dry_run else "saved"
+    print(
+        f"\n{len(results)} PNG(s): {before / 1024:.1f} KB -> {after / 1024:.1f} KB ({verb} {(before - after) / 1024:.1f} KB); "
+        f"{smallest / 1024:.1f} KB for clients taking the smallest variant"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Losslessly shrink shipped PNGs and write WebP/AVIF variants")
+    parser.add_argument("--root", type=Path, default=Path("dist"), help="Directory to optimize in place (default dist/)")
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=DEFAULT_CACHE_DIR,
+        help="Encoded-output cache keyed by content hash (default .deploy-cache/images next to deploy.py)",
+    )
+    parser.add_argument("--no-cache", action="store_true", help="Re-encode everything and leave the cache alone")
+    parser.add_argument("--no-avif", action="store_true", help="Only write WebP variants")
+    parser.add_argument("--workers", type=int, default=0, help="Worker processes (default: CPU count)")
+    parser.add_argument("--dry-run", action="store_true", help="Report savings without writing anything")
+    parser.add_argument("--json", type=Path, default=None, metavar="OUT.json", help="Write per-file results as JSON")
+    args = parser.parse_args()
+
+    if not args.root.is_dir():
+        print(f"ERROR: {args.root}/ does not exist")
+        sys.exit(1)
+    avif = not args.no_avif and features.check("avif")
+    if not args.no_avif and not avif:
+        print("Pillow built without AVIF support; writing WebP variants only")
+    settings = f"v{CACHE_VERSION}" + ("-avif" if avif else "")
+    cache_dir = None if args.no_cache or args.dry_run else str(args.cache_dir)
+
+    rels = sorted(p.relative_to(args.root).as_posix() for p in args.root.rglob("*.png") if p.is_file())
+    jobs = [(str(args.root), rel, cache_dir, settings, avif, args.dry_run) for rel in rels]
+    workers = min(args.workers or os.cpu_count() or 1, len(jobs)) or 1
+    if workers <= 1:
+        outcomes = list(map(process, jobs))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            outcomes = list(pool.map(process, jobs))
+
+    results = [result for result, _ in outcomes]
+    if cache_dir is not None:
+        ImageCache(Path(cache_dir), settings).retain({h for _, hashes in outcomes for h in hashes})
+    print_report(results, args.dry_run)
+    if args.json is not None:
+        payload = {
+            "root": str(args.root),
+            "dryRun": args.dry_run,
+            "bytesBefore": sum(r.before for r in results),
+            "bytesAfter": sum(r.after for r in results),
+            "files": [{**asdict(r), "saved": r.saved} for r in results],
+        }
+        write_atomic(args.json, (json.dumps(payload, indent=2) + "\n").encode("utf-8"))
+
+
+if __name__ == "__main__":
+    main()
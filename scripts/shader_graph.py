@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""Dependency index of shaders/*.wgsl over shaders/lib/.
+
+For every shader it records the transitive //#include graph and which
+library declarations the shader actually reaches from its entry points
+(same roots and comment-aware declaration index as scripts/bundle_wgsl.py).
+From that it reports, per shader, the library symbols it uses and the
+includes it pulls in without using anything; and, across all shaders, the
+library declarations nothing uses.
+
+Each file is parsed once and cached in .shader-graph.json keyed by its
+sha256, so re-indexing after an edit only re-parses the edited files. The
+affected-shader queries print one path per line for other tools:
+
+  python scripts/shader_graph.py                                # summary + unused lib functions
+  python scripts/shader_graph.py --affected shaders/lib/dura.wgsl
+  python scripts/shader_graph.py --changed | xargs python scripts/tier_a_strip.py --check
+  python scripts/shader_graph.py --affected $(git diff --name-only) | xargs python scripts/bundle_wgsl.py --out /tmp/b
+  python scripts/shader_graph.py --json graph.json
+
+--changed lists shaders affected by files whose hash differs from the
+previous --changed run (new and deleted files included), then records the
+current hashes as the next baseline. The baseline is stored apart from the
+parse cache, so other runs never move it.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+from pathlib import Path
+
+from atomic_write import write_atomic
+from bundle_wgsl import IDENT_RE, INCLUDE_RE, is_root, strip_comments
+from tier_a_strip import ROOT, SHADERS, index_decls
+
+LIB_DIR = SHADERS / "lib"
+INDEX_PATH = ROOT / ".shader-graph.json"
+INDEX_VERSION = 1
+
+
+def parse_file(text: str) -> dict:
+    """Direct includes plus, per top-level declaration, its kind, whether it is a root, and the identifiers it mentions."""
+    includes = [m.group(1) for line in text.split("\n") if (m := INCLUDE_RE.match(line))]
+    code = strip_comments(text)
+    decls: dict[str, dict] = {}
+    for d in index_decls(code):
+        entry = decls.setdefault(d.name, {"kind": d.kind, "root": False, "refs": set()})
+        entry["root"] = entry["root"] or is_root(d, code, set())
+        entry["refs"].update(IDENT_RE.findall(code, d.start, d.end))
+    for name, entry in decls.items():
+        entry["refs"] = sorted(entry["refs"] - {name})
+    return {"includes": includes, "decls": decls}
+
+
+class ShaderGraph:
+    """Parsed records for shaders/*.wgsl and shaders/lib/*.wgsl, keyed by path relative to shaders/."""
+
+    def __init__(self, index_path: Path = INDEX_PATH):
+        self.index_path = index_path
+        self.files: dict[str, dict] = {}
+        self.previous: dict[str, dict] = {}
+        self.baseline: dict[str, str] = {}
+        self.parsed = 0
+        try:
+            data = json.loads(index_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            data = {}
+        if isinstance(data, dict) and data.get("version") == INDEX_VERSION and isinstance(data.get("files"), dict):
+            self.previous = data["files"]
+            baseline = data.get("baseline")
+            if isinstance(baseline, dict):
+                self.baseline = baseline
+            else:  # index from before the baseline was split out: its parse cache was the baseline
+                self.baseline = {rel: rec.get("sha256") for rel, rec in self.previous.items()}
+
+    def refresh(self) -> None:
+        """Hash every source file; re-parse only those whose hash changed."""
+        paths = sorted(SHADERS.glob("*.wgsl")) + sorted(LIB_DIR.glob("*.wgsl"))
+        for path in paths:
+            rel = path.relative_to(SHADERS).as_posix()
+            data = path.read_bytes()
+            digest = hashlib.sha256(data).hexdigest()
+            cached = self.previous.get(rel)
+            if cached is not None and cached.get("sha256") == digest:
+                self.files[rel] = cached
+                continue
+            self.files[rel] = {"sha256": digest, **parse_file(data.decode("utf-8"))}
+            self.parsed += 1
+
+    def changed_since_baseline(self) -> set[str]:
+        """Files added, edited or deleted since the baseline was last advanced."""
+        changed = {rel for rel, rec in self.files.items() if self.baseline.get(rel) != rec["sha256"]}
+        return changed | (set(self.baseline) - set(self.files))  # deleted files affect whoever included them
+
+    def advance_baseline(self) -> None:
+        self.baseline = {rel: rec["sha256"] for rel, rec in self.files.items()}
+
+    def save(self) -> None:
+        data = {"version": INDEX_VERSION, "files": self.files, "baseline": self.baseline}
+        write_atomic(self.index_path, json.dumps(data, sort_keys=True) + "\n")
+
+    @property
+    def shaders(self) -> list[str]:
+        return [rel for rel in self.files if "/" not in rel]
+
+    def transitive_includes(self, rel: str) -> list[str]:
+        """Every file rel pulls in, depth-first in include order, each once."""
+        seen: list[str] = []
+        stack = list(reversed(self.files.get(rel, {}).get("includes", [])))
+        while stack:
+            inc = stack.pop()
+            if inc in seen or inc == rel:
+                continue
+            seen.append(inc)
+            stack.extend(reversed(self.files.get(inc, {}).get("includes", [])))
+        return seen
+
+    def used_symbols(self, rel: str) -> dict[str, list[str]]:
+        """Declarations reachable from rel's entry points, grouped by the file defining them."""
+        scope = [rel, *self.transitive_includes(rel)]
+        by_name: dict[str, list[str]] = {}
+        for f in scope:
+            for name in self.files.get(f, {}).get("decls", {}):
+                by_name.setdefault(name, []).append(f)
+        live = {(f, name) for f in scope for name, d in self.files.get(f, {}).get("decls", {}).items() if d["root"]}
+        stack = list(live)
+        while stack:
+            f, name = stack.pop()
+            for ref in self.files[f]["decls"][name]["refs"]:
+                for target in by_name.get(ref, ()):
+                    if (target, ref) not in live:
+                        live.add((target, ref))
+                        stack.append((target, ref))
+        used: dict[str, list[str]] = {}
+        for f, name in sorted(live):
+            used.setdefault(f, []).append(name)
+        return used
+
+    def affected_by(self, changed: set[str]) -> list[str]:
+        """Shaders that are, or transitively include, any of the changed files."""
+        return [rel for rel in self.shaders if rel in changed or changed.intersection(self.transitive_includes(rel))]
+
+    def report(self) -> dict:
+        shaders: dict[str, dict] = {}
+        used_anywhere: set[tuple[str, str]] = set()
+        for rel in self.shaders:
+            includes = self.transitive_includes(rel)
+            used = self.used_symbols(rel)
+            used_anywhere.update((f, name) for f, names in used.items() for name in names)
+            libs = {f: names for f, names in used.items() if f != rel}
+            shaders[rel] = {
+                "includes": includes,
+                "usedLibSymbols": libs,
+                "unusedIncludes": [f for f in includes if f not in libs],
+            }
+        unused: dict[str, list[str]] = {}
+        for rel, record in self.files.items():
+            if rel.startswith("lib/"):
+                names = [n for n, d in record["decls"].items() if d["kind"] == "fn" and (rel, n) not in used_anywhere]
+                if names:
+                    unused[rel] = names
+        return {"shaders": shaders, "unusedLibFunctions": unused}
+
+
+def normalize(paths: list[str]) -> set[str]:
+    """Command-line paths (shaders/lib/x.wgsl, lib/x.wgsl, absolute) as keys relative to shaders/."""
+    keys: set[str] = set()
+    for p in paths:
+        path = Path(p)
+        resolved = path.resolve() if path.exists() else (SHADERS / path).resolve()
+        if resolved.is_relative_to(SHADERS.resolve()):
+            keys.add(resolved.relative_to(SHADERS.resolve()).as_posix())
+    return keys
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Include graph and library symbol usage of shaders/*.wgsl")
+    parser.add_argument("--affected", nargs="+", metavar="FILE", help="Print shaders that are or depend on FILE(s), one per line")
+    parser.add_argument("--changed", action="store_true", help="Print shaders affected by files changed since the last --changed run")
+    parser.add_argument("--json", type=Path, default=None, metavar="OUT.json", help="Write the full graph report as JSON")
+    parser.add_argument("--index", type=Path, default=INDEX_PATH, help="Parse cache (default .shader-graph.json)")
+    args = parser.parse_args()
+
+    graph = ShaderGraph(args.index)
+    graph.refresh()
+    changed = graph.changed_since_baseline()
+    if args.changed:
+        graph.advance_baseline()
+    graph.save()
+
+    if args.affected or args.changed:
+        targets = normalize(args.affected or []) | (changed if args.changed else set())
+        for rel in graph.affected_by(targets):
+            print(SHADERS.relative_to(ROOT).as_posix() + "/" + rel)
+        return
+
+    report = graph.report()
+    print(f"{len(graph.shaders)} shader(s), {len(graph.files) - len(graph.shaders)} lib file(s); {graph.parsed} parsed, rest cached")
+    for rel, info in report["shaders"].items():
+        used = sum(len(names) for names in info["usedLibSymbols"].values())
+        line = f"  {rel:<32} {len(info['includes']):>2} include(s), {used:>3} lib symbol(s) used"
+        if info["unusedIncludes"]:
+            line += f"; unused: {', '.join(info['unusedIncludes'])}"
+        print(line)
+    unused = report["unusedLibFunctions"]
+    print(f"\nLibrary functions no shader uses ({sum(map(len, unused.values()))}):")
+    for rel, names in sorted(unused.items()):
+        print(f"  {rel}: {', '.join(names)}")
+    if args.json is not None:
+        write_atomic(args.json, json.dumps(report, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,24 @@
 #!/usr/bin/env python3
-"""Safe tier-A WGSL migration: strip lib functions by brace matching, add includes."""
+"""Safe tier-A WGSL migration: strip lib functions by brace matching, add includes.
+
+Usage:
+  python scripts/tier_a_strip.py                      # migrate shaders/patternv*.wgsl in place
+  python scripts/tier_a_strip.py --dry-run --diff migrate.diff --json summary.json
+  python scripts/tier_a_strip.py --check              # pre-commit: exit 1 if any shader would change
+"""
 from __future__ import annotations
+import argparse
+import difflib
+import json
+import os
 import re
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
 
+from atomic_write import write_atomic
+
 ROOT = Path(__file__).resolve().parent.parent
 SHADERS = ROOT / "shaders"
 
@@ -24,41 +38,115 @@ LIBS = [
 SKIP = {"circular_led_body", "circular_night_body", "circular_led_velocity_body", "circular_led_reactive_body", "theme_"}
 
 
+# One token per match: comments are consumed whole so braces and keywords inside them are inert.
+TOKEN_RE = re.compile(
+    r"//[^\n]*"
+    r"|/\*"
+    r"|[{};@]"
+    r"|\b(fn|struct|const|override|alias|var)\b(?:\s*<[^>]*>)?\s*([A-Za-z_][A-Za-z0-9_]*)"
+)
+# Inside a body only comments and braces matter.
+BODY_TOKEN_RE = re.compile(r"//[^\n]*|/\*|[{}]")
+BLOCK_COMMENT_RE = re.compile(r"/\*|\*/")
+BRACED = {"fn", "struct"}
+
+
+@dataclass(frozen=True)
+class Decl:
+    """A top-level declaration: text[start:end] spans its attributes through the closing } or ;."""
+
+    kind: str
+    name: str
+    start: int
+    end: int
+
+
+def skip_block_comment(text: str, pos: int) -> int:
+    """Index just past the (possibly nested) block comment opening at pos."""
+    depth = 0
+    for m in BLOCK_COMMENT_RE.finditer(text, pos):
+        depth += 1 if m.group() == "/*" else -1
+        if depth == 0:
+            return m.end()
+    return len(text)
+
+
+def index_decls(text: str) -> list[Decl]:
+    """Every top-level fn/struct/const (and var/override/alias) in one left-to-right pass."""
+    decls: list[Decl] = []
+    depth = 0
+    attr_start: int | None = None
+    pending: tuple[str, str, int] | None = None
+    pos = 0
+    while (m := (BODY_TOKEN_RE if depth else TOKEN_RE).search(text, pos)) is not None:
+        tok = m.group()
+        pos = m.end()
+        if tok.startswith("//"):
+            continue
+        if tok == "/*":
+            pos = skip_block_comment(text, m.start())
+            continue
+        if m.lastindex:  # a declaration keyword; only TOKEN_RE (depth 0) has groups
+            if pending is None:
+                start = m.start() if attr_start is None else attr_start
+                pending = (m.group(1), m.group(2), start)
+                attr_start = None
+            continue
+        if tok == "@":
+            if depth == 0 and pending is None and attr_start is None:
+                attr_start = m.start()
+        elif tok == "{":
+            depth += 1
+        elif tok == "}":
+            depth = max(0, depth - 1)
+            if depth == 0 and pending is not None and pending[0] in BRACED:
+                end = pos
+                if pending[0] == "struct":
+                    semi = re.match(r"[ \t]*;", text[end:])
+                    end += semi.end() if semi else 0
+                    pos = end
+                decls.append(Decl(pending[0], pending[1], pending[2], end))
+                pending = None
+            elif depth == 0:
+                attr_start = None
+        elif tok == ";" and depth == 0:
+            if pending is not None and pending[0] not in BRACED:
+                decls.append(Decl(pending[0], pending[1], pending[2], pos))
+                pending = None
+            attr_start = None
+    return decls
+
+
+def strip_decls(text: str, names: set[str], kinds: frozenset[str] = frozenset({"fn"}), decls: list[Decl] | None = None) -> str:
+    """Remove every top-level declaration of the given kinds named in names (and the newlines after it) in one rebuild."""
+    if decls is None:
+        decls = index_decls(text)
+    parts: list[str] = []
+    pos = 0
+    for d in decls:
+        if d.kind not in kinds or d.name not in names or d.start < pos:
+            continue
+        parts.append(text[pos : d.start])
+        pos = d.end
+        while pos < len(text) and text[pos] == "\n":
+            pos += 1
+    parts.append(text[pos:])
+    return "".join(parts)
+
+
 def strip_fn(text: str, name: str) -> str:
-    sig = f"fn {name}("
-    while True:
-        idx = text.find(sig)
-        if idx == -1:
-            break
-        brace = text.find("{", idx)
-        if brace == -1:
-            break
-        depth = 0
-        i = brace
-        while i < len(text):
-            c = text[i]
-            if c == "{":
-                depth += 1
-            elif c == "}":
-                depth -= 1
-                if depth == 0:
-                    i += 1
-                    break
-            i += 1
-        while i < len(text) and text[i] == "\n":
-            i += 1
-        text = text[:idx] + text[i:]
-    return text
-
-
-def migrate(path: Path) -> dict:
-    rel = path.name
-    text = path.read_text()
-    if any(s in text for s in SKIP) and "//#include" in text and path.stat().st_size < 2000:
-        return {"file": rel, "skipped": "tier-b"}
+    return strip_decls(text, {name})
+
 
+def migrate_text(text: str) -> tuple[str, dict]:
+    """Migrated text plus what changed: added includes, stripped functions."""
+    if any(s in text for s in SKIP) and "//#include" in text and len(text.encode()) < 2000:
+        return text, {"skipped": "tier-b"}
+
+    original = text
     existing = set(m.group(1) for m in re.finditer(r'//#include\s+"([^"]+)"', text))
     added: list[str] = []
+    dura_struct_removed = False
 
     if "const NOTE_MIN:" in text and "lib/notes.wgsl" not in existing:
         text = re.sub(
@@ -76,6 +164,8 @@ def migrate(path: Path) -> dict:
             text,
             count=1,
         )
+        # The struct now comes from lib/dura.wgsl, which must be included even if no dura function is inlined.
+        dura_struct_removed = "struct NoteDurationInfo" not in text
 
     if "COLOR_PRESERVE_SCALE" in text and "lib/color_preserve.wgsl" not in existing:
         text = re.sub(
@@ -87,6 +177,9 @@ def migrate(path: Path) -> dict:
         added.append("lib/color_preserve.wgsl")
         existing.add("lib/color_preserve.wgsl")
 
+    decls = index_decls(text)
+    defined = {d.name for d in decls if d.kind == "fn"}
+    strip: set[str] = set()
     for inc, fns in LIBS:
         if inc in existing:
             continue
@@ -94,16 +187,17 @@ def migrate(path: Path) -> dict:
             continue
         if inc == "lib/color_preserve.wgsl":
             continue
-        need = any(f"fn {fn}(" in text for fn in fns)
+        need = any(fn in defined for fn in fns) or (inc == "lib/dura.wgsl" and dura_struct_removed)
         if not need:
             continue
-        for fn in fns:
-            text = strip_fn(text, fn)
+        strip.update(fns)
         added.append(inc)
         existing.add(inc)
+    if strip:
+        text = strip_decls(text, strip, decls=decls)
 
     if not added:
-        return {"file": rel, "changed": False}
+        return original, {"changed": False}
 
     text = re.sub(r"\n{3,}", "\n\n", text)
     m = re.search(r"^(.*?)(?=struct Uniforms|@group\(0\)|const THEME_)", text, re.S)
@@ -111,16 +205,77 @@ def migrate(path: Path) -> dict:
     rest = text[len(header) :]
     includes = sorted(existing)
     block = "\n".join(f'//#include "{i}"' for i in includes) + "\n\n"
-    path.write_text(header.rstrip() + "\n\n" + block + rest.lstrip("\n"))
-    return {"file": rel, "changed": True, "includes": includes}
+    info = {"changed": True, "includes": includes, "added": added, "stripped": sorted(strip & defined)}
+    return header.rstrip() + "\n\n" + block + rest.lstrip("\n"), info
+
+
+def migrate(path: Path, *, write: bool = True) -> tuple[dict, str]:
+    """Migrate one shader; returns its summary and a unified diff of the change."""
+    before = path.read_text()
+    after, info = migrate_text(before)
+    info = {"file": path.name, **info, "changed": after != before}
+    if after == before:
+        return info, ""
+    info["bytesRemoved"] = len(before.encode()) - len(after.encode())
+    diff = "".join(
+        difflib.unified_diff(
+            before.splitlines(keepends=True), after.splitlines(keepends=True), f"a/{path.name}", f"b/{path.name}"
+        )
+    )
+    if write:
+        write_atomic(path, after)
+    return info, diff
+
+
+def migrate_job(job: tuple[str, bool]) -> tuple[dict, str]:
+    """Process-pool entry point."""
+    path, write = job
+    return migrate(Path(path), write=write)
 
 
 def main() -> None:
-    files = [Path(p) for p in sys.argv[1:]] if len(sys.argv) > 1 else sorted(SHADERS.glob("patternv*.wgsl"))
-    for f in files:
-        if "legacy" in str(f):
-            continue
-        print(migrate(f))
+    parser = argparse.ArgumentParser(description="Replace inlined tier-A library code in shaders with //#include directives")
+    parser.add_argument("files", nargs="*", type=Path, help="Shaders to migrate (default: shaders/patternv*.wgsl)")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would change without writing")
+    parser.add_argument("--check", action="store_true", help="Like --dry-run, but exit 1 if any shader would change")
+    parser.add_argument("--diff", type=Path, default=None, metavar="OUT.diff", help="Write unified diffs here (dry run: default stdout)")
+    parser.add_argument("--json", type=Path, default=None, metavar="OUT.json", help="Write a JSON summary of the run")
+    parser.add_argument("--workers", type=int, default=0, help="Worker processes (default: CPU count)")
+    args = parser.parse_args()
+    dry_run = args.dry_run or args.check
+
+    files = args.files or sorted(SHADERS.glob("patternv*.wgsl"))
+    jobs = [(str(f), not dry_run) for f in files if "legacy" not in str(f)]
+    workers = min(args.workers or os.cpu_count() or 1, len(jobs)) or 1
+    if workers <= 1:
+        results = list(map(migrate_job, jobs))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(migrate_job, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+
+    diffs = "".join(diff for _, diff in results)
+    if args.diff is not None:
+        write_atomic(args.diff, diffs)
+    elif dry_run and diffs:
+        sys.stdout.write(diffs)
+    for info, _ in results:
+        print(info)
+
+    changed = [info for info, _ in results if info.get("changed")]
+    summary = {
+        "dryRun": dry_run,
+        "files": len(results),
+        "changed": len(changed),
+        "skipped": sum(1 for info, _ in results if "skipped" in info),
+        "bytesRemoved": sum(info.get("bytesRemoved", 0) for info in changed),
+        "results": [info for info, _ in results],
+    }
+    verb = "would change" if dry_run else "changed"
+    print(f"{len(results)} shader(s): {len(changed)} {verb}, {summary['bytesRemoved']} bytes removed")
+    if args.json is not None:
+        write_atomic(args.json, json.dumps(summary, indent=2) + "\n")
+    if args.check and changed:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,47 @@
+"""Shared setup for the Python tests of deploy.py and scripts/*.py (the TypeScript suite runs under vitest)."""
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+for path in (ROOT, ROOT / "scripts"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+
+import pytest  # noqa: E402
+
+import deploy  # noqa: E402
+import deploy_stub_server  # noqa: E402
+
+
+@pytest.fixture
+def deploy_stub(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    """scripts/deploy_stub_server.py on a free port, with deploy.py pointed at it and caching under tmp_path."""
+    server = deploy_stub_server.start_background(tmp_path / "sites")
+    monkeypatch.setattr(deploy, "CONTABO_BASE_URL", server.base_url)
+    monkeypatch.setattr(deploy, "DEPLOY_LIVE_URL", f"{server.base_url}/sites/{{site}}")
+    monkeypatch.setattr(deploy, "DEPLOY_CACHE_DIR", tmp_path / "cache")
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def write_tree(root: Path, files: dict[str, str]) -> Path:
+    for rel, text in files.items():
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text, encoding="utf-8")
+    return root
+
+
+def assert_snapshot_current(snapshot: deploy.DistSnapshot) -> None:
+    """A snapshot kept up to date through refresh() matches a fresh walk of dist/."""
+    fresh = deploy.DistSnapshot(snapshot.root)
+    assert [(e.rel, e.size, e.mtime_ns) for e in snapshot.entries.values()] == [
+        (e.rel, e.size, e.mtime_ns) for e in fresh.entries.values()
+    ]
+    assert {rel: snapshot.sha256(rel) for rel in snapshot.files} == {rel: fresh.sha256(rel) for rel in fresh.files}
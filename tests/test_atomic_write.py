@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from atomic_write import write_atomic
+
+
+def test_concurrent_writers_never_share_a_temp_file(tmp_path: Path) -> None:
+    target = tmp_path / "cache" / "record.json"
+    payloads = [str(i).encode() * 4096 for i in range(32)]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda data: write_atomic(target, data), payloads))
+    assert target.read_bytes() in payloads
+    assert os.listdir(target.parent) == ["record.json"]
+
+
+def test_keeps_permission_bits_and_writes_text_as_utf8(tmp_path: Path) -> None:
+    target = tmp_path / "shader.wgsl"
+    write_atomic(target, "// é\n")
+    assert target.stat().st_mode & 0o777 == 0o644
+    target.chmod(0o755)
+    write_atomic(target, b"fn main() {}\n")
+    assert target.stat().st_mode & 0o777 == 0o755
+    assert target.read_bytes() == b"fn main() {}\n"
+    write_atomic(target, "// é\n")
+    assert target.read_bytes() == "// é\n".encode("utf-8")
@@ -0,0 +1,86 @@
+"""scripts/bundle_wgsl.py: minification keeps the token stream, tree-shaking keeps everything a root uses."""
+
+from __future__ import annotations
+
+import re
+from pathlib import Path
+
+import pytest
+
+from bundle_wgsl import IDENT_RE, bundle, flatten, is_root, strip_comments
+from tier_a_strip import SHADERS, index_decls
+
+SHADER_FILES = sorted(SHADERS.glob("*.wgsl"))
+
+# Maximal-munch WGSL tokens, independent of bundle_wgsl's own MIN_TOKEN_RE: a minifier that
+# glued "- -x" into "--x" or "a / /b" into a comment would change this stream.
+WGSL_TOKEN_RE = re.compile(
+    r"[A-Za-z_][A-Za-z0-9_]*"
+    r"|0[xX][0-9A-Fa-f.]+(?:[pP][+-]?[0-9]+)?[fhiu]?"
+    r"|(?:[0-9]+\.?[0-9]*|\.[0-9]+)(?:[eE][+-]?[0-9]+)?[fhiu]?"
+    r"|->|<<=|>>=|<<|>>|<=|>=|==|!=|&&|\|\||\+\+|--|[-+*/%&|^]="
+    r"|\S"
+)
+
+
+def tokens(code: str) -> list[str]:
+    return WGSL_TOKEN_RE.findall(code)
+
+
+@pytest.mark.parametrize("path", SHADER_FILES, ids=lambda p: p.name)
+def test_minify_keeps_token_stream(path: Path) -> None:
+    spaced, _ = bundle(path, compact=False)
+    compact, info = bundle(path)
+    assert tokens(compact) == tokens(spaced)
+    assert info["bytes"] < info["flatBytes"]
+
+
+@pytest.mark.parametrize("path", SHADER_FILES, ids=lambda p: p.name)
+def test_tree_shaking_keeps_every_referenced_declaration(path: Path) -> None:
+    flat, _ = flatten(path)
+    source = strip_comments(flat)
+    source_decls = index_decls(source)
+    declared = {d.name for d in source_decls}
+    roots = {d.name for d in source_decls if is_root(d, source, set())}
+
+    out, _ = bundle(path)
+    out_decls = index_decls(out)
+    kept = {d.name for d in out_decls}
+    assert roots <= kept
+    for d in out_decls:
+        used = set(IDENT_RE.findall(out, d.start, d.end)) & declared
+        assert used <= kept, f"{d.kind} {d.name} references dropped {sorted(used - kept)}"
+
+
+def test_comments_attributes_and_includes(tmp_path: Path) -> None:
+    (tmp_path / "lib").mkdir()
+    (tmp_path / "lib" / "math.wgsl").write_text(
+        "fn square(x: f32) -> f32 { return x * x; }\n"
+        "fn cube(x: f32) -> f32 { return x * square(x); }\n"
+    )
+    shader = tmp_path / "demo.wgsl"
+    shader.write_text(
+        '//#include "lib/math.wgsl"\n'
+        "/* outer { /* inner } fn fake() { */ still a comment } */\n"
+        "struct Params { scale: f32, }\n"
+        "struct Unused { x: f32, }\n"
+        "@group(0) @binding(0) var<uniform> params: Params;\n"
+        "@group(0) @binding(1) var<storage, read_write> out: array<f32>;\n"
+        "const SPAN: u32 = 4u; // { unbalanced in a line comment\n"
+        "fn helper(i: u32) -> f32 { return square(f32(i)) * params.scale; }\n"
+        "fn orphan() -> f32 { return cube(2.0); }\n"
+        "@compute @workgroup_size(8, 1)\n"
+        "fn main(@builtin(global_invocation_id) id: vec3<u32>) {\n"
+        "  /* { */ out[id.x] = helper(id.x % SPAN) - -1.0;\n"
+        "}\n"
+    )
+    out, info = bundle(shader, root=tmp_path)
+    assert info["includes"] == ["lib/math.wgsl"]
+    assert sorted(info["removed"]) == ["fn cube", "fn orphan", "struct Unused"]
+    assert "fake" not in out and "/*" not in out
+    assert "@compute@workgroup_size(8,1)fn main(@builtin(global_invocation_id)id:vec3<u32>)" in out
+    assert "- -1.0" in out
+
+    # An --entry name is a root too, and keeps what it uses.
+    out, info = bundle(shader, root=tmp_path, entries={"orphan"})
+    assert sorted(info["removed"]) == ["struct Unused"]
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import deploy
+from conftest import assert_snapshot_current
+
+
+def write_vite_dist(root: Path) -> Path:
+    """A small dist/ as `npm run build` leaves it: hashed entry, CSS and vendor chunk plus public/ files."""
+    files = {
+        "index.html": (
+            '<!doctype html><html><head><script type="module" crossorigin src="/xm-player/assets/index-AbCdEf12.js">'
+            '</script><link rel="stylesheet" crossorigin href="/xm-player/assets/index-XyZ98765.css"></head>'
+            '<body><div id="root"></div></body></html>\n'
+        ),
+        "assets/index-AbCdEf12.js": 'import"./vendor-Vv11Vv11.js";console.log("entry");\n',
+        "assets/vendor-Vv11Vv11.js": "export const v=1;\n" * 200,
+        "assets/index-XyZ98765.css": "body{margin:0}\n" * 800,
+        "assets/audio-worklet.js": "registerProcessor('x',class{});\n",
+        "sw.js": "const PRECACHE_VERSION = 'dev';\n",
+        ".htaccess": "Options -Indexes\n",
+        "_headers": "/*\n  Cross-Origin-Opener-Policy: same-origin\n",
+        "libmpt/libopenmpt.wasm": "\0asm" + "x" * 64,
+    }
+    for rel, text in files.items():
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text, encoding="utf-8")
+    manifest = {
+        "index.html": {
+            "file": "assets/index-AbCdEf12.js",
+            "src": "index.html",
+            "isEntry": True,
+            "imports": ["_vendor-Vv11Vv11.js"],
+            "css": ["assets/index-XyZ98765.css"],
+        },
+        "_vendor-Vv11Vv11.js": {"file": "assets/vendor-Vv11Vv11.js", "name": "vendor"},
+    }
+    (root / ".vite").mkdir()
+    (root / ".vite" / "manifest.json").write_text(json.dumps(manifest), encoding="utf-8")
+    return root
+
+
+def deploy_cache_artifacts(dist: Path) -> list[str]:
+    snapshot = deploy.DistSnapshot(dist)
+    return deploy.write_cache_artifacts(snapshot, deploy.build_inventory(snapshot))
+
+
+def test_second_run_on_fresh_build_changes_nothing(tmp_path: Path) -> None:
+    dist = write_vite_dist(tmp_path / "dist")
+    assert set(deploy_cache_artifacts(dist)) == {"precache-manifest.json", ".htaccess", "_headers", "sw.js"}
+    assert deploy_cache_artifacts(dist) == []
+
+
+def test_written_artifacts_are_in_the_snapshot(tmp_path: Path) -> None:
+    dist = write_vite_dist(tmp_path / "dist")
+    snapshot = deploy.DistSnapshot(dist)
+    deploy.write_cache_artifacts(snapshot, deploy.build_inventory(snapshot))
+    assert snapshot.has(deploy.PRECACHE_MANIFEST_NAME)
+    assert_snapshot_current(snapshot)
+
+
+def test_precache_manifest_revalidates_before_it_is_inventoried(tmp_path: Path) -> None:
+    dist = write_vite_dist(tmp_path / "dist")
+    deploy_cache_artifacts(dist)
+    headers = (dist / "_headers").read_text(encoding="utf-8")
+    assert f"/{deploy.PRECACHE_MANIFEST_NAME}\n  Cache-Control: {deploy.REVALIDATE_CACHE_CONTROL}" in headers
+
+
+def test_only_vite_manifest_files_are_immutable(tmp_path: Path) -> None:
+    dist = write_vite_dist(tmp_path / "dist")
+    snapshot = deploy.DistSnapshot(dist)
+    manifest = deploy.build_inventory(snapshot)
+    assert deploy.unhashed_assets(manifest) == ["assets/audio-worklet.js"]
+    htaccess = deploy.render_cache_headers(manifest, "htaccess")
+    assert "audio\\-worklet" not in htaccess and "vendor\\-Vv11Vv11\\.js" in htaccess
+    precache = deploy.build_precache_manifest(manifest)
+    assert [e["url"] for e in precache["entries"] if e["revision"] is None] == [
+        "assets/index-XyZ98765.css",
+        "assets/index-AbCdEf12.js",
+        "assets/vendor-Vv11Vv11.js",
+    ]
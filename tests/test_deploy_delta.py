@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import io
+import json
+import zipfile
+from pathlib import Path
+
+import deploy
+import deploy_stub_server
+from conftest import write_tree
+
+DIST = {
+    "index.html": '<script type="module" src="/xm-player/assets/index-AbCdEf12.js"></script>\n',
+    "assets/index-AbCdEf12.js": 'import"./chunk-QwErTy12.js";\n' + "console.log(1);\n" * 50,
+    "assets/chunk-QwErTy12.js": "export const x=1;\n" * 50,
+    "sw.js": "self.addEventListener('fetch',()=>{});\n",
+}
+
+
+def site_files(server: deploy_stub_server.DeployStubServer) -> dict[str, int]:
+    """Deployed files under the test site with their mtimes."""
+    folder = server.site_root / "test" / deploy.PROJECT_NAME
+    return {p.relative_to(folder).as_posix(): p.stat().st_mtime_ns for p in folder.rglob("*") if p.is_file()}
+
+
+def deploy_dist(dist: Path, *, delta: bool) -> deploy.DeployReport:
+    report = deploy.DeployReport()
+    snapshot = deploy.DistSnapshot(dist)
+    results = deploy.deploy_bundle(snapshot, clean=True, target_sites=["test"], delta=delta, report=report)
+    assert results == {"test": True}
+    return report
+
+
+def phase(report: deploy.DeployReport, name: str) -> deploy.PhaseRecord:
+    return next(p for p in report.phases if p.name == name)
+
+
+def test_plan_delta_lists_new_and_changed_files() -> None:
+    remote = {"entries": {"a.js": {"sha256": "1", "size": 1}, "b.js": {"sha256": "2", "size": 2}}}
+    local = {
+        "entries": {
+            "a.js": {"sha256": "1", "size": 1},
+            "b.js": {"sha256": "3", "size": 2},
+            "c.js": {"sha256": "4", "size": 4},
+        }
+    }
+    assert deploy.plan_delta(local, remote) == ["b.js", "c.js"]
+    assert deploy.plan_delta(remote, remote) == []
+
+
+def test_unchanged_second_deploy_uploads_nothing(tmp_path: Path, deploy_stub) -> None:
+    dist = write_tree(tmp_path / "dist", DIST)
+    deploy_dist(dist, delta=False)
+    before = site_files(deploy_stub)
+
+    report = deploy_dist(dist, delta=True)
+    assert phase(report, "delta-plan").files == 0
+    assert phase(report, "zip").files == 0
+    after = site_files(deploy_stub)
+    assert after.keys() == before.keys()
+    assert {rel for rel in after if after[rel] != before[rel]} <= {deploy.INVENTORY_NAME}
+
+
+def test_delta_prunes_only_assets_missing_from_keep(tmp_path: Path, deploy_stub) -> None:
+    dist = write_tree(tmp_path / "dist", {**DIST, "assets/old-ZZZZ1234.js": "export const old=1;\n"})
+    deploy_dist(dist, delta=False)
+    assert "assets/old-ZZZZ1234.js" in site_files(deploy_stub)
+
+    (dist / "assets" / "old-ZZZZ1234.js").unlink()
+    deploy_dist(dist, delta=True)
+    deployed = site_files(deploy_stub)
+    assert "assets/old-ZZZZ1234.js" not in deployed
+    # Unchanged assets are absent from the delta zip but listed in keep, so they survive the prune.
+    assert {"assets/index-AbCdEf12.js", "assets/chunk-QwErTy12.js", "index.html", "sw.js"} <= deployed.keys()
+
+
+def bundle(members: dict[str, bytes], keep: list[str]) -> bytes:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+        zf.writestr(deploy.INVENTORY_NAME, json.dumps({"pruneAssets": {"keep": keep}}))
+    return buf.getvalue()
+
+
+def test_stub_prunes_assets_only_with_clean(tmp_path: Path) -> None:
+    dest = write_tree(tmp_path / "test" / "xm-player", {"assets/stale.js": "1", "assets/kept.js": "2", "other.txt": "3"})
+    fields = {"target_folder": "xm-player", "target_site": "test"}
+    data = bundle({"assets/new.js": b"4"}, keep=["assets/kept.js", "assets/new.js"])
+
+    result = deploy_stub_server.apply_bundle(tmp_path, data, fields)
+    assert result["pruned"] == [] and (dest / "assets" / "stale.js").exists()
+
+    result = deploy_stub_server.apply_bundle(tmp_path, data, {**fields, "clean": "1"})
+    assert result["pruned"] == ["assets/stale.js"]
+    assert sorted(p.name for p in (dest / "assets").iterdir()) == ["kept.js", "new.js"]
+    assert (dest / "other.txt").exists()
+
+
+def test_stub_rejects_members_escaping_the_site(tmp_path: Path) -> None:
+    data = bundle({"../escape.txt": b"x", "assets/../../../escape2.txt": b"y", "ok.txt": b"z"}, keep=[])
+    result = deploy_stub_server.apply_bundle(tmp_path / "sites", data, {"target_folder": "xm-player"})
+    assert sorted(f["path"] for f in result["failed"]) == ["../escape.txt", "assets/../../../escape2.txt"]
+    assert result["uploaded"] == 2  # ok.txt and the inventory
+    assert not list(tmp_path.rglob("escape*.txt"))
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+import deploy
+
+
+def flags(**off: bool) -> argparse.Namespace:
+    return argparse.Namespace(
+        no_preload=off.get("no_preload", False),
+        no_optimize_images=off.get("no_optimize_images", False),
+        no_bundle_shaders=off.get("no_bundle_shaders", False),
+    )
+
+
+def sizes(entry_kb: int) -> dict[str, object]:
+    gzip = entry_kb << 10
+    return {
+        "assets": {"vite:index.html": {"raw": gzip * 3, "gzip": gzip, "files": 1}},
+        "startup": {"raw": gzip * 3, "gzip": gzip, "files": ["index.html"], "preloads": []},
+    }
+
+
+def test_key_names_sites_and_skipped_stages() -> None:
+    assert deploy.size_history_key(["test"], flags()) == "test"
+    assert deploy.size_history_key(["test", "go"], flags()) == "go,test"
+    assert deploy.size_history_key(["go", "test"], flags()) == "go,test"
+    key = deploy.size_history_key(["test"], flags(no_preload=True, no_bundle_shaders=True))
+    assert key == "test:no-preload,no-bundle-shaders"
+
+
+def test_gate_compares_only_with_the_same_key(tmp_path: Path) -> None:
+    path = tmp_path / "sizes.jsonl"
+    deploy.append_size_history({"at": "1", "key": "go", **sizes(200)}, path)
+    deploy.append_size_history({"at": "2", "key": "test", **sizes(100)}, path)
+    deploy.append_size_history({"at": "3", "key": "go:no-preload", **sizes(50)}, path)
+    deploy.append_size_history({"at": "4", **sizes(10)}, path)  # written before records were keyed
+    history = deploy.load_size_history(path)
+
+    current = sizes(200)
+    previous_go = deploy.previous_size_record(history, "go")
+    assert previous_go is not None and previous_go["at"] == "1"
+    assert deploy.size_regressions(previous_go, current) == []
+
+    previous_test = deploy.previous_size_record(history, "test")
+    assert previous_test is not None and previous_test["at"] == "2"
+    assert deploy.size_regressions(previous_test, current) == [
+        "startup payload 100.0 → 200.0 KB gzip",
+        "vite:index.html 100.0 → 200.0 KB gzip",
+    ]
+    assert deploy.previous_size_record(history, "go,test") is None
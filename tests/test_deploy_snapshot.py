@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import deploy
+from conftest import assert_snapshot_current, write_tree
+
+APP = "export function render(){return document.body}\n" * 100
+
+
+def test_sidecars_refresh_the_snapshot_without_a_rewalk(tmp_path: Path) -> None:
+    dist = write_tree(
+        tmp_path / "dist",
+        {"index.html": "<!doctype html>\n", "assets/app-AbCd1234.js": APP, "assets/util-EfGh5678.js": APP * 2},
+    )
+    snapshot = deploy.DistSnapshot(dist, cache=deploy.DeployCache(tmp_path / "cache"))
+    assert deploy.write_sidecars(snapshot)["compressed"] >= 2
+    assert snapshot.has("assets/app-AbCd1234.js.gz")
+    assert_snapshot_current(snapshot)
+
+    # A rewritten file only needs its own sidecars redone.
+    (dist / "assets/app-AbCd1234.js").write_text(APP * 3, encoding="utf-8")
+    (dist / "assets/util-EfGh5678.js").unlink()
+    snapshot.refresh(["assets/app-AbCd1234.js", "assets/util-EfGh5678.js"])
+    deploy.write_sidecars(snapshot, only=["assets/app-AbCd1234.js", "assets/util-EfGh5678.js"])
+    assert not snapshot.has("assets/util-EfGh5678.js.gz")
+    assert_snapshot_current(snapshot)
+
+
+def test_refresh_forgets_cached_contents(tmp_path: Path) -> None:
+    dist = write_tree(tmp_path / "dist", {"a.txt": "one"})
+    snapshot = deploy.DistSnapshot(dist)
+    assert snapshot.read_text("a.txt") == "one" and snapshot.sha256("a.txt")
+    write_tree(dist, {"a.txt": "two!", "b.txt": "new"})
+    snapshot.refresh(["a.txt", "b.txt", "missing.txt"])
+    assert snapshot.read_text("a.txt") == "two!"
+    assert snapshot.files == ["a.txt", "b.txt"]
+    assert_snapshot_current(snapshot)
+
+
+def test_modulepreload_injection_refreshes_index_html(tmp_path: Path) -> None:
+    dist = write_tree(
+        tmp_path / "dist",
+        {
+            "index.html": (
+                '<html><head><script type="module" crossorigin src="/xm-player/assets/index-AbCd1234.js">'
+                "</script></head></html>\n"
+            ),
+            "assets/index-AbCd1234.js": 'import"./vendor-EfGh5678.js";\n',
+            "assets/vendor-EfGh5678.js": "export const v=1;\n",
+        },
+    )
+    snapshot = deploy.DistSnapshot(dist)
+    assert snapshot.preload_hrefs == []
+    planned = deploy.plan_modulepreloads(snapshot, max_depth=2, budget_bytes=1 << 20)
+    assert planned == ["assets/vendor-EfGh5678.js"]
+    assert deploy.inject_modulepreloads(snapshot, planned)
+    assert [deploy.resolve_asset_href(href) for href in snapshot.preload_hrefs] == planned
+    assert_snapshot_current(snapshot)
@@ -0,0 +1,87 @@
+"""Resumable chunked uploads against the stub's injected faults (503, dropped connection, lost ack)."""
+
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Iterator, Optional
+
+import pytest
+
+import deploy
+import deploy_stub_server
+from conftest import write_tree
+
+CHUNK = 16 << 10
+
+
+@pytest.fixture
+def bundle(tmp_path: Path) -> tuple[Path, dict[str, bytes]]:
+    """A bundle zip of a small dist (about a dozen chunks) and the files it should extract to."""
+    dist = write_tree(tmp_path / "dist", {"index.html": "<!doctype html><title>x</title>\n"})
+    wasm = dist / "libmpt" / "libopenmpt.wasm"
+    wasm.parent.mkdir()
+    wasm.write_bytes(os.urandom(12 * CHUNK))
+    archive = tmp_path / "build.zip"
+    with archive.open("wb") as out:
+        deploy.write_zip(deploy.DistSnapshot(dist), out)
+    return archive, {p.relative_to(dist).as_posix(): p.read_bytes() for p in dist.rglob("*") if p.is_file()}
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(deploy, "backoff_delay", lambda attempt: 0.0)
+
+
+def upload(archive: Path, log: list[str]) -> object:
+    data = {"target_site": "test", "target_folder": deploy.PROJECT_NAME}
+    return deploy.upload_bundle_chunked(deploy.pooled_session(1), archive, data, chunk_size=CHUNK, log=log.append)
+
+
+def assert_deployed(server: deploy_stub_server.DeployStubServer, expected: dict[str, bytes]) -> None:
+    folder = server.site_root / "test" / deploy.PROJECT_NAME
+    for rel, data in expected.items():
+        assert (folder / rel).read_bytes() == data, rel
+    # The finished upload is forgotten, so the next deploy starts a fresh one.
+    assert json.loads((deploy.DEPLOY_CACHE_DIR / "uploads.json").read_text(encoding="utf-8")) == {}
+
+
+def test_upload_recovers_from_injected_faults(deploy_stub, bundle, monkeypatch: pytest.MonkeyPatch) -> None:
+    archive, expected = bundle
+    deploy_stub.fail_rate = 0.3
+    deploy_stub.rng.seed(5)
+    seen: list[Optional[str]] = []
+    pick_fault = deploy_stub.pick_fault
+
+    def recording_pick_fault() -> Optional[str]:
+        seen.append(pick_fault())
+        return seen[-1]
+
+    monkeypatch.setattr(deploy_stub, "pick_fault", recording_pick_fault)
+    log: list[str] = []
+    result = upload(archive, log)
+
+    assert isinstance(result, dict) and not result["failed"]
+    assert set(seen) == {None, *deploy_stub_server.FAULTS}
+    assert sum("↻" in line for line in log) == len(seen) - seen.count(None)
+    assert_deployed(deploy_stub, expected)
+
+
+def test_rerun_resumes_a_stalled_upload(deploy_stub, bundle, monkeypatch: pytest.MonkeyPatch) -> None:
+    archive, expected = bundle
+    # Two chunks land, the third is stored but its ack is lost, and with no retries the run gives up.
+    faults: Iterator[Optional[str]] = iter([None, None, "lost-ack"])
+    monkeypatch.setattr(deploy_stub, "pick_fault", lambda: next(faults, None))
+    monkeypatch.setattr(deploy, "RETRY_ATTEMPTS", 0)
+    log: list[str] = []
+    assert upload(archive, log) is None
+    assert any("stalled" in line for line in log)
+    pending = json.loads((deploy.DEPLOY_CACHE_DIR / "uploads.json").read_text(encoding="utf-8"))
+    assert list(pending.values()) == [*deploy_stub.uploads]
+
+    log.clear()
+    result = upload(archive, log)
+    assert isinstance(result, dict) and not result["failed"]
+    assert f"Resuming upload {[*deploy_stub.uploads][0]} at {3 * CHUNK / 1024:.1f}" in log[0]
+    assert_deployed(deploy_stub, expected)
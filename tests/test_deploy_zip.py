@@ -0,0 +1,97 @@
+"""deploy_zip.ZipStreamWriter output, read back with the stdlib zipfile module."""
+
+from __future__ import annotations
+
+import io
+import os
+import zipfile
+import zlib
+
+import deploy_zip
+from deploy_zip import ZIP_DEFLATE_LEVEL, ZipStreamWriter
+
+TEXT = b"export const answer = 42;\n" * 200
+BINARY = os.urandom(4096)
+
+
+def zinfo(name: str, size: int, compress_type: int) -> zipfile.ZipInfo:
+    info = zipfile.ZipInfo(name, (2024, 5, 17, 12, 30, 10))
+    info.external_attr = 0o644 << 16
+    info.file_size = size
+    info.compress_type = compress_type
+    return info
+
+
+def raw_deflate(data: bytes) -> tuple[int, int, bytes]:
+    compressor = zlib.compressobj(ZIP_DEFLATE_LEVEL, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return zlib.crc32(data), len(data), compressor.compress(data) + compressor.flush()
+
+
+def write_archive() -> bytes:
+    buf = io.BytesIO()
+    with ZipStreamWriter(buf) as zf:
+        zf.add_stream(zinfo("assets/app.js", len(TEXT), zipfile.ZIP_DEFLATED), io.BytesIO(TEXT))
+        zf.add_stream(zinfo("libmpt/libopenmpt.wasm", len(BINARY), zipfile.ZIP_STORED), io.BytesIO(BINARY))
+        zf.add_compressed(zinfo("assets/chunk.js", 0, zipfile.ZIP_STORED), raw_deflate(TEXT[::-1]))
+        zf.add_bytes("données/manifest.json", b'{"files": []}')
+    return buf.getvalue()
+
+
+def test_stored_and_deflated_members_read_back() -> None:
+    with zipfile.ZipFile(io.BytesIO(write_archive())) as zf:
+        assert zf.testzip() is None
+        infos = {info.filename: info for info in zf.infolist()}
+        assert infos["assets/app.js"].compress_type == zipfile.ZIP_DEFLATED
+        assert infos["assets/app.js"].compress_size < len(TEXT)
+        assert infos["libmpt/libopenmpt.wasm"].compress_type == zipfile.ZIP_STORED
+        assert infos["libmpt/libopenmpt.wasm"].compress_size == len(BINARY)
+        assert infos["assets/app.js"].date_time == (2024, 5, 17, 12, 30, 10)
+        assert infos["assets/app.js"].external_attr >> 16 == 0o644
+        assert zf.read("assets/app.js") == TEXT
+        assert zf.read("libmpt/libopenmpt.wasm") == BINARY
+
+
+def test_precompressed_member_is_passed_through() -> None:
+    crc, size, payload = raw_deflate(TEXT[::-1])
+    with zipfile.ZipFile(io.BytesIO(write_archive())) as zf:
+        info = zf.getinfo("assets/chunk.js")
+        assert info.compress_type == zipfile.ZIP_DEFLATED
+        assert (info.CRC, info.file_size, info.compress_size) == (crc, size, len(payload))
+        assert zf.read("assets/chunk.js") == TEXT[::-1]
+        # Non-ASCII names are flagged UTF-8 and decode back unchanged.
+        assert zf.read("données/manifest.json") == b'{"files": []}'
+
+
+def test_archive_written_after_a_prefix() -> None:
+    buf = io.BytesIO(b"prefix")
+    buf.seek(0, io.SEEK_END)
+    with ZipStreamWriter(buf) as zf:
+        zf.add_bytes("index.html", b"<!doctype html>")
+    with zipfile.ZipFile(io.BytesIO(buf.getvalue()[len(b"prefix"):])) as zf:
+        assert zf.testzip() is None
+        assert zf.read("index.html") == b"<!doctype html>"
+
+
+def test_forced_zip64_records(monkeypatch) -> None:
+    # Lower the threshold so every size and offset takes the ZIP64 path.
+    monkeypatch.setattr(deploy_zip, "ZIP64_LIMIT", 16)
+    data = write_archive()
+    assert b"PK\x06\x06" in data  # ZIP64 end of central directory record
+    assert b"PK\x06\x07" in data  # ZIP64 end of central directory locator
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        assert zf.testzip() is None
+        assert zf.read("assets/app.js") == TEXT
+        assert zf.read("libmpt/libopenmpt.wasm") == BINARY
+        assert zf.read("assets/chunk.js") == TEXT[::-1]
+        assert zf.getinfo("libmpt/libopenmpt.wasm").file_size == len(BINARY)
+
+
+def test_no_archive_when_writing_fails() -> None:
+    buf = io.BytesIO()
+    try:
+        with ZipStreamWriter(buf) as zf:
+            zf.add_bytes("index.html", b"<!doctype html>")
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+    assert b"PK\x05\x06" not in buf.getvalue()
@@ -0,0 +1,83 @@
+"""scripts/tier_a_strip.py: declaration indexing, and the committed shaders being fully migrated."""
+
+from __future__ import annotations
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+from tier_a_strip import ROOT, SHADERS, index_decls, strip_decls
+
+SOURCE = """\
+enable f16;
+// fn commented() { not a declaration }
+/* outer /* nested } struct Hidden { */ fn alsoHidden() { } */
+struct VertexOut {
+  @builtin(position) pos: vec4<f32>,  // } in a trailing comment
+  @location(0) uv: vec2<f32>,
+};
+@group(0) @binding(0) var<uniform> params: Params;
+const TAU: f32 = 6.2831853; /* { */
+alias Color = vec4<f32>;
+@vertex
+fn vs(@builtin(vertex_index) i: u32) -> VertexOut {
+  const local = 1u;  /* struct Inner { */
+  var out: VertexOut;
+  if (i > local) { out.uv = vec2<f32>(0.0); }  // {
+  return out;
+}
+@fragment @diagnostic(off, derivative_uniformity)
+fn fs(in: VertexOut) -> @location(0) Color { /* } */ return Color(in.uv, 0.0, 1.0); }
+override SCALE: f32 = 1.0;
+"""
+
+
+def spans(text: str) -> list[tuple[str, str, str]]:
+    return [(d.kind, d.name, text[d.start : d.end]) for d in index_decls(text)]
+
+
+def test_index_decls_ignores_comments_and_keeps_attributes() -> None:
+    found = spans(SOURCE)
+    assert [(kind, name) for kind, name, _ in found] == [
+        ("struct", "VertexOut"),
+        ("var", "params"),
+        ("const", "TAU"),
+        ("alias", "Color"),
+        ("fn", "vs"),
+        ("fn", "fs"),
+        ("override", "SCALE"),
+    ]
+    text = {name: span for _, name, span in found}
+    assert text["VertexOut"].startswith("struct VertexOut {") and text["VertexOut"].endswith("\n};")
+    assert text["params"] == "@group(0) @binding(0) var<uniform> params: Params;"
+    assert text["TAU"] == "const TAU: f32 = 6.2831853;"
+    assert text["vs"].startswith("@vertex\nfn vs(") and text["vs"].endswith("return out;\n}")
+    assert text["fs"].startswith("@fragment @diagnostic(off, derivative_uniformity)\nfn fs(")
+    assert text["fs"].endswith("1.0); }")
+
+
+def test_unterminated_block_comment_hides_the_rest() -> None:
+    assert spans("fn a() {}\n/* /* */ fn b() {}\n") == [("fn", "a", "fn a() {}")]
+
+
+def test_strip_decls_removes_attributes_with_the_function() -> None:
+    stripped = strip_decls(SOURCE, {"fs", "vs"})
+    assert "@vertex" not in stripped and "@fragment" not in stripped
+    assert [(d.kind, d.name) for d in index_decls(stripped)][-1] == ("override", "SCALE")
+    assert "fn commented()" in stripped and "alsoHidden" in stripped
+
+
+def test_committed_shaders_are_already_migrated(tmp_path: Path) -> None:
+    before = {p: p.read_bytes() for p in SHADERS.glob("patternv*.wgsl")}
+    summary_path = tmp_path / "summary.json"
+    proc = subprocess.run(
+        [sys.executable, str(ROOT / "scripts" / "tier_a_strip.py"), "--check", "--json", str(summary_path)],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    assert proc.returncode == 0, proc.stdout + proc.stderr
+    summary = json.loads(summary_path.read_text(encoding="utf-8"))
+    assert summary["dryRun"] and summary["changed"] == 0 and summary["files"] > 0
+    assert {p: p.read_bytes() for p in SHADERS.glob("patternv*.wgsl")} == before
@@ -65,6 +65,9 @@ export default defineConfig(({ mode }) => {
     assetsInclude: ['**/*.wasm'],
     build: {
       cssCodeSplit: true,
+      // dist/.vite/manifest.json: deploy.py reads it to tell content-hashed output
+      // (immutable caching, precache revisions, size history) from everything else.
+      manifest: true,
       rollupOptions: {
         output: {
           // Literal [extname] — typos here (e.g. `.1iss`) corrupt production CSS URLs.